@@ -0,0 +1,85 @@
+"""Benchmark the code search index on a generated tree.
+
+Measures the initial build, cold load of the saved index, query latency and
+the cost of re-indexing a handful of changed files.
+
+Usage: python benchmarks/bench_code_search.py [files]
+"""
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.code_index import CodeIndex  # noqa: E402
+
+SYLLABLES = ["get", "set", "user", "session", "token", "config", "parse", "load", "cache", "index",
+             "file", "path", "request", "handler", "build", "query", "result", "error", "stream", "event"]
+
+
+def identifier(rng: random.Random) -> str:
+    parts = rng.sample(SYLLABLES, rng.randint(1, 3))
+    if rng.random() < 0.5:
+        return "_".join(parts)
+    return parts[0] + "".join(part.title() for part in parts[1:])
+
+
+def build_tree(root: Path, files: int) -> None:
+    rng = random.Random(0)
+    for i in range(files):
+        path = root / f"pkg{i % 100}" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [f"def {identifier(rng)}({identifier(rng)}):\n    return {identifier(rng)}({identifier(rng)})\n"
+                 for _ in range(30)]
+        path.write_text("".join(lines))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "repo"
+        build_tree(root, files)
+        index_path = os.path.join(tmp, "index", "code.idx")
+
+        index = CodeIndex(str(root), index_path=index_path)
+        _, build = timed(index.ensure_current)
+        size = os.path.getsize(index_path)
+        print(f"{files} files: built in {build:.2f}s, index {size / 1024 / 1024:.1f} MB")
+        index.close()
+
+        index = CodeIndex(str(root), index_path=index_path)
+        _, load = timed(index.ensure_current)
+        print(f"load + stat rescan: {load * 1000:.0f} ms")
+
+        queries = ["user session token", "parseConfig", "load_cache_index", "stream event handler", "error"]
+        latencies = []
+        for _ in range(5):
+            for query in queries:
+                _, elapsed = timed(lambda: index.search(query, limit=10))
+                latencies.append(elapsed * 1000)
+        print(f"query latency: median {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms")
+
+        changed = [f"pkg{i}/module_{i}.py" for i in range(10)]
+        for rel in changed:
+            with open(root / rel, "a") as f:
+                f.write("def freshly_added_symbol():\n    pass\n")
+        _, update = timed(lambda: index.update_paths(changed))
+        results, _ = index.search("freshly_added_symbol")
+        print(f"re-index {len(changed)} changed files: {update * 1000:.0f} ms ({len(results)} hits after update)")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark per-turn agent overhead as conversation history grows.
+
+Runs the agent loop against a provider that requests a no-op tool on every
+turn and reports the average time per turn for successive windows of the
+conversation. With the history passed as a view, the per-turn overhead stays
+flat instead of growing with the number of turns.
+
+Usage: python benchmarks/bench_history.py [turns] [window]
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.agent import Agent  # noqa: E402
+from bitteragent.providers.base import Provider  # noqa: E402
+from bitteragent.tools import Tool, ToolRegistry, ToolResult  # noqa: E402
+
+
+class NoopTool(Tool):
+    name = "noop"
+    description = "Does nothing"
+    parameters = {"type": "object", "properties": {}}
+
+    async def execute(self, **kwargs: Any) -> ToolResult:
+        return ToolResult(success=True, output="ok")
+
+
+class ScriptedProvider(Provider):
+    """Provider that calls the no-op tool for a fixed number of turns."""
+
+    def __init__(self, turns: int, window: int) -> None:
+        self.turns = turns
+        self.window = window
+        self.step = 0
+        self.marks: List[float] = []
+
+    async def complete(self, messages, tools=None, system=None) -> Dict[str, Any]:  # type: ignore[override]
+        if self.step % self.window == 0:
+            self.marks.append(time.perf_counter())
+        self.step += 1
+        if self.step > self.turns:
+            return {"content": [{"type": "text", "text": "done"}]}
+        return {
+            "content": [
+                {"type": "tool_use", "id": str(self.step), "name": "noop", "input": {}}
+            ]
+        }
+
+
+def main() -> None:
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    provider = ScriptedProvider(turns, window)
+    registry = ToolRegistry()
+    registry.register(NoopTool())
+    agent = Agent(provider=provider, registry=registry, system_prompt="system")
+    asyncio.run(agent.run("go"))
+
+    print(f"{'turns':>12}  {'us/turn':>10}")
+    for i in range(1, len(provider.marks)):
+        elapsed = provider.marks[i] - provider.marks[i - 1]
+        start = (i - 1) * window
+        print(f"{start:>5}-{start + window:<6}  {elapsed / window * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
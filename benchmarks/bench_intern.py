@@ -0,0 +1,118 @@
+"""Measure history memory with and without interning of large strings.
+
+Runs several sessions through the agent loop against a provider that writes
+files, reads them back and runs the same command repeatedly, then reports
+the memory held by the sessions' histories, measured with tracemalloc. Runs
+without interning use a store whose threshold no string reaches, and every
+request is checked to serialize identically in both modes.
+
+Usage: python benchmarks/bench_intern.py [sessions] [files] [file_kb]
+"""
+from __future__ import annotations
+
+import asyncio
+import gc
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.agent import Agent  # noqa: E402
+from bitteragent.history import BlobStore  # noqa: E402
+from bitteragent.native_tools.file_ops import ReadFileTool, WriteFileTool  # noqa: E402
+from bitteragent.providers.base import Provider  # noqa: E402
+from bitteragent.tools import Tool, ToolRegistry, ToolResult  # noqa: E402
+
+
+class StatusTool(Tool):
+    """Stands in for a command with a large, unchanging output."""
+
+    name = "status"
+    description = "Prints the build status"
+    parameters = {"type": "object", "properties": {}}
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+    async def execute(self, **kwargs: Any) -> ToolResult:
+        return ToolResult(success=True, output="".join(f"target {i}: ok\n" for i in range(self.size // 14)))
+
+
+class ScriptedProvider(Provider):
+    """Writes each file, reads it back twice and checks the status after each one."""
+
+    def __init__(self, directory: str, files: int, size: int) -> None:
+        self.calls = []
+        for n in range(files):
+            path = f"{directory}/file_{n}.py"
+            # Distinct per session; only the status output repeats across sessions
+            # Lines of 32 characters, so read_file returns whole files up to 31 KiB
+            content = "".join(f"v{directory}_{n}_{i} = {i}".ljust(31) + "\n" for i in range(size // 32))
+            self.calls += [
+                ("write_file", {"file_path": path, "content": content}),
+                ("read_file", {"file_path": path}),
+                ("status", {}),
+                ("read_file", {"file_path": path}),
+            ]
+        self.digest = hashlib.sha256()
+
+    async def complete(self, messages, tools=None, system=None) -> Dict[str, Any]:  # type: ignore[override]
+        self.digest.update(json.dumps(list(messages)).encode())
+        if not self.calls:
+            return {"content": [{"type": "text", "text": "done"}]}
+        name, params = self.calls.pop(0)
+        # Parse the input like a streamed response would, so it is a fresh string
+        return {"content": [{"type": "tool_use", "id": str(len(self.calls)), "name": name, "input": json.loads(json.dumps(params))}]}
+
+
+def run(sessions: int, files: int, size: int, store: Optional[BlobStore]) -> tuple[int, str, BlobStore]:
+    shared = store if store is not None else BlobStore(min_chars=sys.maxsize)
+    digests = hashlib.sha256()
+    agents: List[Agent] = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Relative paths, so both modes send the same requests
+        os.chdir(tmp)
+        gc.collect()
+        tracemalloc.start()
+        for s in range(sessions):
+            registry = ToolRegistry()
+            for tool in (WriteFileTool(), ReadFileTool(), StatusTool(size)):
+                registry.register(tool)
+            Path(str(s)).mkdir()
+            provider = ScriptedProvider(str(s), files, size)
+            agent = Agent(provider=provider, registry=registry, blob_store=shared)
+            asyncio.run(agent.run("write the files"))
+            digests.update(provider.digest.digest())
+            agents.append(agent)
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        os.chdir(cwd)
+    return held, digests.hexdigest(), shared
+
+
+def main() -> None:
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    size = int(sys.argv[3]) * 1024 if len(sys.argv) > 3 else 16 * 1024
+
+    plain, plain_digest, _ = run(sessions, files, size, None)
+    interned, interned_digest, store = run(sessions, files, size, BlobStore())
+    assert plain_digest == interned_digest, "interning changed the requests"
+
+    print(f"{sessions} sessions, {files} files of {size // 1024} KiB each")
+    print(f"{'mode':<12} {'held MiB':>9} {'per session KiB':>16}")
+    for label, held in (("plain", plain), ("interned", interned)):
+        print(f"{label:<12} {held / 2**20:>9.1f} {held / sessions / 1024:>16.0f}")
+    print(f"requests identical: yes; store: {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the native search tool against ``grep -r`` on a generated tree.
+
+The tree mimics a project with a large ignored dependency directory, which
+``grep -r`` searches and the search tool skips.
+
+Usage: python benchmarks/bench_search.py [source_files] [dependency_files]
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.native_tools.search import SearchTool  # noqa: E402
+
+WORDS = ["alpha", "beta", "gamma", "delta", "config", "value", "return", "import", "self", "data"]
+
+
+def make_file(path: Path, rng: random.Random, lines: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    body = "\n".join(" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(lines))
+    path.write_text(body + "\n")
+
+
+def build_tree(root: Path, source_files: int, dependency_files: int) -> None:
+    rng = random.Random(0)
+    (root / ".gitignore").write_text("node_modules/\n*.log\n")
+    for i in range(source_files):
+        make_file(root / "src" / f"pkg{i % 50}" / f"mod{i}.py", rng, 200)
+    for i in range(dependency_files):
+        make_file(root / "node_modules" / f"dep{i % 200}" / f"file{i}.js", rng, 200)
+    (root / "src" / "pkg7" / "target.py").write_text("def find_me_here():\n    pass\n")
+
+
+def timed(label: str, func) -> None:
+    start = time.perf_counter()
+    output = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24}: {elapsed * 1000:8.1f} ms  ({output.count(chr(10)) + 1} lines)")
+
+
+def main() -> None:
+    source_files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    dependency_files = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        print(f"building tree: {source_files} source files, {dependency_files} dependency files")
+        build_tree(root, source_files, dependency_files)
+        tool = SearchTool(workers=os.cpu_count() or 8)
+
+        def grep(pattern: str) -> str:
+            return subprocess.run(["grep", "-rn", pattern, str(root)], capture_output=True, text=True).stdout
+
+        def search(pattern: str, **kwargs) -> str:
+            return asyncio.run(tool.execute(pattern=pattern, path=str(root), **kwargs)).output
+
+        for pattern in ["find_me_here", r"def find_\w+", "alpha beta gamma delta"]:
+            print(f"pattern: {pattern!r}")
+            timed("grep -rn", lambda: grep(pattern))
+            timed("search", lambda: search(pattern))
+            timed("search (max_results=20)", lambda: search(pattern, max_results=20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""Soak test: many concurrent agent sessions against a local fake Messages API.
+
+A fake server, running in its own process, streams scripted responses over
+HTTP/1.1 keepalive connections with configurable time to first byte, token
+rate, server errors and 429s. Every session is a real Agent driving a real
+AnthropicProvider: each turn calls a no-op tool until the scripted number of
+turns is reached, then answers. Reports throughput, p50/p99 turn latency,
+event-loop lag, RSS growth and open file descriptors.
+
+Usage: python benchmarks/bench_soak.py [--sessions N] [--concurrency N] [--turns N]
+       [--latency S] [--token-rate TPS] [--error-rate P] [--rate-limit-rate P]
+       [--provider-per-session]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.agent import Agent  # noqa: E402
+from bitteragent.providers.anthropic import AnthropicProvider  # noqa: E402
+from bitteragent.tools import Tool, ToolRegistry, ToolResult  # noqa: E402
+
+# Fake server
+
+
+def sse(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def chunk(data: bytes) -> bytes:
+    return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+
+class FakeMessagesServer:
+    """Streams scripted Messages API responses.
+
+    A request whose history has fewer than ``turns`` assistant messages gets
+    some text and a ``noop`` tool call; later requests get a final answer.
+    """
+
+    def __init__(self, turns: int, latency: float, token_rate: float, output_tokens: int,
+                 error_rate: float, rate_limit_rate: float) -> None:
+        self.turns = turns
+        self.latency = latency
+        self.token_rate = token_rate
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(0)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode().split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+                await self.respond(body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def error(self, writer: asyncio.StreamWriter, status: int, kind: str, extra: str = "") -> None:
+        data = json.dumps({"type": "error", "error": {"type": kind, "message": "fake"}}).encode()
+        writer.write(
+            f"HTTP/1.1 {status} Fake\r\nContent-Type: application/json\r\n{extra}"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def respond(self, body: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return await self.error(writer, 429, "rate_limit_error", "retry-after-ms: 200\r\n")
+        if roll < self.rate_limit_rate + self.error_rate:
+            return await self.error(writer, 500, "api_error")
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        await asyncio.sleep(self.latency)
+        turn = sum(1 for message in body["messages"] if message["role"] == "assistant")
+        input_tokens = 200 + 50 * turn
+        writer.write(chunk(sse("message_start", {"type": "message_start", "message": {
+            "id": "msg_fake", "type": "message", "role": "assistant", "model": body["model"], "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+        }})))
+        writer.write(chunk(sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                                       "content_block": {"type": "text", "text": ""}})))
+        # Four tokens per delta, paced at the token rate
+        for _ in range(max(self.output_tokens // 4, 1)):
+            writer.write(chunk(sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                           "delta": {"type": "text_delta", "text": "word " * 4}})))
+            await writer.drain()
+            if self.token_rate > 0:
+                await asyncio.sleep(4 / self.token_rate)
+        writer.write(chunk(sse("content_block_stop", {"type": "content_block_stop", "index": 0})))
+        stop_reason = "end_turn"
+        if turn < self.turns:
+            stop_reason = "tool_use"
+            writer.write(chunk(sse("content_block_start", {"type": "content_block_start", "index": 1, "content_block": {
+                "type": "tool_use", "id": f"toolu_{turn}", "name": "noop", "input": {}}})))
+            for part in ('{"note": ', f'"turn {turn}"', "}"):
+                writer.write(chunk(sse("content_block_delta", {"type": "content_block_delta", "index": 1,
+                                                               "delta": {"type": "input_json_delta", "partial_json": part}})))
+            writer.write(chunk(sse("content_block_stop", {"type": "content_block_stop", "index": 1})))
+        writer.write(chunk(sse("message_delta", {"type": "message_delta",
+                                                 "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                                 "usage": {"output_tokens": self.output_tokens}})))
+        writer.write(chunk(sse("message_stop", {"type": "message_stop"})))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def serve(options: Dict[str, Any], port_pipe: Any) -> None:
+    async def main() -> None:
+        fake = FakeMessagesServer(**options)
+        server = await asyncio.start_server(fake.handle, "127.0.0.1", 0, backlog=4096)
+        port_pipe.send(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+# Client
+
+
+class NoopTool(Tool):
+    name = "noop"
+    description = "Does nothing"
+    parameters = {"type": "object", "properties": {"note": {"type": "string"}}}
+
+    async def execute(self, **kwargs: Any) -> ToolResult:
+        return ToolResult(success=True, output="ok")
+
+
+class TimedProvider(AnthropicProvider):
+    """Records the latency of every model turn."""
+
+    def __init__(self, latencies: List[float], **kwargs: Any) -> None:
+        # Streaming is only used with a text callback
+        super().__init__(api_key="fake", text_callback=lambda text: None, **kwargs)
+        self.latencies = latencies
+
+    async def complete(self, messages, tools=None, system=None) -> Dict[str, Any]:  # type: ignore[override]
+        start = time.perf_counter()
+        try:
+            return await super().complete(messages, tools, system)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def open_fds() -> Optional[int]:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+
+class Monitor:
+    """Samples event-loop lag, RSS and open descriptors while the soak runs."""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.lags: List[float] = []
+        self.peak_rss = rss_mb()
+        self.peak_fds = open_fds() or 0
+
+    async def run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(time.perf_counter() - start - self.interval)
+            if len(self.lags) % 10 == 0:
+                self.peak_rss = max(self.peak_rss, rss_mb())
+                self.peak_fds = max(self.peak_fds, open_fds() or 0)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def soak(args: argparse.Namespace, base_url: str) -> None:
+    latencies: List[float] = []
+    registry = ToolRegistry()
+    registry.register(NoopTool())
+    shared = None if args.provider_per_session else TimedProvider(latencies, base_url=base_url)
+    slots = asyncio.Semaphore(args.concurrency)
+    failures: Dict[str, int] = {}
+    completed = 0
+
+    async def session(i: int) -> None:
+        nonlocal completed
+        async with slots:
+            provider = shared or TimedProvider(latencies, base_url=base_url)
+            agent = Agent(provider=provider, registry=registry, system_prompt="You are a soak test.")
+            try:
+                await agent.run(f"session {i}")
+                completed += 1
+            except Exception as exc:
+                failures[type(exc).__name__] = failures.get(type(exc).__name__, 0) + 1
+            finally:
+                if shared is None:
+                    await provider.client.close()
+
+    monitor = Monitor()
+    monitor_task = asyncio.create_task(monitor.run())
+    rss_before, fds_before = rss_mb(), open_fds()
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    monitor_task.cancel()
+    rss_after, fds_after = rss_mb(), open_fds()
+    if shared is not None:
+        await shared.client.close()
+
+    turns = len(latencies)
+    print(f"{args.sessions} sessions x {args.turns + 1} turns, concurrency {args.concurrency}, "
+          f"{'one provider per session' if args.provider_per_session else 'shared provider'}")
+    print(f"completed {completed}, failed {sum(failures.values())} {failures or ''}".rstrip())
+    print(f"wall time {elapsed:.1f}s: {completed / elapsed:.1f} sessions/s, {turns / elapsed:.1f} turns/s")
+    print(f"turn latency: p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms, max {max(latencies, default=0) * 1000:.0f} ms")
+    print(f"event-loop lag: p50 {percentile(monitor.lags, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(monitor.lags, 0.99) * 1000:.1f} ms, max {max(monitor.lags, default=0) * 1000:.1f} ms")
+    print(f"RSS: {rss_before:.0f} MB before, {monitor.peak_rss:.0f} MB peak, {rss_after:.0f} MB after "
+          f"({rss_after - rss_before:+.0f} MB)")
+    soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    print(f"open fds: {fds_before} before, {monitor.peak_fds} peak, {fds_after} after (limit {soft_limit})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500, help="Sessions running at once")
+    parser.add_argument("--turns", type=int, default=3, help="Tool-calling turns before the final answer")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first streamed event")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="Streamed output tokens per second (0: no pacing)")
+    parser.add_argument("--output-tokens", type=int, default=40, help="Output tokens per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    parser.add_argument("--provider-per-session", action="store_true",
+                        help="Give each session its own provider and connection pool instead of sharing one")
+    args = parser.parse_args()
+
+    options = {
+        "turns": args.turns, "latency": args.latency, "token_rate": args.token_rate,
+        "output_tokens": args.output_tokens, "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate,
+    }
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    # The server gets its own process so its work does not show up as client loop lag
+    server = multiprocessing.Process(target=serve, args=(options, sender), daemon=True)
+    server.start()
+    try:
+        port = receiver.recv()
+        asyncio.run(soak(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
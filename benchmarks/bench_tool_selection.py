@@ -0,0 +1,71 @@
+"""Measure per-request tool schema size with and without tool selection.
+
+Builds the CLI's tool registry and reports the size of the tool schemas
+sent per request: everything, and the CLI's selection at successive stages
+of a session as optional groups become active. Tokens are estimated at 4
+characters each; with ANTHROPIC_API_KEY set they are counted with the
+count_tokens API instead.
+
+Usage: python benchmarks/bench_tool_selection.py
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.__main__ import build_registry, create_tool_selector  # noqa: E402
+from bitteragent.providers.base import Provider  # noqa: E402
+
+STAGES = [
+    ("first turn", []),
+    ("after a background job", ["jobs"]),
+    ("after a spilled output", ["jobs", "output"]),
+    ("every group active", ["jobs", "output", "patch", "checkpoint", "delegate"]),
+]
+
+
+class SchemaOnly(Provider):
+    async def complete(self, messages, tools=None, system=None) -> Dict[str, Any]:  # type: ignore[override]
+        raise NotImplementedError
+
+
+def count_tokens(schema: List[Dict[str, Any]]) -> str:
+    chars = len(json.dumps(schema))
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        return f"~{chars // 4}"
+    import anthropic
+
+    client = anthropic.Anthropic()
+    # Subtract the tokens of the same request without tools
+    base = client.messages.count_tokens(model="claude-sonnet-4-20250514", messages=[{"role": "user", "content": "hi"}])
+    with_tools = client.messages.count_tokens(
+        model="claude-sonnet-4-20250514", messages=[{"role": "user", "content": "hi"}], tools=schema,
+    )
+    return str(with_tools.input_tokens - base.input_tokens)
+
+
+def main() -> None:
+    provider = SchemaOnly()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        registry = build_registry(provider=provider, max_delegates=4)
+        full = provider.get_tools_schema(registry)
+        print(f"{'tools sent':<28} {'count':>5} {'chars':>7} {'tokens':>7}")
+        print(f"{'all tools':<28} {len(full):>5} {len(json.dumps(full)):>7} {count_tokens(full):>7}")
+        selector = create_tool_selector()
+        for label, groups in STAGES:
+            selector.activate(groups)
+            schema = provider.get_tools_schema(selector.select(registry))
+            print(f"{label:<28} {len(schema):>5} {len(json.dumps(schema)):>7} {count_tokens(schema):>7}")
+        asyncio.run(registry.close())
+
+
+if __name__ == "__main__":
+    main()
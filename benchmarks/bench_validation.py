@@ -0,0 +1,35 @@
+"""Benchmark per-call cost of compiled tool parameter validation.
+
+Usage: python benchmarks/bench_validation.py [iterations]
+"""
+from __future__ import annotations
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bitteragent.native_tools.file_ops import EditFileTool, ReadFileTool  # noqa: E402
+from bitteragent.native_tools.shell import ShellTool  # noqa: E402
+from bitteragent.validation import compile_schema  # noqa: E402
+
+CASES = [
+    (ShellTool, {"command": "ls -la"}),
+    (ReadFileTool, {"file_path": "/tmp/x.py", "limit": "200"}),
+    (EditFileTool, {"file_path": "/tmp/x.py", "old_string": "a" * 10000, "new_string": "b"}),
+]
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    compile_time = timeit.timeit(lambda: compile_schema(EditFileTool.parameters), number=1000) / 1000
+    print(f"compile EditFileTool schema: {compile_time * 1e6:.1f} us")
+    for tool, params in CASES:
+        validate = compile_schema(tool.parameters)
+        elapsed = timeit.timeit(lambda: validate(params), number=iterations)
+        print(f"{tool.name:>10}: {elapsed / iterations * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
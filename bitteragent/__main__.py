@@ -1,18 +1,39 @@
 """Command line interface for TinyAgent."""
 import asyncio
 import os
-import json
 import logging
-from typing import Any, Dict, Optional
+import sys
+from typing import Any, Optional
 
 import click
 from dotenv import load_dotenv
 
 from .agent import Agent
-from .tools import ToolRegistry, ToolResult
+from .budget import RunBudget
+from .checkpoints import CheckpointStore
+from .code_index import CodeIndex
+from .events import TEXT_DELTA, ConsoleRenderer, EventBus, NDJSONWriter, run_with_consumers
+from .history import InputCompactor
+from .loop_guard import LoopGuard
+from .tools import ToolCache, ToolRegistry
 from .native_tools.shell import ShellTool
-from .native_tools.file_ops import ReadFileTool, WriteFileTool, EditFileTool
+from .native_tools.file_ops import ReadFileTool, ReadFilesTool, WriteFileTool, EditFileTool
+from .native_tools.executor import CommandExecutor, ResourceLimits
+from .native_tools.jobs import JobManager, JobTool
+from .native_tools.output import ReadOutputTool
+from .native_tools.patch import ApplyPatchTool
+from .native_tools.search import SearchTool
+from .native_tools.workspace import WorkspaceTool
+from .native_tools.checkpoint import CheckpointTool
+from .native_tools.code_search import CodeSearchTool
+from .native_tools.delegate import DelegateTool
 from .providers.anthropic import AnthropicProvider
+from .providers.base import Provider
+from .providers.openai import OpenAIProvider
+from .providers.rate_limit import RateLimiter
+from .spill import SpillStore
+from .tool_selection import ToolSelector
+from .workspace import WorkspaceIndex
 
 load_dotenv()
 
@@ -23,36 +44,158 @@ logging.basicConfig(
 )
 
 
-def create_tool_callback() -> callable:
-    """Create a callback function to display tool execution in real-time."""
-    def tool_callback(tool_name: str, params: Dict[str, Any], result: Optional[ToolResult]) -> None:
-        if result is None:
-            # Tool call starting - be concise
-            params_str = json.dumps(params) if params else ""
-            if params_str:
-                print(f"{tool_name}: {params_str}")
-            else:
-                print(f"{tool_name}")
-        else:
-            # Tool execution completed - show failures and short outputs
-            if not result.success:
-                print(f"Tool call failed: {result.error}")
-            elif result.output and len(result.output.strip()) < 200:
-                # Only show short outputs inline
-                print(result.output.strip())
-    
-    return tool_callback
+def report_cache_stats(cache: ToolCache) -> None:
+    """Print tool memoization statistics to stderr."""
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    if lookups:
+        click.echo(
+            f"Tool cache: {stats['hits']}/{lookups} hits ({stats['hit_rate']:.0%}), "
+            f"{stats['time_saved']:.2f}s saved, {stats['invalidations']} invalidations",
+            err=True,
+        )
+
+
+def report_usage(agent: Agent) -> None:
+    """Print token usage, cost and why the run stopped early, if it did, to stderr."""
+    usage = agent.budget.summary()
+    if usage["requests"]:
+        click.echo(
+            f"Usage: {usage['requests']} requests, {usage['input_tokens']} input / "
+            f"{usage['output_tokens']} output tokens "
+            f"({usage['cache_read_input_tokens']} cache reads), ${usage['cost']:.4f} in {usage['elapsed']:.1f}s",
+            err=True,
+        )
+    if agent.tool_selector is not None and agent.tool_selector.requests:
+        stats = agent.tool_selector.stats()
+        sent = stats["schema_chars_sent"] / max(stats["schema_chars_full"], 1)
+        click.echo(
+            f"Tool schemas: {sent:.0%} of the full size sent, ~{stats['tokens_saved_estimate']} tokens saved "
+            f"(groups: {', '.join(stats['active_groups'])})",
+            err=True,
+        )
+    if agent.input_compactor is not None and agent.input_compactor.calls_compacted:
+        stats = agent.input_compactor.stats()
+        click.echo(
+            f"History: {stats['calls_compacted']} file-write inputs compacted, "
+            f"{stats['chars_removed']} characters fewer per request",
+            err=True,
+        )
+    if agent.stop_reason is not None:
+        click.echo(f"Stopped early ({agent.stop_reason.kind}): {agent.stop_reason.message}", err=True)
+
+
+def budget_options(command: Any) -> Any:
+    """Options shared by run and chat: model, run budget, tool selection, sub-agents and history compaction."""
+    options = [
+        click.option("--model", default=DEFAULT_MODEL, show_default=True, envvar="BITTERAGENT_MODEL",
+                     help="provider/model, e.g. openai/qwen2.5-coder with OPENAI_BASE_URL for a local server"),
+        click.option("--deadline", type=float, envvar="BITTERAGENT_DEADLINE",
+                     help="Wall-clock budget in seconds; model and tool timeouts are clamped to the time left"),
+        click.option("--max-input-tokens", type=int, envvar="BITTERAGENT_MAX_INPUT_TOKENS",
+                     help="Stop once this many input tokens have been used"),
+        click.option("--max-output-tokens", type=int, envvar="BITTERAGENT_MAX_OUTPUT_TOKENS",
+                     help="Stop once this many output tokens have been used"),
+        click.option("--max-cost", type=float, envvar="BITTERAGENT_MAX_COST",
+                     help="Stop once the estimated cost reaches this many USD"),
+        click.option("--select-tools", is_flag=True, envvar="BITTERAGENT_SELECT_TOOLS",
+                     help="Send only the relevant tool groups each turn instead of every tool schema"),
+        click.option("--max-delegates", type=int, default=0, show_default=True, envvar="BITTERAGENT_MAX_DELEGATES",
+                     help="Sub-agents the delegate tool runs at once (0, the default, disables the tool)"),
+        click.option("--compact-inputs", type=int, default=0, show_default=True, envvar="BITTERAGENT_COMPACT_INPUTS",
+                     help="Stub out large file-write inputs this many turns after they succeed (0 keeps them)"),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+DEFAULT_MODEL = "anthropic/claude-sonnet-4-20250514"
+
+
+def create_provider(model: str, events: EventBus) -> Provider:
+    """Provider for ``provider/model``; a bare model name means Anthropic."""
+    provider_name, _, model_name = model.partition("/") if "/" in model else ("anthropic", "", model)
+
+    def text_callback(text: str) -> None:
+        # Streamed text goes to the event bus; publishing never waits on consumers
+        events.publish(TEXT_DELTA, text=text)
+
+    if provider_name == "openai":
+        # OPENAI_BASE_URL points at local vLLM/llama.cpp servers, which need no key
+        return OpenAIProvider(
+            model=model_name,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            rate_limiter=RateLimiter.from_env(),
+            text_callback=text_callback,
+        )
+    if provider_name != "anthropic":
+        raise click.UsageError(f"Unsupported provider: {provider_name} (use anthropic/<model> or openai/<model>)")
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise click.UsageError("ANTHROPIC_API_KEY environment variable is required")
+    return AnthropicProvider(
+        api_key=api_key,
+        model=model_name,
+        rate_limiter=RateLimiter.from_env(),
+        text_callback=text_callback,
+    )
 
 
-def build_registry() -> ToolRegistry:
+def build_registry(
+    spill_store: Optional[SpillStore] = None,
+    jobs: Optional[JobManager] = None,
+    provider: Optional[Provider] = None,
+    budget: Optional[RunBudget] = None,
+    max_delegates: int = 0,
+) -> ToolRegistry:
+    spill_store = spill_store or SpillStore()
+    limits = ResourceLimits.from_env()
+    jobs = jobs or JobManager(limits=limits)
     registry = ToolRegistry()
-    registry.register(ShellTool())
-    registry.register(ReadFileTool())
-    registry.register(WriteFileTool())
-    registry.register(EditFileTool())
+    registry.register(ShellTool(jobs, CommandExecutor(limits)), group="core")
+    registry.register(JobTool(jobs), group="jobs")
+    registry.register(ReadFileTool(), group="core")
+    # Keep batched reads small enough to be returned inline rather than spilled
+    registry.register(ReadFilesTool(max_bytes=spill_store.threshold * 9 // 10), group="navigation")
+    registry.register(WriteFileTool(), group="core")
+    registry.register(EditFileTool(), group="core")
+    registry.register(ApplyPatchTool(), group="patch")
+    registry.register(SearchTool(), group="core")
+    workspace_index = WorkspaceIndex(os.getcwd())
+    registry.register(WorkspaceTool(workspace_index), group="navigation")
+    registry.add_observer(workspace_index)
+    code_index = CodeIndex(os.getcwd())
+    registry.register(CodeSearchTool(code_index), group="navigation")
+    registry.add_observer(code_index)
+    registry.register(ReadOutputTool(spill_store), group="output")
+    checkpoints = CheckpointStore()
+    registry.register(CheckpointTool(checkpoints), group="checkpoint")
+    registry.add_observer(checkpoints)
+    if provider is not None and max_delegates > 0:
+        registry.register(
+            DelegateTool(provider, registry, max_concurrency=max_delegates, budget=budget, spill_store=spill_store),
+            group="delegate",
+        )
     return registry
 
 
+def create_tool_selector() -> ToolSelector:
+    """Send the core and navigation tools; add other groups once they become relevant."""
+    return ToolSelector(
+        always=("core", "navigation"),
+        triggers={"jobs": r"Started job \d+", "output": r'Saved as handle "out-\d+"'},
+        summaries={
+            "jobs": "poll, feed or kill background shell jobs",
+            "patch": "apply multi-file unified diffs",
+            "output": "page through large outputs saved to disk",
+            "checkpoint": "save file states and roll back edits",
+            "delegate": "run independent subtasks in parallel sub-agents",
+        },
+    )
+
+
 @click.group()
 def cli() -> None:
     """TinyAgent CLI."""
@@ -61,26 +204,94 @@ def cli() -> None:
 
 @cli.command()
 @click.argument("prompt")
-def run(prompt: str) -> None:
+@click.option("--max-turns", type=int, default=100, show_default=True, help="Stop after this many model turns")
+@click.option(
+    "--output-format", type=click.Choice(["text", "ndjson"]), default="text", show_default=True,
+    help="ndjson writes every agent event as a JSON line to stdout, for harnesses",
+)
+@budget_options
+def run(
+    prompt: str,
+    max_turns: int,
+    output_format: str,
+    model: str,
+    deadline: Optional[float],
+    max_input_tokens: Optional[int],
+    max_output_tokens: Optional[int],
+    max_cost: Optional[float],
+    select_tools: bool,
+    max_delegates: int,
+    compact_inputs: int,
+) -> None:
     """Run a single prompt and print the response."""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise click.UsageError("ANTHROPIC_API_KEY environment variable is required")
-    provider = AnthropicProvider(api_key=api_key)
-    agent = Agent(provider=provider, registry=build_registry(), tool_callback=create_tool_callback())
-    result = asyncio.run(agent.run(prompt))
-    print(f"\nAgent: {result}")
+    events = EventBus()
+    spill_store = SpillStore()
+    jobs = JobManager(limits=ResourceLimits.from_env())
+    provider = create_provider(model, events)
+    budget = RunBudget(deadline, max_input_tokens, max_output_tokens, max_cost)
+    agent = Agent(
+        provider=provider,
+        registry=build_registry(spill_store, jobs, provider, budget, max_delegates),
+        spill_store=spill_store,
+        events=events,
+        # Background jobs can change files behind the cache's back
+        tool_cache=ToolCache(bypass=lambda: bool(jobs.running())),
+        loop_guard=LoopGuard(max_turns=max_turns),
+        budget=budget,
+        tool_selector=create_tool_selector() if select_tools else None,
+        input_compactor=InputCompactor(after_turns=compact_inputs) if compact_inputs > 0 else None,
+    )
+
+    writer = NDJSONWriter(sys.stdout) if output_format == "ndjson" else ConsoleRenderer(sys.stdout)
+
+    async def run_and_close() -> str:
+        try:
+            return await run_with_consumers(events, [writer.consume], agent.run(prompt))
+        finally:
+            await agent.close()
+
+    try:
+        result = asyncio.run(run_and_close())
+    finally:
+        spill_store.close()
+    if output_format == "text":
+        print(f"\nAgent: {result}")
+    report_cache_stats(agent.tool_cache)
+    report_usage(agent)
 
 
 @cli.command()
-def chat() -> None:
+@click.option("--max-turns", type=int, default=100, show_default=True, help="Model turns allowed per message")
+@budget_options
+def chat(
+    max_turns: int,
+    model: str,
+    deadline: Optional[float],
+    max_input_tokens: Optional[int],
+    max_output_tokens: Optional[int],
+    max_cost: Optional[float],
+    select_tools: bool,
+    max_delegates: int,
+    compact_inputs: int,
+) -> None:
     """Start an interactive chat session."""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise click.UsageError("ANTHROPIC_API_KEY environment variable is required")
-    
-    provider = AnthropicProvider(api_key=api_key)
-    agent = Agent(provider=provider, registry=build_registry(), tool_callback=create_tool_callback())
+    events = EventBus()
+    spill_store = SpillStore()
+    jobs = JobManager(limits=ResourceLimits.from_env())
+    provider = create_provider(model, events)
+    # One budget for the whole session
+    budget = RunBudget(deadline, max_input_tokens, max_output_tokens, max_cost)
+    agent = Agent(
+        provider=provider,
+        registry=build_registry(spill_store, jobs, provider, budget, max_delegates),
+        spill_store=spill_store,
+        events=events,
+        tool_cache=ToolCache(bypass=lambda: bool(jobs.running())),
+        loop_guard=LoopGuard(max_turns=max_turns),
+        budget=budget,
+        tool_selector=create_tool_selector() if select_tools else None,
+        input_compactor=InputCompactor(after_turns=compact_inputs) if compact_inputs > 0 else None,
+    )
     
     print("Starting chat session (type 'exit' or 'quit' to end)")
     print("-" * 50)
@@ -96,13 +307,19 @@ def chat() -> None:
             if not user_input.strip():
                 continue
                 
-            result = asyncio.run(agent.run(user_input))
+            result = asyncio.run(
+                run_with_consumers(events, [ConsoleRenderer(sys.stdout).consume], agent.run(user_input))
+            )
             print(f"\nAgent: {result}")
         except (KeyboardInterrupt, EOFError):
             print("\nGoodbye!")
             break
         except Exception as e:
             print(f"\nError: {e}")
+    asyncio.run(agent.close())
+    spill_store.close()
+    report_cache_stats(agent.tool_cache)
+    report_usage(agent)
 
 
 @cli.command()
@@ -2,5 +2,6 @@
 
 from .base import ToolAdapter
 from .anthropic import AnthropicAdapter
+from .openai import OpenAIAdapter
 
-__all__ = ["ToolAdapter", "AnthropicAdapter"]
+__all__ = ["ToolAdapter", "AnthropicAdapter", "OpenAIAdapter"]
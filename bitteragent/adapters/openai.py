@@ -0,0 +1,21 @@
+"""OpenAI tool adapter."""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from .base import ToolAdapter
+from ..tools import Tool
+
+
+class OpenAIAdapter(ToolAdapter):
+    """Convert tools to the OpenAI chat-completions function schema."""
+
+    def to_schema(self, tool: Tool) -> Dict[str, Any]:
+        return {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters,
+            },
+        }
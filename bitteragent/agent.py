@@ -2,10 +2,18 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import time
 from typing import Any, Dict, List, Callable, Optional
 
+from .budget import RunBudget
+from .events import ERROR, RUN_END, TOOL_END, TOOL_START, TURN_START, USAGE, EventBus
+from .history import BlobStore, InputCompactor, MessageView
+from .loop_guard import LoopGuard, StopReason
 from .providers.base import Provider
-from .tools import ToolRegistry, run_tool, ToolResult
+from .spill import SpillStore
+from .tool_selection import ToolSelector
+from .tools import ToolCache, ToolRegistry, run_tool, ToolResult
 
 
 class Agent:
@@ -17,71 +25,235 @@ class Agent:
         registry: ToolRegistry, 
         system_prompt: str | None = None,
         tool_callback: Optional[Callable[[str, Dict[str, Any], Optional[ToolResult]], None]] = None,
-        text_callback: Optional[Callable[[str], None]] = None
+        text_callback: Optional[Callable[[str], None]] = None,
+        spill_store: Optional[SpillStore] = None,
+        tool_cache: Optional[ToolCache] = None,
+        loop_guard: Optional[LoopGuard] = None,
+        budget: Optional[RunBudget] = None,
+        events: Optional[EventBus] = None,
+        tool_selector: Optional[ToolSelector] = None,
+        blob_store: Optional[BlobStore] = None,
+        input_compactor: Optional[InputCompactor] = None,
     ) -> None:
         self.provider = provider
         self.registry = registry
         self.system_prompt = system_prompt
         self.messages: List[Dict[str, Any]] = []
+        # Providers get a live read-only view so the history is never copied per turn
+        self._message_view = MessageView(self.messages)
+        # Equal large strings in the history share one object; pass a store to share across agents
+        self.blob_store = blob_store if blob_store is not None else BlobStore()
+        # Stubs out large inputs of old successful file writes; None keeps the history verbatim
+        self.input_compactor = input_compactor
         self.tool_callback = tool_callback
         self.text_callback = text_callback
+        self.spill_store = spill_store
+        self.tool_cache = tool_cache
+        self.loop_guard = loop_guard if loop_guard is not None else LoopGuard()
+        # Always present so usage is tracked even without limits
+        self.budget = budget if budget is not None else RunBudget()
+        # Progress is published here; publishing without subscribers is free
+        self.events = events if events is not None else EventBus()
+        # Sends only the relevant tool groups each turn; None sends the whole registry
+        self.tool_selector = tool_selector
+        # Set when the last run was stopped before the model gave a final answer
+        self.stop_reason: Optional[StopReason] = None
+        # The provider's stop_reason for the latest response, e.g. "end_turn" or "max_tokens"
+        self.response_stop_reason: Optional[str] = None
+
+    async def close(self) -> None:
+        """Release tool resources such as background jobs, and provider connections."""
+        await self.registry.close()
+        await self.provider.close()
 
     async def run(self, user_input: str) -> str:
         """Run a single-turn conversation handling tool calls."""
-        self.messages.append({"role": "user", "content": user_input})
+        try:
+            text = await self._run(user_input)
+        except Exception as exc:
+            self.events.publish(ERROR, message=str(exc), exception=type(exc).__name__)
+            raise
+        stop = self.stop_reason
+        self.events.publish(
+            RUN_END,
+            text=text,
+            stop_reason=stop.kind if stop else None,
+            stop_message=stop.message if stop else None,
+            usage=self.budget.summary(),
+        )
+        return text
+
+    async def _run(self, user_input: str) -> str:
+        self.messages.append({"role": "user", "content": self.blob_store.intern(user_input)})
+        self.loop_guard.reset()
+        self.budget.start()
+        if self.tool_cache is not None:
+            # Files may have changed outside the agent since the last message, e.g. by the user
+            self.tool_cache.invalidate()
+        self.stop_reason = None
+        # Latest text from the model, returned as the partial result if the run is stopped
+        last_text = ""
+        full_schema_chars = 0
+        if self.tool_selector is not None:
+            self.tool_selector.observe_prompt(user_input)
+            full_schema_chars = len(json.dumps(self.provider.get_tools_schema(self.registry)))
         while True:
-            # Prepare messages with system prompt if available
-            messages_with_system = self.messages.copy()
-            if self.system_prompt:
-                messages_with_system.insert(0, {"role": "system", "content": self.system_prompt})
-            response = await self.provider.complete(messages_with_system, self.provider.get_tools_schema(self.registry))
+            exhausted = self.budget.exhausted()
+            if exhausted is not None:
+                return self._stop(StopReason("budget", exhausted, self.loop_guard.turns), last_text)
+            stop = self.loop_guard.start_turn()
+            if stop is not None:
+                return self._stop(stop, last_text)
+            self.events.publish(TURN_START, turn=self.loop_guard.turns)
+            if self.input_compactor is not None:
+                self.input_compactor.compact()
+            tools = self.registry
+            if self.tool_selector is not None:
+                tools = self.tool_selector.select(self.registry)
+            schema = self.provider.get_tools_schema(tools)
+            if self.tool_selector is not None:
+                self.tool_selector.record(schema, full_schema_chars)
+            try:
+                response = await asyncio.wait_for(
+                    self.provider.complete(self._message_view, schema, system=self.system_prompt),
+                    timeout=self.budget.clamp(None),
+                )
+            except asyncio.TimeoutError:
+                reason = "wall-clock deadline reached while waiting for the model"
+                return self._stop(StopReason("budget", reason, self.loop_guard.turns), last_text)
+            self.budget.record(response.get("usage"), getattr(self.provider, "model", None))
+            self.events.publish(USAGE, request=response.get("usage") or {}, total=self.budget.summary())
             content = response.get("content", [])
-            self.messages.append({"role": "assistant", "content": content})
+            input_errors = response.get("tool_input_errors", {})
+            self.response_stop_reason = response.get("stop_reason")
+            self.messages.append({"role": "assistant", "content": self.blob_store.intern_content(content)})
+            texts = [c.get("text", "") for c in content if c.get("type") == "text"]
+            if any(texts):
+                last_text = "".join(texts)
             tool_calls = [c for c in content if c.get("type") == "tool_use"]
             if not tool_calls:
-                texts = [c.get("text", "") for c in content if c.get("type") == "text"]
                 return "".join(texts)
             
             # Execute tools one by one for immediate feedback
             tool_results = []
+            # (name, params, success, content) of each call, for the loop guard
+            outcomes = []
+            # Indices of outcomes that only waited on work in progress
+            waiting = set()
             
             for tool_use in tool_calls:
                 tool_name = tool_use.get("name", "unknown")
                 params = tool_use.get("input", {})
                 
                 # Show tool call immediately when we encounter it
-                if self.tool_callback:
-                    self.tool_callback(tool_name, params, None)  # None indicates start of execution
+                self._tool_started(tool_use, params)
+                started = time.perf_counter()
                 
-                tool = self.registry.get(tool_name)
-                if tool is None:
+                # Tools of groups that were not sent still run if the model calls them
+                tool = tools.get(tool_name) or self.registry.get(tool_name)
+                input_error = input_errors.get(tool_use.get("id"))
+                remaining = self.budget.remaining()
+                if remaining is not None and remaining <= 0:
+                    # Every tool_use still needs a result for the history to stay valid
+                    message = "Tool call not executed: the run's time budget ran out"
+                    self._tool_finished(tool_use, params, ToolResult(success=False, error=message), started)
+                    tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": tool_use.get("id"),
+                        "content": message,
+                    })
+                    outcomes.append((tool_name, params, False, message))
+                elif input_error is not None:
+                    # Truncated or malformed arguments - report instead of running with {}
+                    message = f"Tool call not executed: {input_error}. Resend the call with complete arguments."
+                    if self.response_stop_reason == "max_tokens":
+                        message += (
+                            " The response hit the output token limit; split large content across"
+                            " several smaller calls (e.g. write the first part, then append with edits)."
+                        )
+                    self._tool_finished(tool_use, params, ToolResult(success=False, error=message), started)
+                    tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": tool_use.get("id"),
+                        "content": message,
+                    })
+                    outcomes.append((tool_name, params, False, message))
+                elif tool is None:
                     # Unknown tool - show result immediately
-                    unknown_result = ToolResult(success=False, error="unknown tool")
-                    if self.tool_callback:
-                        self.tool_callback(tool_name, params, unknown_result)
+                    self._tool_finished(tool_use, params, ToolResult(success=False, error="unknown tool"), started)
                     tool_results.append({
                         "type": "tool_result",
                         "tool_use_id": tool_use.get("id"),
                         "content": "unknown tool",
                     })
+                    outcomes.append((tool_name, params, False, "unknown tool"))
                 else:
                     # Execute tool immediately and show result
-                    result = await run_tool(tool, params)
+                    result = await run_tool(
+                        tool, params, cache=self.tool_cache, observers=self.registry.observers,
+                        timeout=self.budget.clamp(None),
+                    )
                     
-                    # Show tool result via callback immediately
-                    if self.tool_callback:
-                        self.tool_callback(tool_name, params, result)
+                    # Show tool result immediately
+                    self._tool_finished(tool_use, params, result, started)
                     
                     content = result.output if result.success else result.error or ""
+                    if self.input_compactor is not None and result.success:
+                        self.input_compactor.track(tool_use, tool)
+                    if result.metadata.get("waiting"):
+                        waiting.add(len(outcomes))
+                    outcomes.append((tool_name, params, result.success, content))
+                    if self.spill_store is not None:
+                        # Keep oversized outputs out of the history that is resent every turn
+                        content = self.spill_store.maybe_spill(content)
                     tool_results.append({
                         "type": "tool_result",
                         "tool_use_id": tool_use.get("id"),
                         "content": content,
                     })
             
+            # Polling a quiet background job repeats itself without being stuck
+            self.loop_guard.record([outcome for i, outcome in enumerate(outcomes) if i not in waiting])
+            if self.tool_selector is not None:
+                self.tool_selector.observe(self.registry, tool_calls, [outcome[3] for outcome in outcomes])
+            notice, stop = self.loop_guard.check()
+            if notice is not None:
+                tool_results.append({"type": "text", "text": notice})
+
             # Add all tool results as a single user message
             if tool_results:
                 self.messages.append({
                     "role": "user",
-                    "content": tool_results
+                    "content": self.blob_store.intern_content(tool_results)
                 })
+            if stop is not None:
+                return self._stop(stop, last_text)
+
+    def _tool_started(self, tool_use: Dict[str, Any], params: Dict[str, Any]) -> None:
+        name = tool_use.get("name", "unknown")
+        if self.tool_callback:
+            self.tool_callback(name, params, None)  # None indicates start of execution
+        # Parameters are passed by reference; consumers truncate them when rendering
+        self.events.publish(TOOL_START, id=tool_use.get("id"), name=name, params=params)
+
+    def _tool_finished(
+        self, tool_use: Dict[str, Any], params: Dict[str, Any], result: ToolResult, started: float
+    ) -> None:
+        name = tool_use.get("name", "unknown")
+        if self.tool_callback:
+            self.tool_callback(name, params, result)
+        self.events.publish(
+            TOOL_END,
+            id=tool_use.get("id"),
+            name=name,
+            success=result.success,
+            output=result.output,
+            error=result.error,
+            metadata=result.metadata,
+            duration=round(time.perf_counter() - started, 3),
+        )
+
+    def _stop(self, reason: StopReason, text: str) -> str:
+        self.stop_reason = reason
+        note = f"[Stopped after {reason.turns} turns: {reason.message}]"
+        return f"{text}\n\n{note}" if text else note
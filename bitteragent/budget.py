@@ -0,0 +1,142 @@
+"""Run-level budgets for wall-clock time, tokens and cost."""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+# USD per million (input, output) tokens, matched by model name prefix.
+# Cache writes cost 1.25x and cache reads 0.1x the input price.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-haiku-4": (1.0, 5.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+
+
+def model_price(model: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Price per million input and output tokens, or None if unknown."""
+    if not model:
+        return None
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_PRICES[prefix]
+    return None
+
+
+class RunBudget:
+    """Limits on a whole agent run, and the usage counted against them.
+
+    The clock starts on the first call to :meth:`start`, so one budget can
+    span several runs of an interactive session. ``reserve`` seconds are
+    held back from every timeout so the agent can still finish cleanly
+    before the deadline. A limit of None is unlimited.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        reserve: float = 5.0,
+    ) -> None:
+        self.deadline = deadline
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_cost = max_cost
+        self.reserve = reserve
+        self.started: Optional[float] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_creation_tokens = 0
+        self.cache_read_tokens = 0
+        self.cost = 0.0
+        self.requests = 0
+        # Models whose usage could not be priced
+        self.unpriced: Set[str] = set()
+
+    def start(self) -> None:
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline minus the reserve, or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return self.deadline - self.elapsed() - self.reserve
+
+    def clamp(self, timeout: Optional[float]) -> Optional[float]:
+        """``timeout`` reduced to the time left; None stays None without a deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        remaining = max(remaining, 0.0)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def record(self, usage: Optional[Dict[str, Any]], model: Optional[str] = None) -> None:
+        """Count the usage reported for one provider request."""
+        self.requests += 1
+        if not usage:
+            return
+        input_tokens = usage.get("input_tokens") or 0
+        output_tokens = usage.get("output_tokens") or 0
+        cache_creation = usage.get("cache_creation_input_tokens") or 0
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cache_creation_tokens += cache_creation
+        self.cache_read_tokens += cache_read
+        price = model_price(model)
+        if price is None:
+            if model:
+                self.unpriced.add(model)
+            return
+        input_price, output_price = price
+        self.cost += (
+            input_tokens * input_price
+            + cache_creation * input_price * 1.25
+            + cache_read * input_price * 0.1
+            + output_tokens * output_price
+        ) / 1_000_000
+
+    def absorb(self, other: "RunBudget") -> None:
+        """Add the usage counted by another budget, e.g. a sub-agent's."""
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_creation_tokens += other.cache_creation_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.cost += other.cost
+        self.unpriced |= other.unpriced
+
+    def exhausted(self) -> Optional[str]:
+        """Which limit has been reached, if any."""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            return f"wall-clock deadline of {self.deadline:g}s reached"
+        total_input = self.input_tokens + self.cache_creation_tokens + self.cache_read_tokens
+        if self.max_input_tokens is not None and total_input >= self.max_input_tokens:
+            return f"input token budget of {self.max_input_tokens} used ({total_input})"
+        if self.max_output_tokens is not None and self.output_tokens >= self.max_output_tokens:
+            return f"output token budget of {self.max_output_tokens} used ({self.output_tokens})"
+        if self.max_cost is not None and self.cost >= self.max_cost:
+            return f"cost budget of ${self.max_cost:.2f} used (${self.cost:.2f})"
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "elapsed": round(self.elapsed(), 3),
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_creation_input_tokens": self.cache_creation_tokens,
+            "cache_read_input_tokens": self.cache_read_tokens,
+            "cost": round(self.cost, 6),
+        }
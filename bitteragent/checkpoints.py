@@ -0,0 +1,244 @@
+"""Workspace checkpoints from pre-images of files changed through tools."""
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .tools import Tool, ToolObserver, ToolResult
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+# Linux ioctl that clones a file's extents (copy-on-write) on btrfs, XFS, bcachefs, ...
+FICLONE = 0x40049409
+
+# (inode, size, mtime) identifying a file's content without reading it
+_FileKey = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class PreImage:
+    """A saved copy of a file's content and permission bits."""
+    object_path: str
+    mode: int
+
+
+@dataclass
+class Change:
+    """Pre-images of the files one tool call modified; None means the file did not exist."""
+    seq: int
+    tool: str
+    files: Dict[str, Optional[PreImage]]
+    keys: Dict[str, Optional[_FileKey]] = field(default_factory=dict)
+    time: float = field(default_factory=time.time)
+
+
+@dataclass
+class Checkpoint:
+    """A named point in the change journal."""
+    id: int
+    label: str
+    position: int
+    time: float = field(default_factory=time.time)
+
+
+def _file_key(path: str) -> Optional[_FileKey]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class CheckpointStore(ToolObserver):
+    """Journal of file pre-images recorded before every file-modifying tool call.
+
+    Before a tool that reports its modified paths runs, the current content
+    of each of those files is saved, so the cost of a change is the size of
+    the files it touches, never the size of the workspace. Copies are
+    reflinks (copy-on-write clones) where the filesystem supports them, and
+    otherwise content-addressed objects, so identical pre-images are stored
+    once. Hardlinks are not used: the file tools rewrite files in place,
+    which would change a hardlinked pre-image along with the file.
+
+    A checkpoint is a named position in the journal; rolling back restores
+    every file changed since then, in one step. Calls with unknown side
+    effects (e.g. shell commands) are not recorded.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ignore_tools: Tuple[str, ...] = ("checkpoint",)) -> None:
+        self._directory = directory
+        self._owns_directory = directory is None
+        self.ignore_tools = ignore_tools
+        self.changes: List[Change] = []
+        self.checkpoints: List[Checkpoint] = []
+        self._next_seq = 1
+        self._next_checkpoint = 1
+        self._next_object = 1
+        # None until the first clone attempt shows whether the filesystem supports reflinks
+        self._reflink: Optional[bool] = None if fcntl is not None else False
+        # Objects already holding a file's current content, to avoid saving it twice
+        self._saved: Dict[_FileKey, PreImage] = {}
+        self.bytes_copied = 0
+        self.reflinks = 0
+
+    @property
+    def directory(self) -> str:
+        """Object directory, created on first use."""
+        if self._directory is None:
+            # Prefer the cache directory: /tmp is often tmpfs, which cannot share extents with the workspace
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            try:
+                os.makedirs(os.path.join(base, "bitteragent"), exist_ok=True)
+                self._directory = tempfile.mkdtemp(prefix="checkpoints-", dir=os.path.join(base, "bitteragent"))
+            except OSError:
+                self._directory = tempfile.mkdtemp(prefix="bitteragent-checkpoints-")
+        return self._directory
+
+    # Recording
+
+    def before_tool(self, tool: Tool, params: Dict[str, object]) -> None:
+        if tool.name in self.ignore_tools:
+            return
+        paths = tool.modified_paths(params)
+        if not paths:
+            return
+        change = Change(self._next_seq, tool.name, {})
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in change.files:
+                change.keys[path] = _file_key(path)
+                change.files[path] = self._save(path, change.keys[path])
+        self._next_seq += 1
+        self.changes.append(change)
+
+    def after_tool(self, tool: Tool, params: Dict[str, object], result: ToolResult) -> None:
+        # Failed calls usually write nothing; forget them so rollbacks count real changes
+        if result.success or not self.changes or self.changes[-1].tool != tool.name:
+            return
+        change = self.changes[-1]
+        if all(_file_key(path) == key for path, key in change.keys.items()):
+            self.changes.pop()
+
+    def _save(self, path: str, key: Optional[_FileKey]) -> Optional[PreImage]:
+        if key is None:
+            return None
+        saved = self._saved.get(key)
+        if saved is not None and os.path.exists(saved.object_path):
+            return saved
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        object_path = self._clone(path)
+        if object_path is None:
+            object_path = self._store_copy(path)
+        saved = self._saved[key] = PreImage(object_path, mode)
+        return saved
+
+    def _clone(self, path: str) -> Optional[str]:
+        if self._reflink is False:
+            return None
+        target = os.path.join(self.directory, f"clone-{self._next_object}")
+        try:
+            _reflink(path, target)
+        except OSError as exc:
+            if exc.errno in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS):
+                self._reflink = False
+            return None
+        self._reflink = True
+        self._next_object += 1
+        self.reflinks += 1
+        return target
+
+    def _store_copy(self, path: str) -> str:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = os.path.join(self.directory, digest[:2], digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            temp = f"{object_path}.tmp"
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, object_path)
+            self.bytes_copied += len(data)
+        return object_path
+
+    # Checkpoints
+
+    def create(self, label: Optional[str] = None) -> Checkpoint:
+        checkpoint = Checkpoint(self._next_checkpoint, label or f"cp-{self._next_checkpoint}", len(self.changes))
+        self._next_checkpoint += 1
+        self.checkpoints.append(checkpoint)
+        return checkpoint
+
+    def find(self, target: str) -> Checkpoint:
+        """Checkpoint by label or id (``3`` or ``cp-3``); the latest one wins."""
+        for checkpoint in reversed(self.checkpoints):
+            if target in (checkpoint.label, str(checkpoint.id), f"cp-{checkpoint.id}"):
+                return checkpoint
+        known = ", ".join(c.label for c in self.checkpoints) or "none"
+        raise KeyError(f"Unknown checkpoint: {target} (available: {known})")
+
+    def changed_since(self, position: int) -> List[str]:
+        paths: Dict[str, None] = {}
+        for change in self.changes[position:]:
+            paths.update(dict.fromkeys(change.files))
+        return list(paths)
+
+    def rollback(self, position: int) -> List[Tuple[str, str]]:
+        """Restore every file changed after journal ``position``; returns (path, action) pairs."""
+        position = max(position, 0)
+        # The earliest pre-image after the position is the file's state at that point
+        originals: Dict[str, Optional[PreImage]] = {}
+        for change in reversed(self.changes[position:]):
+            originals.update(change.files)
+        restored = []
+        for path, image in sorted(originals.items()):
+            if image is None:
+                if os.path.lexists(path):
+                    os.remove(path)
+                    restored.append((path, "deleted"))
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Copy into place so the saved object stays intact for later rollbacks
+            temp = f"{path}.bitteragent-restore"
+            try:
+                _reflink(image.object_path, temp)
+            except OSError:
+                shutil.copyfile(image.object_path, temp)
+            os.chmod(temp, image.mode)
+            os.replace(temp, path)
+            restored.append((path, "restored"))
+        del self.changes[position:]
+        self.checkpoints = [c for c in self.checkpoints if c.position <= position]
+        return restored
+
+    def close(self) -> None:
+        if self._owns_directory and self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._saved.clear()
+
+
+def _reflink(source: str, target: str) -> None:
+    """Clone ``source`` to ``target`` without copying data, or raise OSError."""
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "reflinks are not supported on this platform")
+    with open(source, "rb") as src:
+        try:
+            with open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+            raise
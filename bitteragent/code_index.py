@@ -0,0 +1,529 @@
+"""On-disk inverted index for ranked code search."""
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .tools import Tool, ToolObserver, ToolResult
+from .walk import FileEntry, walk
+from .workspace import default_cache_path
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+_MAGIC = b"BAIDX\x00\x00\x01"
+_HEADER_LENGTH = struct.Struct("<Q")
+
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{1,63}")
+_SUBTOKEN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+# Terms from a file's path count as if they appeared this many times in it
+_PATH_WEIGHT = 3
+_MAX_FILE_SIZE = 1024 * 1024
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+assert array("I").itemsize == 4
+
+
+@lru_cache(maxsize=65536)
+def _expand(token: str) -> Tuple[str, ...]:
+    terms = {token.lower()}
+    parts = _SUBTOKEN.findall(token)
+    if len(parts) > 1:
+        # getUserName and get_user_name both match a query for "user"
+        terms.update(part.lower() for part in parts if len(part) > 1)
+    return tuple(terms)
+
+
+def tokenize(text: str) -> Dict[str, int]:
+    """Count identifier terms, including camelCase and snake_case parts."""
+    counts: Dict[str, int] = {}
+    get = counts.get
+    for token, count in Counter(_TOKEN.findall(text)).items():
+        for term in _expand(token):
+            counts[term] = get(term, 0) + count
+    return counts
+
+
+class _Segment:
+    """Immutable index segment stored as flat uint32 arrays and read via mmap.
+
+    Layout: magic, header length, JSON header (documents and section
+    offsets), then the term offset, postings offset, postings, document
+    length and term text sections. Postings are (doc, tf) pairs sorted by
+    document; terms are sorted by their UTF-8 bytes for binary search.
+    """
+
+    def __init__(self, header: Dict[str, Any], mm: Optional[mmap.mmap] = None, data_start: int = 0) -> None:
+        self.generation: int = header.get("generation", 0)
+        self.docs: List[Tuple[str, int, int]] = [tuple(doc) for doc in header.get("docs", [])]
+        self.total_length: int = header.get("total_length", 0)
+        self.n_terms: int = header.get("n_terms", 0)
+        self._mm = mm
+        self._views: List[memoryview] = []
+        sections = header.get("sections", {})
+        self._term_offsets = self._section(sections, "term_offsets", data_start)
+        self._postings_offsets = self._section(sections, "postings_offsets", data_start)
+        self._postings = self._section(sections, "postings", data_start)
+        self.lengths = self._section(sections, "lengths", data_start)
+        start, _ = sections.get("terms", (0, 0))
+        self._terms_start = data_start + start
+
+    def _section(self, sections: Dict[str, List[int]], name: str, data_start: int) -> Sequence[int]:
+        if self._mm is None or name not in sections:
+            return ()
+        start, length = sections[name]
+        view = memoryview(self._mm)[data_start + start:data_start + start + length].cast("I")
+        self._views.append(view)
+        return view
+
+    @classmethod
+    def open(cls, path: str, root: str) -> Optional["_Segment"]:
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    return None
+                (header_length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+                header = json.loads(f.read(header_length))
+                if header.get("root") != root or header.get("byteorder") != sys.byteorder:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            return None
+        return cls(header, mm, header["data_start"])
+
+    @staticmethod
+    def write(
+        path: str,
+        root: str,
+        docs: List[Tuple[str, int, int]],
+        lengths: array,
+        postings: Dict[str, array],
+    ) -> None:
+        encoded = sorted((term.encode("utf-8"), term) for term in postings)
+        term_offsets = array("I", [0])
+        postings_offsets = array("I", [0])
+        blob = array("I")
+        text = bytearray()
+        for key, term in encoded:
+            text += key
+            term_offsets.append(len(text))
+            blob.extend(postings[term])
+            postings_offsets.append(len(blob))
+
+        sections: Dict[str, List[int]] = {}
+        position = 0
+        payload = []
+        for name, data in (
+            ("term_offsets", term_offsets.tobytes()),
+            ("postings_offsets", postings_offsets.tobytes()),
+            ("postings", blob.tobytes()),
+            ("lengths", lengths.tobytes()),
+            ("terms", bytes(text)),
+        ):
+            sections[name] = [position, len(data)]
+            payload.append(data)
+            position += len(data)
+        header = {
+            "version": INDEX_VERSION,
+            "root": root,
+            "byteorder": sys.byteorder,
+            "generation": time.time_ns(),
+            "docs": docs,
+            "total_length": sum(lengths),
+            "n_terms": len(encoded),
+            "sections": sections,
+            "data_start": 0,
+        }
+        # The header records where the data starts, so size it with a fixed-width placeholder
+        prefix = len(_MAGIC) + _HEADER_LENGTH.size
+        header["data_start"] = 10 ** 15
+        header_length = len(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+        header["data_start"] = (prefix + header_length + 7) // 8 * 8
+        raw_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        raw_header += b" " * (header["data_start"] - prefix - len(raw_header))
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(raw_header)))
+            f.write(raw_header)
+            for data in payload:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+    def _term(self, index: int) -> bytes:
+        offsets = self._term_offsets
+        return self._mm[self._terms_start + offsets[index]:self._terms_start + offsets[index + 1]]
+
+    def postings(self, term: str) -> Sequence[int]:
+        """Flat (doc, tf, doc, tf, ...) postings for a term."""
+        if not self.n_terms:
+            return ()
+        key = term.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and self._term(lo) == key:
+            return self._postings[self._postings_offsets[lo]:self._postings_offsets[lo + 1]]
+        return ()
+
+    def items(self) -> Iterator[Tuple[str, Sequence[int]]]:
+        for index in range(self.n_terms):
+            postings = self._postings[self._postings_offsets[index]:self._postings_offsets[index + 1]]
+            yield self._term(index).decode("utf-8"), postings
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # A caller still holds a postings slice; the map is released with it
+                pass
+            self._mm = None
+
+
+class CodeIndex(ToolObserver):
+    """BM25-ranked inverted index over the identifiers in a workspace.
+
+    The index is a compact on-disk base segment plus a small delta of files
+    that changed since it was written (kept in a JSON sidecar, with
+    tombstones for the superseded base documents). The delta is merged into
+    a new base segment once it grows past ``compact_ratio`` of the corpus.
+    Like the workspace index, it is built lazily on first query and kept
+    current from the paths tools report as modified.
+    """
+
+    def __init__(
+        self,
+        root: str = ".",
+        index_path: Optional[str] = None,
+        max_file_size: int = _MAX_FILE_SIZE,
+        compact_ratio: float = 0.1,
+        min_compact: int = 1000,
+        workers: int = 8,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or default_cache_path(self.root, "code-index", "idx")
+        self.delta_path = self.index_path + ".delta"
+        self.max_file_size = max_file_size
+        self.compact_ratio = compact_ratio
+        self.min_compact = min_compact
+        self.workers = workers
+        self._segment = _Segment({})
+        self._doc_ids: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+        # rel -> (size, mtime_ns, term counts)
+        self._delta: Dict[str, Tuple[int, int, Dict[str, int]]] = {}
+        self._loaded = False
+        self._dirty = False
+        self._pending: Set[str] = set()
+
+    # Storage
+
+    def _set_segment(self, segment: _Segment) -> None:
+        self._segment.close()
+        self._segment = segment
+        self._doc_ids = {doc[0]: doc_id for doc_id, doc in enumerate(segment.docs)}
+
+    def _load(self) -> None:
+        segment = _Segment.open(self.index_path, self.root)
+        if segment is None:
+            return
+        self._set_segment(segment)
+        try:
+            with open(self.delta_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("generation") != segment.generation:
+            return
+        self._delta = {rel: (size, mtime_ns, counts) for rel, (size, mtime_ns, counts) in data["docs"].items()}
+        self._deleted = set(data["deleted"])
+
+    def _save_delta(self) -> None:
+        data = {
+            "generation": self._segment.generation,
+            "docs": self._delta,
+            "deleted": sorted(self._deleted),
+        }
+        try:
+            tmp_path = f"{self.delta_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.delta_path)
+        except OSError as exc:
+            logger.warning("Could not save code index delta: %s", exc)
+
+    def compact(self) -> None:
+        """Merge the delta into a new base segment."""
+        base = self._segment
+        docs: List[Tuple[str, int, int]] = []
+        lengths = array("I")
+        remap: Dict[int, int] = {}
+        for doc_id, doc in enumerate(base.docs):
+            if doc_id not in self._deleted:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+                lengths.append(base.lengths[doc_id])
+
+        postings: Dict[str, array] = {}
+        for term, entries in base.items():
+            if not self._deleted:
+                merged = array("I")
+                merged.frombytes(entries)
+            else:
+                merged = array("I")
+                for i in range(0, len(entries), 2):
+                    new_id = remap.get(entries[i])
+                    if new_id is not None:
+                        merged.append(new_id)
+                        merged.append(entries[i + 1])
+            if merged:
+                postings[term] = merged
+        # Delta documents get the highest ids, so appending keeps postings sorted
+        added: Dict[str, List[int]] = {}
+        for rel in sorted(self._delta):
+            size, mtime_ns, counts = self._delta[rel]
+            doc_id = len(docs)
+            docs.append((rel, size, mtime_ns))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                entries = added.get(term)
+                if entries is None:
+                    added[term] = [doc_id, count]
+                else:
+                    entries += (doc_id, count)
+        for term, entries in added.items():
+            merged = postings.get(term)
+            if merged is None:
+                postings[term] = array("I", entries)
+            else:
+                merged.extend(entries)
+
+        try:
+            _Segment.write(self.index_path, self.root, docs, lengths, postings)
+        except OSError as exc:
+            logger.warning("Could not save code index: %s", exc)
+            return
+        segment = _Segment.open(self.index_path, self.root)
+        if segment is None:
+            return
+        self._set_segment(segment)
+        self._delta = {}
+        self._deleted = set()
+        try:
+            os.remove(self.delta_path)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        self._segment.close()
+        self._segment = _Segment({})
+        self._loaded = False
+
+    # Maintenance
+
+    def _state(self, rel: str) -> Optional[Tuple[int, int]]:
+        if rel in self._delta:
+            size, mtime_ns, _ = self._delta[rel]
+            return (size, mtime_ns)
+        doc_id = self._doc_ids.get(rel)
+        if doc_id is None or doc_id in self._deleted:
+            return None
+        _, size, mtime_ns = self._segment.docs[doc_id]
+        return (size, mtime_ns)
+
+    def _live_paths(self) -> Iterator[str]:
+        for doc_id, doc in enumerate(self._segment.docs):
+            if doc_id not in self._deleted and doc[0] not in self._delta:
+                yield doc[0]
+        yield from self._delta
+
+    def _read_terms(self, entry: FileEntry) -> Optional[Dict[str, int]]:
+        if entry.size > self.max_file_size:
+            return None
+        try:
+            with open(entry.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\0" in data[:8192]:
+            return None
+        counts = tokenize(data.decode("utf-8", errors="replace"))
+        for term, count in tokenize(entry.rel).items():
+            counts[term] = counts.get(term, 0) + count * _PATH_WEIGHT
+        return counts
+
+    def _apply(self, entries: List[FileEntry], removed: Iterable[str]) -> int:
+        changed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for entry, counts in zip(entries, executor.map(self._read_terms, entries)):
+                self._remove(entry.rel)
+                if counts is not None:
+                    self._delta[entry.rel] = (entry.size, entry.mtime_ns, counts)
+                changed += 1
+        for rel in removed:
+            self._remove(rel)
+            changed += 1
+        if changed:
+            threshold = max(self.min_compact, self.compact_ratio * len(self._segment.docs))
+            if not self._segment.docs or len(self._delta) + len(self._deleted) > threshold:
+                self.compact()
+            else:
+                self._save_delta()
+        return changed
+
+    def _remove(self, rel: str) -> None:
+        self._delta.pop(rel, None)
+        doc_id = self._doc_ids.get(rel)
+        if doc_id is not None:
+            self._deleted.add(doc_id)
+
+    def refresh(self) -> int:
+        """Rescan the tree and re-index changed files; return the number changed."""
+        seen: Set[str] = set()
+        changed: List[FileEntry] = []
+        for entry in walk(self.root, workers=self.workers):
+            seen.add(entry.rel)
+            if self._state(entry.rel) != (entry.size, entry.mtime_ns):
+                changed.append(entry)
+        removed = [rel for rel in self._live_paths() if rel not in seen]
+        self._dirty = False
+        self._pending.clear()
+        return self._apply(changed, removed)
+
+    def update_paths(self, paths: Iterable[str]) -> None:
+        """Re-index specific files, e.g. after they were written by a tool."""
+        entries: List[FileEntry] = []
+        removed: List[str] = []
+        for path in paths:
+            absolute = os.path.abspath(os.path.join(self.root, path))
+            if not absolute.startswith(self.root + os.sep):
+                continue
+            rel = os.path.relpath(absolute, self.root).replace(os.sep, "/")
+            try:
+                st = os.stat(absolute)
+            except OSError:
+                if self._state(rel) is not None:
+                    removed.append(rel)
+                continue
+            if self._state(rel) != (st.st_size, st.st_mtime_ns):
+                entries.append(FileEntry(absolute, rel, st.st_size, st.st_mtime_ns))
+        self._apply(entries, removed)
+
+    def ensure_current(self) -> None:
+        """Bring the index up to date before answering a query."""
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+            self.refresh()
+        elif self._dirty:
+            self.refresh()
+        elif self._pending:
+            pending = list(self._pending)
+            self._pending.clear()
+            self.update_paths(pending)
+
+    def after_tool(self, tool: Tool, params: Dict[str, Any], result: ToolResult) -> None:
+        paths = tool.modified_paths(params)
+        if paths is None:
+            self._dirty = True
+        elif paths:
+            self._pending.update(paths)
+
+    # Queries
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        path: str = "",
+        snippets: int = 3,
+    ) -> Tuple[List[Tuple[str, float, List[Tuple[int, str]]]], int]:
+        """Rank files for a query; return (rel, score, snippet lines) and the match count."""
+        self.ensure_current()
+        terms = list(tokenize(query))
+        if not terms:
+            return [], 0
+        prefix = path.strip("/")
+        prefix = "" if prefix == "." else prefix + "/" if prefix else ""
+
+        segment = self._segment
+        deleted = self._deleted
+        n_docs = len(segment.docs) - len(deleted) + len(self._delta)
+        if n_docs <= 0:
+            return [], 0
+        total_length = segment.total_length - sum(segment.lengths[doc_id] for doc_id in deleted)
+        delta_lengths = {rel: sum(counts.values()) for rel, (_, _, counts) in self._delta.items()}
+        average_length = max((total_length + sum(delta_lengths.values())) / n_docs, 1.0)
+
+        # Base documents are scored by id, delta documents by path
+        scores: Dict[Any, float] = {}
+        weights: Dict[str, float] = {}
+        for term in terms:
+            entries = segment.postings(term)
+            delta_hits = [(rel, counts[term]) for rel, (_, _, counts) in self._delta.items() if term in counts]
+            df = len(entries) // 2 + len(delta_hits)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            weights[term] = idf
+            lengths = segment.lengths
+            for doc_id, tf in zip(entries[::2], entries[1::2]):
+                if doc_id in deleted:
+                    continue
+                norm = _K1 * (1 - _B + _B * lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (_K1 + 1) / (tf + norm)
+            for rel, tf in delta_hits:
+                norm = _K1 * (1 - _B + _B * delta_lengths[rel] / average_length)
+                scores[rel] = scores.get(rel, 0.0) + idf * tf * (_K1 + 1) / (tf + norm)
+
+        def rel_of(key: Any) -> str:
+            return key if isinstance(key, str) else segment.docs[key][0]
+
+        if prefix:
+            scores = {key: score for key, score in scores.items() if rel_of(key).startswith(prefix)}
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        results = [
+            (rel_of(key), score, self._snippets(rel_of(key), weights, snippets))
+            for key, score in ranked
+        ]
+        return results, len(scores)
+
+    def _snippets(self, rel: str, weights: Dict[str, float], count: int) -> List[Tuple[int, str]]:
+        try:
+            with open(os.path.join(self.root, rel), "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+        scored: List[Tuple[float, int]] = []
+        for number, line in enumerate(lines, 1):
+            score = sum(weights.get(term, 0.0) for term in tokenize(line))
+            if score > 0:
+                scored.append((score, -number))
+        best = sorted(-number for _, number in heapq.nlargest(count, scored))
+        return [(number, lines[number - 1].strip()[:300]) for number in best]
@@ -0,0 +1,245 @@
+"""Asynchronous agent event stream."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, TextIO, Union
+
+# Event types published by the agent
+TURN_START = "turn_start"
+TEXT_DELTA = "text_delta"
+TOOL_START = "tool_start"
+TOOL_END = "tool_end"
+USAGE = "usage"
+ERROR = "error"
+RUN_END = "run_end"
+# Synthesized for a subscriber that fell behind
+DROPPED = "dropped"
+
+
+@dataclass
+class Event:
+    """One agent event; ``data`` holds references, never copies, of payloads."""
+    type: str
+    data: Dict[str, Any]
+    seq: int = 0
+    time: float = field(default_factory=time.time)
+
+    def to_dict(self, max_chars: Optional[int] = None) -> Dict[str, Any]:
+        """JSON-ready form with long strings truncated to ``max_chars``."""
+        data = truncate(self.data, max_chars) if max_chars is not None else self.data
+        return {"type": self.type, "seq": self.seq, "time": round(self.time, 3), **data}
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Copy of ``value`` with strings longer than ``max_chars`` shortened."""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return f"{value[:max_chars]}... [{len(value) - max_chars} more chars]"
+    if isinstance(value, dict):
+        return {key: truncate(item, max_chars) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(item, max_chars) for item in value]
+    return value
+
+
+class _TextRun:
+    """Text deltas merged while waiting in a queue; keeps the first one's seq and time."""
+    __slots__ = ("seq", "time", "parts")
+
+    def __init__(self, event: Event) -> None:
+        self.seq = event.seq
+        self.time = event.time
+        self.parts = [event.data["text"]]
+
+    def event(self) -> Event:
+        return Event(TEXT_DELTA, {"text": "".join(self.parts)}, self.seq, self.time)
+
+
+class Subscription:
+    """Bounded queue of events for one consumer.
+
+    Adjacent text deltas are merged while they wait. When the queue is full
+    the oldest event is dropped, and the consumer is told how many it missed,
+    so a slow consumer never holds up the publisher.
+    """
+
+    def __init__(self, maxsize: int, types: Optional[Iterable[str]]) -> None:
+        self.maxsize = max(maxsize, 1)
+        self.types = frozenset(types) if types is not None else None
+        self._items: Deque[Union[Event, _TextRun]] = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.dropped = 0
+        self._unreported = 0
+
+    def _offer(self, event: Event) -> None:
+        if self._closed or (self.types is not None and event.type not in self.types):
+            return
+        if event.type == TEXT_DELTA:
+            if self._items and isinstance(self._items[-1], _TextRun):
+                self._items[-1].parts.append(event.data["text"])
+                return
+            item: Union[Event, _TextRun] = _TextRun(event)
+        else:
+            item = event
+        if len(self._items) >= self.maxsize:
+            self._items.popleft()
+            self.dropped += 1
+            self._unreported += 1
+        self._items.append(item)
+        self._ready.set()
+
+    def close(self) -> None:
+        """Stop receiving events; the consumer drains what is queued, then stops."""
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Event]:
+        """Next event, or None once the subscription is closed and drained."""
+        while not self._items:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        if self._unreported:
+            count, self._unreported = self._unreported, 0
+            return Event(DROPPED, {"count": count})
+        item = self._items.popleft()
+        return item.event() if isinstance(item, _TextRun) else item
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class EventBus:
+    """Fan-out of agent events to subscribers.
+
+    :meth:`publish` never blocks or awaits, so it is safe to call from model
+    streaming and tool execution paths. It must be called from the event
+    loop's thread.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: List[Subscription] = []
+        self._seq = 0
+
+    def subscribe(self, maxsize: int = 1024, types: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(maxsize, types)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscriptions)
+
+    def publish(self, type: str, **data: Any) -> None:
+        if not self._subscriptions:
+            return
+        self._seq += 1
+        event = Event(type, data, self._seq)
+        for subscription in self._subscriptions:
+            subscription._offer(event)
+
+    def close(self) -> None:
+        """Close all subscriptions."""
+        for subscription in self._subscriptions:
+            subscription.close()
+        self._subscriptions.clear()
+
+
+class _ThreadedWriter:
+    """Consumes a subscription, writing formatted events from a worker thread."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def format(self, event: Event) -> str:
+        raise NotImplementedError
+
+    def _write(self, text: str) -> None:
+        self.stream.write(text)
+        self.stream.flush()
+
+    async def consume(self, subscription: Subscription) -> None:
+        async for event in subscription:
+            text = self.format(event)
+            if text:
+                # Blocking terminal or pipe writes stay off the event loop
+                await asyncio.to_thread(self._write, text)
+
+
+class NDJSONWriter(_ThreadedWriter):
+    """Writes each event as one JSON line, for harnesses."""
+
+    def __init__(self, stream: TextIO, max_chars: int = 4000) -> None:
+        super().__init__(stream)
+        self.max_chars = max_chars
+
+    def format(self, event: Event) -> str:
+        return json.dumps(event.to_dict(self.max_chars), default=str, ensure_ascii=False) + "\n"
+
+
+class ConsoleRenderer(_ThreadedWriter):
+    """Human-readable progress: tool calls, failures and short outputs."""
+
+    def __init__(self, stream: TextIO, max_chars: int = 200, show_text: bool = False) -> None:
+        super().__init__(stream)
+        self.max_chars = max_chars
+        self.show_text = show_text
+
+    def format(self, event: Event) -> str:
+        data = event.data
+        if event.type == TOOL_START:
+            params = data.get("params")
+            if params:
+                return f"{data['name']}: {json.dumps(truncate(params, self.max_chars), default=str)}\n"
+            return f"{data['name']}\n"
+        if event.type == TOOL_END:
+            if not data.get("success"):
+                return f"Tool call failed: {data.get('error')}\n"
+            output = data.get("output") or ""
+            # Only show short outputs inline; never scan large ones
+            if len(output) < self.max_chars * 2 and 0 < len(output.strip()) < self.max_chars:
+                return output.strip() + "\n"
+            return ""
+        if event.type == TEXT_DELTA and self.show_text:
+            return data["text"]
+        if event.type == ERROR:
+            return f"Error: {data.get('message')}\n"
+        if event.type == DROPPED:
+            return f"[{data['count']} events skipped]\n"
+        return ""
+
+
+async def run_with_consumers(
+    bus: EventBus,
+    consumers: Iterable[Callable[[Subscription], Any]],
+    main: Any,
+    maxsize: int = 1024,
+) -> Any:
+    """Await ``main`` while ``consumers`` drain their own subscriptions to ``bus``."""
+    consumers = list(consumers)
+    subscriptions = [bus.subscribe(maxsize) for _ in consumers]
+    tasks = [asyncio.create_task(consume(sub)) for consume, sub in zip(consumers, subscriptions)]
+    try:
+        return await main
+    finally:
+        for subscription in subscriptions:
+            bus.unsubscribe(subscription)
+        await asyncio.gather(*tasks, return_exceptions=True)
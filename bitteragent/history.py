@@ -0,0 +1,197 @@
+"""Conversation history storage."""
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Tuple, overload
+
+if TYPE_CHECKING:
+    from .tools import Tool
+
+
+class MessageView(Sequence):
+    """Read-only, zero-copy view over a list of messages.
+
+    The view shares the underlying list, so messages appended to the history
+    are visible through it immediately. Providers receive a view instead of a
+    copy of the history on every turn.
+    """
+
+    # Weakly referenceable so providers can cache per-history state keyed by the view
+    __slots__ = ("_messages", "__weakref__")
+
+    def __init__(self, messages: List[Dict[str, Any]]) -> None:
+        self._messages = messages
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Dict[str, Any]]: ...
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._messages)
+
+    def __repr__(self) -> str:
+        return f"MessageView({self._messages!r})"
+
+
+class BlobStore:
+    """Content-addressed store that interns the large strings of histories.
+
+    The same large text often appears several times in a conversation: file
+    content passed to ``write_file`` and read back by ``read_file``, or a
+    command that prints the same output on every run. ``intern`` returns one
+    shared string object for equal strings of at least ``min_chars``
+    characters, so the copies in the history cost memory once. Strings are
+    keyed by their content (Python's cached string hash, with an exact
+    comparison on lookup), so an interned history serializes to exactly the
+    same request.
+
+    The store keeps at most ``max_chars`` characters of blobs and evicts the
+    least recently seen first. Eviction only loses sharing for future copies;
+    histories keep the strings they already reference. One store can be
+    shared by the agents of a process to share blobs across sessions.
+    """
+
+    def __init__(self, min_chars: int = 1024, max_chars: int = 64 * 1024 * 1024) -> None:
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._blobs: OrderedDict[str, str] = OrderedDict()
+        self.chars = 0
+        # Copies replaced by a shared string, and the characters they held
+        self.hits = 0
+        self.chars_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def intern(self, text: str) -> str:
+        """Return the shared string equal to ``text``, storing it if new."""
+        if len(text) < self.min_chars:
+            return text
+        shared = self._blobs.get(text)
+        if shared is not None:
+            self._blobs.move_to_end(shared)
+            if shared is not text:
+                self.hits += 1
+                self.chars_saved += len(text)
+            return shared
+        if len(text) > self.max_chars:
+            return text
+        self._blobs[text] = text
+        self.chars += len(text)
+        while self.chars > self.max_chars:
+            evicted, _ = self._blobs.popitem(last=False)
+            self.chars -= len(evicted)
+        return text
+
+    def intern_content(self, content: Any) -> Any:
+        """Intern the strings nested in message content, replacing them in place."""
+        if isinstance(content, str):
+            return self.intern(content)
+        if isinstance(content, list):
+            for i, item in enumerate(content):
+                content[i] = self.intern_content(item)
+        elif isinstance(content, dict):
+            for key, value in content.items():
+                content[key] = self.intern_content(value)
+        return content
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "blobs": len(self._blobs),
+            "chars_stored": self.chars,
+            "hits": self.hits,
+            "chars_saved": self.chars_saved,
+        }
+
+
+# Arguments of file-modifying tools whose content is on disk once the call succeeded
+COMPACTABLE_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "write_file": ("content",),
+    "edit_file": ("old_string", "new_string"),
+    "apply_patch": ("patch",),
+}
+
+
+class InputCompactor:
+    """Replaces bulky arguments of old file-modifying calls with stubs.
+
+    After a ``write_file``, ``edit_file`` or ``apply_patch`` call succeeds its
+    content is in the workspace, yet the full input is resent with every
+    later request. Once such a call is ``after_turns`` turns old, arguments of
+    at least ``min_chars`` characters are replaced by a stub giving their
+    size, a hash and the files to read for the current content. The
+    ``tool_use`` block keeps its id, name and other arguments, so it still
+    pairs with its ``tool_result``.
+
+    Calls are tracked as they succeed and compacted once, in order, so the
+    work per turn does not grow with the history and the request size stays
+    roughly constant instead of growing with every file written. Each
+    compaction changes the history from that call on, which a cached prompt
+    prefix has to be rebuilt for; ``after_turns`` keeps recent turns intact.
+    """
+
+    def __init__(
+        self,
+        after_turns: int = 4,
+        min_chars: int = 512,
+        inputs: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> None:
+        self.after_turns = after_turns
+        self.min_chars = min_chars
+        self.inputs = dict(COMPACTABLE_INPUTS if inputs is None else inputs)
+        self.turn = 0
+        # (turn, tool_use block, paths) of successful calls not compacted yet, oldest first
+        self._pending: Deque[Tuple[int, Dict[str, Any], List[str]]] = deque()
+        self.calls_compacted = 0
+        self.chars_removed = 0
+
+    def track(self, tool_use: Dict[str, Any], tool: "Tool") -> None:
+        """Remember a successful call whose input may be compacted later."""
+        fields = self.inputs.get(tool_use.get("name", ""), ())
+        params = tool_use.get("input") or {}
+        if any(isinstance(params.get(field), str) and len(params[field]) >= self.min_chars for field in fields):
+            self._pending.append((self.turn, tool_use, tool.modified_paths(params) or []))
+
+    def compact(self) -> int:
+        """Start a turn, compacting calls that are now old enough; returns the characters removed."""
+        self.turn += 1
+        removed = 0
+        while self._pending and self.turn - self._pending[0][0] > self.after_turns:
+            _, tool_use, paths = self._pending.popleft()
+            params = dict(tool_use["input"])
+            for field in self.inputs[tool_use["name"]]:
+                value = params.get(field)
+                if isinstance(value, str) and len(value) >= self.min_chars:
+                    params[field] = self._stub(value, paths)
+                    removed += len(value) - len(params[field])
+            # A new dict, so references handed to tools and callbacks keep the original input
+            tool_use["input"] = params
+            self.calls_compacted += 1
+        self.chars_removed += removed
+        return removed
+
+    @staticmethod
+    def _stub(value: str, paths: List[str]) -> str:
+        data = value.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        stub = f"[Omitted from the history after the call succeeded: {len(data)} bytes, sha256 {digest}."
+        if paths:
+            stub += f" Read {', '.join(paths)} for the current content."
+        return stub + "]"
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls_compacted": self.calls_compacted,
+            "calls_pending": len(self._pending),
+            "chars_removed": self.chars_removed,
+        }
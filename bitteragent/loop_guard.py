@@ -0,0 +1,155 @@
+"""Detection of repetitive tool-call loops."""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Volatile parts of tool output that differ between otherwise identical results
+_VOLATILE = re.compile(
+    r"\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?"  # timestamps
+    r"|\b0x[0-9a-fA-F]+\b"  # addresses
+    r"|\b[0-9a-f]{12,}\b"  # hashes and ids
+    r"|\b\d+(?:\.\d+)?\s*(?:ms|s|sec|seconds)\b"  # durations
+    r"|/tmp/[\w.-]+"  # temporary paths
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", errors="replace"), digest_size=12).hexdigest()
+
+
+def call_fingerprint(name: str, params: Dict[str, Any]) -> str:
+    """Fingerprint of a tool call, insensitive to key order and whitespace runs."""
+    try:
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        canonical = repr(params)
+    return _digest(name + "\0" + _WHITESPACE.sub(" ", canonical))
+
+
+def result_fingerprint(success: bool, content: str) -> str:
+    """Fingerprint of a tool result with timestamps, durations and ids masked."""
+    normalized = _WHITESPACE.sub(" ", _VOLATILE.sub("#", content or "")).strip()
+    return _digest(("ok" if success else "error") + "\0" + normalized)
+
+
+@dataclass
+class StopReason:
+    """Why a run ended before the model produced a final answer."""
+    kind: str  # "max_turns", "repetition", "cycle" or "budget"
+    message: str
+    turns: int
+
+
+@dataclass
+class LoopDetection:
+    """A repeated sequence of turns."""
+    kind: str  # "repetition" (period 1) or "cycle"
+    period: int
+    repeats: int
+    tools: List[str]
+
+    def describe(self) -> str:
+        tools = ", ".join(self.tools)
+        if self.kind == "repetition":
+            return f"the same {tools} call returned the same result {self.repeats} times in a row"
+        return f"a cycle of {self.period} turns ({tools}) repeated {self.repeats} times with identical results"
+
+
+# One agent turn: the (call, result) fingerprints of all its tool calls
+Step = Tuple[Tuple[str, str], ...]
+
+
+class LoopGuard:
+    """Watches an agent run for repeated tool calls and runaway turn counts.
+
+    Each turn is fingerprinted by its tool calls and their (normalized)
+    results. A turn sequence of period ``1..max_period`` that repeats
+    ``repeats`` times back to back is a loop: the first detection earns a
+    corrective notice for the model, a further one after ``max_notices``
+    notices stops the run.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = 100,
+        repeats: int = 3,
+        max_period: int = 4,
+        max_notices: int = 1,
+        window: int = 32,
+    ) -> None:
+        self.max_turns = max_turns
+        self.repeats = max(repeats, 2)
+        self.max_period = max(max_period, 1)
+        self.max_notices = max_notices
+        self.window = max(window, self.repeats * self.max_period)
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new run."""
+        self.turns = 0
+        self.notices = 0
+        self._steps: List[Step] = []
+        self._names: List[List[str]] = []
+
+    def start_turn(self) -> Optional[StopReason]:
+        """Count a model turn; returns a stop reason once the turn limit is reached."""
+        if self.max_turns is not None and self.turns >= self.max_turns:
+            return StopReason("max_turns", f"reached the limit of {self.max_turns} turns", self.turns)
+        self.turns += 1
+        return None
+
+    def record(self, calls: Sequence[Tuple[str, Dict[str, Any], bool, str]]) -> None:
+        """Record one turn's tool calls as (name, params, success, content).
+
+        Turns without calls are skipped; the agent leaves out calls that only
+        wait on work in progress, such as polls of a running background job.
+        """
+        if not calls:
+            return
+        self._steps.append(tuple(
+            (call_fingerprint(name, params), result_fingerprint(success, content))
+            for name, params, success, content in calls
+        ))
+        self._names.append([name for name, *_ in calls])
+        if len(self._steps) > self.window:
+            del self._steps[0]
+            del self._names[0]
+
+    def detect(self) -> Optional[LoopDetection]:
+        """The shortest repeated turn sequence at the end of the history, if any."""
+        steps = self._steps
+        for period in range(1, self.max_period + 1):
+            span = period * self.repeats
+            if len(steps) < span:
+                break
+            tail = steps[-span:]
+            if all(tail[i] == tail[i % period] for i in range(period, span)):
+                names = [name for turn in self._names[-period:] for name in turn]
+                return LoopDetection(
+                    "repetition" if period == 1 else "cycle", period, self.repeats, list(dict.fromkeys(names))
+                )
+        return None
+
+    def check(self) -> Tuple[Optional[str], Optional[StopReason]]:
+        """After a recorded turn, a notice to send to the model or a reason to stop."""
+        detection = self.detect()
+        if detection is None:
+            return None, None
+        if self.notices >= self.max_notices:
+            return None, StopReason(detection.kind, f"loop detected: {detection.describe()}", self.turns)
+        self.notices += 1
+        # Require a fresh run of repeats before acting again
+        self._steps.clear()
+        self._names.clear()
+        notice = (
+            f"[Loop guard] You appear to be stuck: {detection.describe()}. Repeating it will not "
+            "change the outcome. Re-read the error, inspect the current state (e.g. read the file "
+            "again before editing it) and try a different approach, or explain what is blocking you. "
+            "The run will be stopped if the loop continues."
+        )
+        return notice, None
@@ -1,11 +1,29 @@
 """Native tools for TinyAgent."""
 
 from .shell import ShellTool
-from .file_ops import ReadFileTool, WriteFileTool, EditFileTool
+from .jobs import JobManager, JobTool
+from .file_ops import ReadFileTool, ReadFilesTool, WriteFileTool, EditFileTool
+from .output import ReadOutputTool
+from .patch import ApplyPatchTool
+from .search import SearchTool
+from .workspace import WorkspaceTool
+from .checkpoint import CheckpointTool
+from .code_search import CodeSearchTool
+from .delegate import DelegateTool
 
 __all__ = [
     "ShellTool",
+    "JobManager",
+    "JobTool",
     "ReadFileTool",
+    "ReadFilesTool",
     "WriteFileTool",
     "EditFileTool",
+    "ApplyPatchTool",
+    "ReadOutputTool",
+    "SearchTool",
+    "WorkspaceTool",
+    "CodeSearchTool",
+    "CheckpointTool",
+    "DelegateTool",
 ]
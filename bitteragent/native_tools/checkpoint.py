@@ -0,0 +1,113 @@
+"""Checkpoint and rollback of files changed through tools."""
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .base import NativeTool
+from ..checkpoints import CheckpointStore
+from ..tools import ToolResult
+
+
+class CheckpointTool(NativeTool):
+    name = "checkpoint"
+    description = """Save and restore the state of files changed with write_file, edit_file and apply_patch.
+- create: mark the current state with an optional label, e.g. before a risky refactor
+- list: checkpoints and the recent changes made since the last one
+- rollback: restore every file changed since a checkpoint ('to'), or undo the last 'steps' file-changing calls, in one call
+Changes made by shell commands are not tracked."""
+    parameters = {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["create", "list", "rollback"],
+                "description": "What to do"
+            },
+            "label": {
+                "type": "string",
+                "description": "For create: name for the checkpoint (default: cp-<id>)"
+            },
+            "to": {
+                "type": "string",
+                "description": "For rollback: checkpoint label or id to restore (default: the latest checkpoint)"
+            },
+            "steps": {
+                "type": "integer",
+                "description": "For rollback: undo this many of the latest file-changing calls instead of restoring a checkpoint",
+                "minimum": 1
+            },
+        },
+        "required": ["action"],
+    }
+
+    def __init__(self, store: CheckpointStore) -> None:
+        self.store = store
+
+    def modified_paths(self, params: Dict[str, Any]) -> Optional[List[str]]:
+        # The restored files are only known once the rollback has run
+        return None if params.get("action") == "rollback" else []
+
+    async def close(self) -> None:
+        self.store.close()
+
+    async def execute(
+        self,
+        action: str,
+        label: str | None = None,
+        to: str | None = None,
+        steps: int | None = None,
+        **_: Any,
+    ) -> ToolResult:
+        try:
+            if action == "create":
+                checkpoint = self.store.create(label)
+                return ToolResult(success=True, output=f"Created checkpoint {checkpoint.label} (id {checkpoint.id})")
+            if action == "list":
+                return ToolResult(success=True, output=self._list())
+            if action == "rollback":
+                return self._rollback(to, steps)
+            return ToolResult(success=False, error=f"Unknown action: {action}")
+        except KeyError as exc:
+            return ToolResult(success=False, error=exc.args[0])
+        except Exception as exc:
+            return ToolResult(success=False, error=str(exc))
+
+    def _rollback(self, to: Optional[str], steps: Optional[int]) -> ToolResult:
+        if steps is not None:
+            position = len(self.store.changes) - steps
+            target = f"the state before the last {min(steps, len(self.store.changes))} file-changing calls"
+        elif to is not None or self.store.checkpoints:
+            checkpoint = self.store.find(to) if to is not None else self.store.checkpoints[-1]
+            position = checkpoint.position
+            target = f"checkpoint {checkpoint.label}"
+        else:
+            return ToolResult(success=False, error="No checkpoints yet; pass 'steps' to undo recent changes")
+        restored = self.store.rollback(position)
+        if not restored:
+            return ToolResult(success=True, output=f"Nothing to restore; files already match {target}")
+        lines = [f"Rolled back to {target}:"]
+        lines.extend(f"  {action} {os.path.relpath(path)}" for path, action in restored)
+        return ToolResult(success=True, output="\n".join(lines))
+
+    def _list(self) -> str:
+        store = self.store
+        lines = []
+        for checkpoint in store.checkpoints:
+            changed = store.changed_since(checkpoint.position)
+            age = time.time() - checkpoint.time
+            lines.append(
+                f"{checkpoint.label} (id {checkpoint.id}, {age:.0f}s ago): "
+                f"{len(changed)} files changed since"
+            )
+        if not lines:
+            lines.append("No checkpoints")
+        start = store.checkpoints[-1].position if store.checkpoints else 0
+        recent = store.changes[start:][-10:]
+        if recent:
+            lines.append("Recent changes (undo with steps):")
+            for steps, change in enumerate(reversed(recent), 1):
+                paths = ", ".join(os.path.relpath(path) for path in change.files)
+                lines.append(f"  steps={steps}: {change.tool} {paths}")
+        return "\n".join(lines)
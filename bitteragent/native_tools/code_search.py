@@ -0,0 +1,56 @@
+"""Ranked code search tool."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from .base import NativeTool
+from ..code_index import CodeIndex
+from ..tools import ToolResult
+
+
+class CodeSearchTool(NativeTool):
+    name = "code_search"
+    description = """Find the files most relevant to a set of identifiers or keywords, ranked by relevance (BM25 over an index of the workspace).
+- Use when you don't know where something lives, e.g. 'parse config file' or 'UserSession refresh token'
+- camelCase and snake_case names match their parts, so 'user session' finds getUserSession and user_session
+- Returns the best files with their most relevant lines as path:line: text; use the search tool for exact regex matches"""
+    read_only = True
+    parameters = {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Identifiers or keywords to look for"
+            },
+            "path": {
+                "type": "string",
+                "description": "Only rank files under this directory, relative to the workspace root",
+                "default": ""
+            },
+            "max_results": {
+                "type": "integer",
+                "description": "Number of files to return (default: 10)",
+                "default": 10
+            },
+        },
+        "required": ["query"],
+    }
+
+    def __init__(self, index: CodeIndex) -> None:
+        self.index = index
+
+    async def execute(self, query: str, path: str = "", max_results: int = 10, **_: Any) -> ToolResult:
+        try:
+            results, matched = await asyncio.to_thread(self.index.search, query, max(max_results, 1), path)
+        except Exception as exc:
+            return ToolResult(success=False, error=str(exc))
+        if not results:
+            return ToolResult(success=True, output="No matches found")
+        lines = []
+        for rel, _, snippets in results:
+            if not snippets:
+                lines.append(rel)
+            lines.extend(f"{rel}:{number}: {text}" for number, text in snippets)
+        lines.append(f"[top {len(results)} of {matched} matching files]")
+        return ToolResult(success=True, output="\n".join(lines))
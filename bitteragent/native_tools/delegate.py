@@ -0,0 +1,198 @@
+"""Parallel sub-agent delegation."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+from .base import NativeTool
+from ..agent import Agent
+from ..budget import RunBudget
+from ..loop_guard import LoopGuard
+from ..providers.base import Provider
+from ..spill import SpillStore
+from ..tools import ToolRegistry, ToolResult
+
+# Tools children get by default: enough to investigate, nothing that edits files
+DEFAULT_CHILD_TOOLS = (
+    "shell", "read_file", "read_files", "search", "workspace_overview", "code_search", "read_output",
+)
+
+CHILD_SYSTEM_PROMPT = """You are a sub-agent working on one part of a larger task for another agent.
+Investigate only the task you are given, using the tools available. Do not modify files unless the task asks you to.
+Your final message is the only thing the other agent will see: make it a concise report of your findings
+(file paths, line numbers, commands, causes and conclusions), without narrating the steps you took."""
+
+
+def _cap(limit: Optional[float], parent_limit: Optional[float], used: float, committed: float) -> Optional[float]:
+    """``limit`` lowered to what is left of ``parent_limit`` after ``used`` and ``committed``."""
+    if parent_limit is None:
+        return limit
+    left = max(parent_limit - used - committed, 0)
+    return left if limit is None else min(limit, left)
+
+
+class DelegateTool(NativeTool):
+    """Runs independent subtasks concurrently in child agents.
+
+    Each child gets a fresh history, the tools in ``child_tools`` (never
+    ``delegate`` itself) and its own budget, and shares the parent's
+    provider, and with it the connection pool and rate limiter, but not its
+    streaming callbacks. Only the children's final answers are returned.
+    Their usage is added to ``budget`` (the parent's). Each child's limits
+    are the per-child caps, lowered to what the parent has left when the
+    child starts, less what the children already running may still use.
+    """
+
+    name = "delegate"
+    description = (
+        "Run independent subtasks in parallel, each in a fresh sub-agent that only returns its final answer. "
+        "Use it for investigations that split naturally (e.g. several failing tests, several directories) "
+        "to keep their details out of your context. Each task must be self-contained: sub-agents cannot see "
+        "this conversation."
+    )
+    parameters = {
+        "type": "object",
+        "properties": {
+            "tasks": {
+                "type": "array",
+                "description": "Subtasks to run concurrently",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "task": {
+                            "type": "string",
+                            "description": "Complete instructions for the sub-agent, including paths and what to report"
+                        },
+                        "tools": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Tools the sub-agent may use (default: read-only investigation tools and shell)"
+                        },
+                    },
+                    "required": ["task"],
+                },
+            },
+        },
+        "required": ["tasks"],
+    }
+
+    def __init__(
+        self,
+        provider: Provider,
+        registry: ToolRegistry,
+        child_tools: Sequence[str] = DEFAULT_CHILD_TOOLS,
+        max_concurrency: int = 4,
+        max_tasks: int = 8,
+        max_turns: int = 30,
+        max_input_tokens: Optional[int] = 500_000,
+        max_output_tokens: Optional[int] = 20_000,
+        max_answer_chars: int = 4000,
+        budget: Optional[RunBudget] = None,
+        spill_store: Optional[SpillStore] = None,
+        system_prompt: str = CHILD_SYSTEM_PROMPT,
+    ) -> None:
+        self.provider = provider
+        self.registry = registry
+        self.child_tools = tuple(child_tools)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_tasks = max_tasks
+        self.max_turns = max_turns
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_answer_chars = max_answer_chars
+        self.budget = budget
+        self.spill_store = spill_store
+        self.system_prompt = system_prompt
+        # Budgets of the children currently running
+        self._running: List[RunBudget] = []
+
+    def _child_registry(self, names: Optional[Sequence[str]]) -> ToolRegistry:
+        allowed = self.child_tools if names is None else [name for name in names if name in self.child_tools]
+        registry = ToolRegistry()
+        for name in allowed:
+            tool = self.registry.get(name)
+            if tool is not None and name != self.name:
+                registry.register(tool)
+        # Keep indexes that watch tool calls up to date with the children's changes
+        for observer in self.registry.observers:
+            registry.add_observer(observer)
+        return registry
+
+    def _child_budget(self) -> RunBudget:
+        parent = self.budget
+        if parent is None:
+            return RunBudget(max_input_tokens=self.max_input_tokens, max_output_tokens=self.max_output_tokens)
+        running = self._running
+        return RunBudget(
+            deadline=parent.remaining(),
+            max_input_tokens=_cap(
+                self.max_input_tokens, parent.max_input_tokens,
+                parent.input_tokens + parent.cache_creation_tokens + parent.cache_read_tokens,
+                sum(b.max_input_tokens or 0 for b in running),
+            ),
+            max_output_tokens=_cap(
+                self.max_output_tokens, parent.max_output_tokens, parent.output_tokens,
+                sum(b.max_output_tokens or 0 for b in running),
+            ),
+            max_cost=_cap(None, parent.max_cost, parent.cost, sum(b.max_cost or 0.0 for b in running)),
+        )
+
+    async def _run_child(
+        self, task: str, names: Optional[Sequence[str]], slots: asyncio.Semaphore, provider: Provider,
+    ) -> Dict[str, Any]:
+        async with slots:
+            budget = self._child_budget()
+            self._running.append(budget)
+            agent = Agent(
+                provider=provider,
+                registry=self._child_registry(names),
+                system_prompt=self.system_prompt,
+                spill_store=self.spill_store,
+                loop_guard=LoopGuard(max_turns=self.max_turns),
+                budget=budget,
+            )
+            # Children are not closed: they borrow the parent's provider and tools
+            try:
+                answer = await agent.run(task)
+                error = None
+            except Exception as exc:
+                answer, error = "", str(exc)
+            finally:
+                self._running.remove(budget)
+                if self.budget is not None:
+                    self.budget.absorb(budget)
+        return {
+            "answer": answer,
+            "error": error,
+            "stopped": agent.stop_reason.kind if agent.stop_reason else None,
+            "usage": budget.summary(),
+        }
+
+    def _format(self, index: int, task: str, child: Dict[str, Any]) -> str:
+        title = " ".join(task.split())
+        if len(title) > 80:
+            title = title[:77] + "..."
+        if child["error"] is not None:
+            return f"## Task {index}: {title}\nFailed: {child['error']}"
+        answer = child["answer"].strip() or "(no answer)"
+        if len(answer) > self.max_answer_chars:
+            answer = answer[:self.max_answer_chars] + f"\n[answer truncated, {len(answer) - self.max_answer_chars} more chars]"
+        return f"## Task {index}: {title}\n{answer}"
+
+    async def execute(self, tasks: List[Dict[str, Any]], **_: Any) -> ToolResult:
+        if len(tasks) > self.max_tasks:
+            return ToolResult(success=False, error=f"Too many tasks ({len(tasks)}); delegate at most {self.max_tasks} at once")
+        slots = asyncio.Semaphore(self.max_concurrency)
+        # Children's deltas would otherwise be shown interleaved as the parent's
+        provider = self.provider.without_callbacks()
+        children = await asyncio.gather(*(self._run_child(t["task"], t.get("tools"), slots, provider) for t in tasks))
+        sections = [self._format(i, t["task"], child) for i, (t, child) in enumerate(zip(tasks, children), 1)]
+        output = "\n\n".join(sections)
+        succeeded = any(child["error"] is None for child in children)
+        return ToolResult(
+            success=succeeded,
+            output=output if succeeded else None,
+            error=None if succeeded else output,
+            metadata={"children": [{k: v for k, v in child.items() if k != "answer"} for child in children]},
+        )
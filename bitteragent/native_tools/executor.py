@@ -0,0 +1,302 @@
+"""Resource-governed execution of shell commands."""
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    import fcntl
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+    resource = None  # type: ignore[assignment]
+
+GiB = 1024 ** 3
+
+# Sets the limits, runs the command in a child and reports the child's
+# resource usage. Runs as `python -I -S` and imports only builtin modules so
+# startup stays cheap.
+_GOVERNOR = r"""
+import os, resource, signal, sys
+for item in filter(None, sys.argv[1].split(",")):
+    name, soft, hard = item.split(":")
+    limit, soft, hard = getattr(resource, name), int(soft), int(hard)
+    _, current = resource.getrlimit(limit)
+    if current != resource.RLIM_INFINITY:
+        soft, hard = min(soft, current), min(hard, current)
+    try:
+        resource.setrlimit(limit, (soft, hard))
+    except (ValueError, OSError):
+        pass
+pid = os.fork()
+if pid == 0:
+    # Python ignores these at startup; commands expect the defaults
+    for name in ("SIGPIPE", "SIGXFSZ"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+    if sys.argv[2] != "-":
+        os.close(int(sys.argv[2]))
+    os.execv("/bin/sh", ["/bin/sh", "-c", sys.argv[3]])
+while True:
+    try:
+        _, status, usage = os.wait4(pid, 0)
+        break
+    except InterruptedError:
+        continue
+if sys.argv[2] != "-":
+    os.write(int(sys.argv[2]), f"{usage.ru_maxrss} {usage.ru_utime} {usage.ru_stime}".encode())
+if os.WIFSIGNALED(status):
+    sig = os.WTERMSIG(status)
+    signal.signal(sig, signal.SIG_DFL)
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    os.kill(os.getpid(), sig)
+sys.exit(os.WEXITSTATUS(status))
+"""
+
+_LIMIT_SIGNALS = {
+    getattr(signal, "SIGXCPU", None): "CPU time limit exceeded",
+    getattr(signal, "SIGXFSZ", None): "file size limit exceeded",
+}
+
+
+def _env_limit(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if value.lower() in ("", "0", "none", "unlimited"):
+        return None
+    return int(value)
+
+
+@dataclass
+class ResourceLimits:
+    """POSIX rlimits applied to each command; None leaves a limit unchanged."""
+    # RLIMIT_AS counts reserved as well as used memory, so lazy mmaps, JVM heaps and
+    # sanitizer shadow memory exceed any useful limit; it is off by default
+    address_space: Optional[int] = None
+    cpu_seconds: Optional[int] = 1800
+    file_size: Optional[int] = 4 * GiB
+    open_files: Optional[int] = 8192
+    # RLIMIT_NPROC counts every process of the user, not just the command's tree, so it is off by default
+    processes: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "ResourceLimits":
+        """Defaults overridden by BITTERAGENT_RLIMIT_{AS,CPU,FSIZE,NOFILE,NPROC}.
+
+        BITTERAGENT_RLIMIT_AS caps reserved address space, not resident memory.
+        BITTERAGENT_RLIMIT_NPROC caps the processes of the whole user, including
+        ones unrelated to the agent, so it must leave room for those.
+        """
+        defaults = cls()
+        return cls(
+            address_space=_env_limit("BITTERAGENT_RLIMIT_AS", defaults.address_space),
+            cpu_seconds=_env_limit("BITTERAGENT_RLIMIT_CPU", defaults.cpu_seconds),
+            file_size=_env_limit("BITTERAGENT_RLIMIT_FSIZE", defaults.file_size),
+            open_files=_env_limit("BITTERAGENT_RLIMIT_NOFILE", defaults.open_files),
+            processes=_env_limit("BITTERAGENT_RLIMIT_NPROC", defaults.processes),
+        )
+
+    def rlimits(self) -> Dict[str, List[int]]:
+        limits: Dict[str, List[int]] = {"RLIMIT_CORE": [0, 0]}
+        if self.address_space is not None:
+            limits["RLIMIT_AS"] = [self.address_space, self.address_space]
+        if self.cpu_seconds is not None:
+            # SIGXCPU at the soft limit lets the command report it; SIGKILL follows
+            limits["RLIMIT_CPU"] = [self.cpu_seconds, self.cpu_seconds + 5]
+        if self.file_size is not None:
+            limits["RLIMIT_FSIZE"] = [self.file_size, self.file_size]
+        if self.open_files is not None:
+            limits["RLIMIT_NOFILE"] = [self.open_files, self.open_files]
+        if self.processes is not None:
+            limits["RLIMIT_NPROC"] = [self.processes, self.processes]
+        return limits
+
+
+def governed_command(command: str, limits: ResourceLimits, stats_fd: Optional[int] = None) -> List[str]:
+    """argv that runs ``command`` through /bin/sh under ``limits``."""
+    return [
+        sys.executable, "-I", "-S", "-c", _GOVERNOR,
+        ",".join(f"{name}:{soft}:{hard}" for name, (soft, hard) in limits.rlimits().items()),
+        str(stats_fd) if stats_fd is not None else "-",
+        command,
+    ]
+
+
+class HostSlots:
+    """Host-wide counting semaphore built from flock()ed slot files.
+
+    Every agent process on the host that uses the same directory shares the
+    same slots. Locks are released by the kernel if a process dies.
+    """
+
+    def __init__(self, count: Optional[int] = None, directory: Optional[str] = None) -> None:
+        self.count = count or _env_limit("BITTERAGENT_MAX_PROCS", None) or (os.cpu_count() or 1) * 2
+        self.directory = directory or os.path.join(tempfile.gettempdir(), f"bitteragent-slots-{os.getuid()}")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[int]:
+        os.makedirs(self.directory, exist_ok=True)
+        delay = 0.01
+        # Start probing at a different slot per process to reduce contention
+        first = os.getpid() % self.count
+        while True:
+            for step in range(self.count):
+                slot = (first + step) % self.count
+                fd = os.open(os.path.join(self.directory, f"slot-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                try:
+                    yield slot
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+@dataclass
+class ExecResult:
+    """Outcome of a governed command."""
+    output: str
+    exit_code: Optional[int] = None
+    signal: Optional[int] = None
+    timed_out: bool = False
+    limit_exceeded: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class CommandExecutor:
+    """Runs shell commands under rlimits, a host-wide concurrency limit and an output cap."""
+
+    def __init__(
+        self,
+        limits: Optional[ResourceLimits] = None,
+        slots: Optional[HostSlots] = None,
+        max_output: int = 10 * 1024 * 1024,
+        tail_output: int = 64 * 1024,
+    ) -> None:
+        self.limits = limits or ResourceLimits.from_env()
+        self.slots = slots or HostSlots()
+        self.max_output = max_output
+        self.tail_output = tail_output
+
+    async def run(self, command: str, timeout: Optional[float] = None) -> ExecResult:
+        if resource is None:  # pragma: no cover
+            return await self._run_plain(command, timeout)
+        queued = time.monotonic()
+        async with self.slots.acquire() as slot:
+            started = time.monotonic()
+            read_fd, write_fd = os.pipe()
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *governed_command(command, self.limits, write_fd),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    pass_fds=(write_fd,),
+                    start_new_session=True,
+                )
+            finally:
+                os.close(write_fd)
+            try:
+                try:
+                    output = await asyncio.wait_for(self._collect(proc), timeout=timeout)
+                    timed_out = False
+                except asyncio.TimeoutError:
+                    self._kill(proc)
+                    output = ""
+                    timed_out = True
+                except asyncio.CancelledError:
+                    self._kill(proc)
+                    raise
+                await proc.wait()
+                stats = self._read_stats(read_fd)
+            finally:
+                os.close(read_fd)
+
+        returncode = proc.returncode
+        result = ExecResult(output=output, timed_out=timed_out)
+        if returncode is not None and returncode < 0:
+            result.signal = -returncode
+            result.limit_exceeded = _LIMIT_SIGNALS.get(result.signal)
+        else:
+            result.exit_code = returncode
+        max_rss = stats.get("max_rss")
+        if max_rss is not None and sys.platform == "darwin":
+            max_rss //= 1024
+        result.metadata = {
+            "exit_code": result.exit_code,
+            "signal": result.signal,
+            "wall_time": round(time.monotonic() - started, 3),
+            "queue_time": round(started - queued, 3),
+            "slot": slot,
+            "max_rss_kb": max_rss,
+            "cpu_user": round(stats["cpu_user"], 3) if "cpu_user" in stats else None,
+            "cpu_system": round(stats["cpu_system"], 3) if "cpu_system" in stats else None,
+        }
+        if result.limit_exceeded:
+            result.metadata["limit_exceeded"] = result.limit_exceeded
+        return result
+
+    async def _collect(self, proc: asyncio.subprocess.Process) -> str:
+        """Read all output, keeping the head and tail when it exceeds the cap."""
+        head = bytearray()
+        tail = bytearray()
+        dropped = 0
+        head_cap = max(self.max_output - self.tail_output, 0)
+        while True:
+            chunk = await proc.stdout.read(65536)
+            if not chunk:
+                break
+            if len(head) < head_cap:
+                take = head_cap - len(head)
+                head += chunk[:take]
+                chunk = chunk[take:]
+            if chunk:
+                tail += chunk
+                if len(tail) > self.tail_output:
+                    excess = len(tail) - self.tail_output
+                    del tail[:excess]
+                    dropped += excess
+        await proc.wait()
+        if dropped:
+            head += f"\n[... {dropped} bytes of output omitted ...]\n".encode()
+        return (head + tail).decode(errors="replace")
+
+    @staticmethod
+    def _kill(proc: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    @staticmethod
+    def _read_stats(fd: int) -> Dict[str, Any]:
+        os.set_blocking(fd, False)
+        try:
+            max_rss, cpu_user, cpu_system = os.read(fd, 4096).split()
+            return {"max_rss": int(max_rss), "cpu_user": float(cpu_user), "cpu_system": float(cpu_system)}
+        except (OSError, ValueError):
+            return {}
+
+    async def _run_plain(self, command: str, timeout: Optional[float]) -> ExecResult:  # pragma: no cover
+        proc = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            return ExecResult(output="", timed_out=True)
+        return ExecResult(output=stdout.decode(errors="replace"), exit_code=proc.returncode)
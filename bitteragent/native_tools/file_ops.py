@@ -1,8 +1,10 @@
 """File operation tools."""
 from __future__ import annotations
 
+import asyncio
 import os
-from typing import Any
+from itertools import islice
+from typing import Any, Dict, List, Tuple
 
 from .base import NativeTool
 from ..tools import ToolResult
@@ -11,6 +13,7 @@ from ..tools import ToolResult
 class ReadFileTool(NativeTool):
     name = "read_file"
     description = "Read file contents"
+    read_only = True
     parameters = {
         "type": "object",
         "properties": {
@@ -32,6 +35,9 @@ class ReadFileTool(NativeTool):
         "required": ["file_path"],
     }
 
+    def memo_paths(self, params: Dict[str, Any]) -> List[str]:
+        return [params["file_path"]]
+
     async def execute(self, file_path: str, limit: int = 1000, offset: int = 0, **_: Any) -> ToolResult:
         if not os.path.exists(file_path):
             return ToolResult(success=False, error="File not found")
@@ -44,6 +50,120 @@ class ReadFileTool(NativeTool):
             return ToolResult(success=False, error=str(exc))
 
 
+class ReadFilesTool(NativeTool):
+    name = "read_files"
+    description = """Read several files, or several ranges of files, in one call.
+- Returns each range with line numbers under a ==> path (lines a-b) <== header
+- Files that cannot be read get an error under their header; the other ranges are still returned
+- Output is capped at a total size shared between the ranges; truncated ranges say which offset to continue from"""
+    read_only = True
+    parameters = {
+        "type": "object",
+        "properties": {
+            "files": {
+                "type": "array",
+                "description": "Ranges to read, in the order they should be returned",
+                "minItems": 1,
+                "maxItems": 50,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Path of the file to read"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "description": "Line number to start reading from (default: 0)",
+                            "default": 0
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Number of lines to read (default: 1000)",
+                            "default": 1000
+                        },
+                    },
+                    "required": ["file_path"],
+                },
+            },
+        },
+        "required": ["files"],
+    }
+
+    def __init__(self, max_bytes: int = 18000) -> None:
+        self.max_bytes = max_bytes
+
+    def memo_paths(self, params: Dict[str, Any]) -> List[str]:
+        return [item["file_path"] for item in params["files"]]
+
+    @staticmethod
+    def _read(file_path: str, offset: int, limit: int) -> Tuple[List[str], bool]:
+        """Read a range of lines; the flag tells whether the file continues past it."""
+        with open(file_path, "r", encoding="utf-8") as f:
+            lines = list(islice(f, offset, offset + limit + 1))
+        return lines[:limit], len(lines) > limit
+
+    async def execute(self, files: List[Dict[str, Any]], **_: Any) -> ToolResult:
+        ranges = [(item["file_path"], max(item.get("offset", 0), 0), max(item.get("limit", 1000), 1)) for item in files]
+        reads = await asyncio.gather(
+            *(asyncio.to_thread(self._read, path, offset, limit) for path, offset, limit in ranges),
+            return_exceptions=True,
+        )
+
+        # Share the budget fairly: small ranges are returned whole and the rest
+        # split what is left
+        sizes = [
+            sum(len(line.encode("utf-8")) for line in read[0]) if not isinstance(read, BaseException) else 0
+            for read in reads
+        ]
+        budgets = [0] * len(ranges)
+        remaining = self.max_bytes
+        order = sorted(range(len(ranges)), key=lambda i: sizes[i])
+        for position, index in enumerate(order):
+            budgets[index] = min(sizes[index], remaining // (len(order) - position))
+            remaining -= budgets[index]
+
+        sections = []
+        for (path, offset, _), read, budget in zip(ranges, reads, budgets):
+            if isinstance(read, BaseException):
+                if isinstance(read, FileNotFoundError):
+                    error = "File not found"
+                elif isinstance(read, UnicodeDecodeError):
+                    error = "Not a UTF-8 text file"
+                else:
+                    error = str(read)
+                sections.append(f"==> {path} <==\n[error: {error}]")
+                continue
+            lines, more = read
+            if not lines:
+                sections.append(f"==> {path} (no lines at offset {offset}) <==")
+                continue
+            shown: List[str] = []
+            used = 0
+            for number, line in enumerate(lines, offset + 1):
+                used += len(line.encode("utf-8"))
+                if used > budget:
+                    break
+                text = line.rstrip("\n")
+                shown.append(f"{number:6}\t{text}")
+            cut = ""
+            if not shown:
+                # A first line longer than the budget is shown cut short, so continuing always moves forward
+                data = lines[0].rstrip("\n").encode("utf-8")
+                text = data[:max(budget, 1)].decode("utf-8", errors="ignore")
+                shown.append(f"{offset + 1:6}\t{text}")
+                cut = f"\n[line {offset + 1} cut to {len(text.encode('utf-8'))} of {len(data)} bytes]"
+            end = offset + len(shown)
+            header = f"==> {path} (lines {offset + 1}-{end}) <=="
+            body = "\n".join([header] + shown) + cut
+            if len(shown) < len(lines):
+                body += f"\n[truncated to fit the output budget; continue with offset={end}]"
+            elif more:
+                body += f"\n[more lines follow; continue with offset={end}]"
+            sections.append(body)
+        return ToolResult(success=True, output="\n\n".join(sections))
+
+
 class WriteFileTool(NativeTool):
     name = "write_file"
     description = "Write content to a file (will overwrite existing file)"
@@ -62,6 +182,9 @@ class WriteFileTool(NativeTool):
         "required": ["file_path", "content"],
     }
 
+    def modified_paths(self, params: Dict[str, Any]) -> List[str]:
+        return [params["file_path"]]
+
     async def execute(self, file_path: str, content: str, **_: Any) -> ToolResult:
         try:
             os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
@@ -99,6 +222,9 @@ class EditFileTool(NativeTool):
         "required": ["file_path", "old_string", "new_string"],
     }
 
+    def modified_paths(self, params: Dict[str, Any]) -> List[str]:
+        return [params["file_path"]]
+
     async def execute(self, file_path: str, old_string: str, new_string: str, replace_all: bool = False, **_: Any) -> ToolResult:
         if not os.path.exists(file_path):
             return ToolResult(success=False, error="File not found")
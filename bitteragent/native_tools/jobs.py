@@ -0,0 +1,348 @@
+"""Background shell jobs."""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import NativeTool
+from .executor import ResourceLimits, governed_command
+from ..tools import ToolResult
+
+# How long a job's exit waits for the rest of its output before the job counts as exited anyway
+OUTPUT_GRACE = 1.0
+
+
+class OutputBuffer:
+    """Bounded buffer of a job's output, addressed by absolute byte offsets.
+
+    Once more than ``max_bytes`` have been written the oldest output is
+    dropped; offsets keep counting from the start of the output so readers
+    can resume where they left off.
+    """
+
+    def __init__(self, max_bytes: int = 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._data = bytearray()
+        # Absolute offset of the first byte still held
+        self._start = 0
+        self._lock = threading.Lock()
+
+    def write(self, chunk: bytes) -> None:
+        with self._lock:
+            self._data += chunk
+            excess = len(self._data) - self.max_bytes
+            if excess > 0:
+                del self._data[:excess]
+                self._start += excess
+
+    @property
+    def end(self) -> int:
+        with self._lock:
+            return self._start + len(self._data)
+
+    def read(self, offset: int, limit: int) -> Tuple[bytes, int, int]:
+        """Return up to ``limit`` bytes from ``offset``, the actual start offset and the end of output."""
+        with self._lock:
+            start = max(offset, self._start)
+            position = start - self._start
+            return bytes(self._data[position:position + limit]), start, self._start + len(self._data)
+
+
+@dataclass
+class Job:
+    """A background shell command."""
+    id: int
+    command: str
+    process: subprocess.Popen
+    output: OutputBuffer
+    started: float = field(default_factory=time.monotonic)
+    # When the process exited
+    finished: Optional[float] = None
+    # Set at the end of the output, which a child left running can hold open after the job exits
+    output_closed: bool = False
+    # Offset the next "output" call continues from
+    read_offset: int = 0
+    reader: Optional[threading.Thread] = None
+    waiter: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished is None
+
+    def status(self) -> str:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        if self.running:
+            state = f"running for {elapsed:.1f}s"
+        elif self.process.returncode is not None and self.process.returncode < 0:
+            state = f"killed by signal {-self.process.returncode} after {elapsed:.1f}s"
+        else:
+            state = f"exited with code {self.process.returncode} after {elapsed:.1f}s"
+        if not self.running and not self.output_closed:
+            state += ", output still open"
+        return f"job {self.id} ({state}, {self.output.end} bytes of output): {self.command}"
+
+
+class JobManager:
+    """Starts background commands and collects their output on reader threads.
+
+    Output is read off the event loop, so jobs keep making progress between
+    agent runs. Each job runs in its own process group so it can be killed
+    together with its children. A job stops counting as running when its
+    process exits, even if a child it started still holds its output open.
+    """
+
+    def __init__(
+        self,
+        max_running: int = 8,
+        max_finished: int = 32,
+        buffer_bytes: int = 1024 * 1024,
+        limits: Optional[ResourceLimits] = None,
+    ) -> None:
+        self.max_running = max_running
+        # Jobs may legitimately run for a long time, so only the CPU limit is lifted
+        self.limits = replace(limits, cpu_seconds=None) if limits is not None else None
+        self.max_finished = max_finished
+        self.buffer_bytes = buffer_bytes
+        self.jobs: Dict[int, Job] = {}
+        self._next_id = 1
+        self._closed = False
+        atexit.register(self.close)
+
+    def start(self, command: str, cwd: Optional[str] = None) -> Job:
+        if self._closed:
+            raise RuntimeError("Job manager is closed")
+        running = self.running()
+        if len(running) >= self.max_running:
+            raise RuntimeError(f"Too many background jobs running ({len(running)}); wait for or kill one first")
+        process = subprocess.Popen(
+            governed_command(command, self.limits) if self.limits is not None else command,
+            shell=self.limits is None,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        # Input is written without blocking, so a job that never reads cannot stall the event loop
+        os.set_blocking(process.stdin.fileno(), False)
+        job = Job(self._next_id, command, process, OutputBuffer(self.buffer_bytes))
+        self._next_id += 1
+        job.reader = threading.Thread(target=self._pump, args=(job,), name=f"job-{job.id}", daemon=True)
+        job.waiter = threading.Thread(target=self._wait, args=(job,), name=f"job-{job.id}-wait", daemon=True)
+        job.reader.start()
+        job.waiter.start()
+        self.jobs[job.id] = job
+        self._evict()
+        return job
+
+    @staticmethod
+    def _pump(job: Job) -> None:
+        stream = job.process.stdout
+        while True:
+            chunk = stream.read1(65536)
+            if not chunk:
+                break
+            job.output.write(chunk)
+        job.output_closed = True
+
+    @staticmethod
+    def _wait(job: Job) -> None:
+        job.process.wait()
+        exited = time.monotonic()
+        # Usually the output ends with the process; let the reader catch up so it is complete when reported
+        job.reader.join(OUTPUT_GRACE)
+        job.finished = exited
+
+    def _evict(self) -> None:
+        finished = [job for job in self.jobs.values() if not job.running]
+        for job in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id: int) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            known = ", ".join(str(i) for i in self.jobs) or "none"
+            raise KeyError(f"Unknown job {job_id} (jobs: {known})")
+        return job
+
+    def running(self) -> List[Job]:
+        return [job for job in self.jobs.values() if job.running]
+
+    async def write_stdin(self, job_id: int, data: str, eof: bool = False, timeout: float = 5.0) -> None:
+        """Write to the job's stdin, giving up if it does not read the data within ``timeout`` seconds."""
+        job = self.get(job_id)
+        stdin = job.process.stdin
+        if not job.running or stdin is None or stdin.closed:
+            raise RuntimeError(f"job {job_id} is not accepting input")
+        payload = memoryview(data.encode("utf-8"))
+        written = 0
+        deadline = time.monotonic() + timeout
+        while written < len(payload):
+            try:
+                written += os.write(stdin.fileno(), payload[written:])
+            except BlockingIOError:
+                # The pipe is full until the job reads from it
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(
+                        f"job {job_id} is not reading its input; sent {written} of {len(payload)} bytes"
+                    ) from None
+                await asyncio.sleep(0.05)
+            except BrokenPipeError:
+                raise RuntimeError(f"job {job_id} closed its input after {written} bytes") from None
+        if eof:
+            stdin.close()
+
+    def kill(self, job_id: int, grace: float = 2.0) -> Job:
+        job = self.get(job_id)
+        self._terminate(job, grace)
+        return job
+
+    @staticmethod
+    def _terminate(job: Job, grace: float) -> None:
+        # Also stops children that still hold the output of a job that exited
+        if not job.running and job.output_closed:
+            return
+        for sig, wait in ((signal.SIGTERM, grace), (signal.SIGKILL, 5.0)):
+            try:
+                os.killpg(job.process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+            deadline = time.monotonic() + wait
+            for thread in (job.waiter, job.reader):
+                if thread is not None:
+                    thread.join(max(deadline - time.monotonic(), 0))
+            if not job.running and job.output_closed:
+                return
+
+    def close(self) -> None:
+        """Kill all running jobs; called when the agent exits."""
+        if self._closed:
+            return
+        self._closed = True
+        for job in list(self.jobs.values()):
+            self._terminate(job, grace=1.0)
+        for job in self.jobs.values():
+            if job.process.stdin is not None and not job.process.stdin.closed:
+                try:
+                    job.process.stdin.close()
+                except OSError:
+                    pass
+        atexit.unregister(self.close)
+
+
+class JobTool(NativeTool):
+    name = "job"
+    description = """Manage background jobs started with the shell tool's background option.
+- status: state, exit code and output size of one job (or all jobs without job_id)
+- output: new output since the last call (or since 'offset'); poll this while doing other work
+- input: send text to the job's stdin (include a trailing newline for line-based programs); set eof to close stdin
+- kill: stop the job and its child processes"""
+    parameters = {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["status", "output", "input", "kill"],
+                "description": "What to do"
+            },
+            "job_id": {
+                "type": "integer",
+                "description": "Job id returned when the job was started"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "For output: byte offset to read from (default: where the previous output call stopped)"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "For output: maximum number of bytes to return (default: 16000)",
+                "default": 16000
+            },
+            "input": {
+                "type": "string",
+                "description": "For input: text to write to stdin",
+                "default": ""
+            },
+            "eof": {
+                "type": "boolean",
+                "description": "For input: close stdin after writing",
+                "default": False
+            },
+        },
+        "required": ["action"],
+    }
+
+    def __init__(self, jobs: JobManager) -> None:
+        self.jobs = jobs
+
+    async def close(self) -> None:
+        # Terminating jobs waits for them to exit
+        await asyncio.to_thread(self.jobs.close)
+
+    async def execute(
+        self,
+        action: str,
+        job_id: int | None = None,
+        offset: int | None = None,
+        limit: int = 16000,
+        input: str = "",
+        eof: bool = False,
+        **_: Any,
+    ) -> ToolResult:
+        try:
+            if action == "status" and job_id is None:
+                if not self.jobs.jobs:
+                    return ToolResult(success=True, output="No background jobs")
+                return ToolResult(
+                    success=True,
+                    output="\n".join(job.status() for job in self.jobs.jobs.values()),
+                    metadata={"waiting": bool(self.jobs.running())},
+                )
+            if job_id is None:
+                return ToolResult(success=False, error=f"job_id is required for {action}")
+            job = self.jobs.get(job_id)
+            # Polls of a running job are waiting, not a loop
+            if action == "status":
+                return ToolResult(success=True, output=job.status(), metadata={"waiting": job.running})
+            if action == "output":
+                running = job.running
+                output = self._output(job, offset, max(limit, 1))
+                return ToolResult(success=True, output=output, metadata={"waiting": running})
+            if action == "input":
+                await self.jobs.write_stdin(job_id, input, eof)
+                return ToolResult(success=True, output=f"Sent {len(input)} characters to job {job_id}" + (" and closed stdin" if eof else ""))
+            if action == "kill":
+                # Waiting for the job to exit can take seconds; keep the event loop free meanwhile
+                await asyncio.to_thread(self.jobs.kill, job_id)
+                return ToolResult(success=True, output=job.status())
+            return ToolResult(success=False, error=f"Unknown action: {action}")
+        except KeyError as exc:
+            return ToolResult(success=False, error=exc.args[0])
+        except Exception as exc:
+            return ToolResult(success=False, error=str(exc))
+
+    @staticmethod
+    def _output(job: Job, offset: Optional[int], limit: int) -> str:
+        # Check the state first so a finished job is never reported with output still missing
+        running = job.running
+        closed = job.output_closed
+        requested = job.read_offset if offset is None else max(offset, 0)
+        data, start, end = job.output.read(requested, limit)
+        job.read_offset = start + len(data)
+        state = "running" if running else "finished" if closed else "exited, output still open"
+        header = f"[job {job.id} {state}; output bytes {start}-{job.read_offset} of {end}"
+        if start > requested:
+            header += f"; {start - requested} earlier bytes were dropped from the buffer"
+        if job.read_offset < end:
+            header += f"; more output available, next offset {job.read_offset}"
+        header += "]"
+        if not running and job.read_offset >= end:
+            header += "\n" + job.status()
+        return f"{header}\n{data.decode('utf-8', errors='replace')}"
@@ -0,0 +1,57 @@
+"""Retrieval of spilled tool outputs."""
+from __future__ import annotations
+
+from typing import Any
+
+from .base import NativeTool
+from ..spill import SpillStore
+from ..tools import ToolResult
+
+
+class ReadOutputTool(NativeTool):
+    name = "read_output"
+    description = "Page through a large tool output that was saved to disk, using the handle shown in its preview"
+    read_only = True
+    parameters = {
+        "type": "object",
+        "properties": {
+            "handle": {
+                "type": "string",
+                "description": "Handle of the saved output (e.g. out-1)"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Line number to start reading from (default: 0)",
+                "default": 0
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Number of lines to read (default: 200)",
+                "default": 200
+            },
+        },
+        "required": ["handle"],
+    }
+
+    def __init__(self, store: SpillStore) -> None:
+        self.store = store
+
+    async def execute(self, handle: str, offset: int = 0, limit: int = 200, **_: Any) -> ToolResult:
+        try:
+            lines, line_count = self.store.read(handle, max(offset, 0), max(limit, 1))
+        except KeyError:
+            known = ", ".join(self.store.handles()) or "none"
+            return ToolResult(success=False, error=f"Unknown output handle: {handle} (available: {known})")
+        except Exception as exc:
+            return ToolResult(success=False, error=str(exc))
+
+        # Keep pages below the spill threshold so they are never spilled again
+        output = "".join(lines)
+        budget = max(self.store.threshold - 100, 0)
+        truncated = len(output) > budget
+        if truncated:
+            output = output[:budget]
+        end = offset + len(lines)
+        header = f"[{handle}: lines {offset}-{end} of {line_count}"
+        header += ", truncated; use a smaller limit]" if truncated else "]"
+        return ToolResult(success=True, output=f"{header}\n{output}")
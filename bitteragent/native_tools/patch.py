@@ -0,0 +1,429 @@
+"""Unified diff patch tool."""
+from __future__ import annotations
+
+import os
+import re
+import stat
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .base import NativeTool
+from ..tools import ToolResult
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be parsed or applied."""
+
+
+@dataclass
+class Hunk:
+    """One hunk of a unified diff; lines are (tag, text) with tag in ' -+'."""
+    old_start: Optional[int]
+    lines: List[Tuple[str, str]] = field(default_factory=list)
+    # Whether the old/new side ends without a trailing newline
+    old_eof_newline: bool = True
+    new_eof_newline: bool = True
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "+"]
+
+
+@dataclass
+class FilePatch:
+    """Changes to one file; a None path means the file is created or deleted."""
+    old_path: Optional[str]
+    new_path: Optional[str]
+    hunks: List[Hunk] = field(default_factory=list)
+
+    @property
+    def display(self) -> str:
+        if self.old_path is None:
+            return f"A {self.new_path}"
+        if self.new_path is None:
+            return f"D {self.old_path}"
+        if self.old_path != self.new_path:
+            return f"R {self.old_path} -> {self.new_path}"
+        return f"M {self.old_path}"
+
+
+def _clean_path(raw: str, prefix: str) -> Optional[str]:
+    path = raw.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    if path.startswith(prefix):
+        path = path[len(prefix):]
+    return os.path.normpath(path)
+
+
+def _is_file_header(lines: List[str], i: int) -> bool:
+    return lines[i].startswith("diff --git ") or (
+        lines[i].startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")
+    )
+
+
+def parse_patch(text: str) -> List[FilePatch]:
+    """Parse a (possibly multi-file, git-style) unified diff."""
+    lines = [line for line in text.splitlines() if not line.startswith("```")]
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    git_header = False
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("diff --git "):
+            parts = line.split()
+            old = _clean_path(parts[2], "a/") if len(parts) >= 4 else None
+            new = _clean_path(parts[3], "b/") if len(parts) >= 4 else None
+            current = FilePatch(old, new)
+            patches.append(current)
+            git_header = True
+            i += 1
+            # Extended git headers
+            while i < len(lines) and not lines[i].startswith(("--- ", "@@", "diff --git ")):
+                header = lines[i]
+                if header.startswith("new file mode"):
+                    current.old_path = None
+                elif header.startswith("deleted file mode"):
+                    current.new_path = None
+                elif header.startswith("rename from "):
+                    current.old_path = os.path.normpath(header[len("rename from "):].strip())
+                elif header.startswith("rename to "):
+                    current.new_path = os.path.normpath(header[len("rename to "):].strip())
+                i += 1
+            continue
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old = _clean_path(line[4:], "a/")
+            new = _clean_path(lines[i + 1][4:], "b/")
+            if git_header and old in (None, current.old_path) and new in (None, current.new_path):
+                # Headers after "diff --git" only add creation/deletion markers
+                if old is None:
+                    current.old_path = None
+                if new is None:
+                    current.new_path = None
+            else:
+                current = FilePatch(old, new)
+                patches.append(current)
+            git_header = False
+            i += 2
+            continue
+        if line.startswith("@@"):
+            if current is None:
+                raise PatchError("Hunk found before any file header (--- a/path, +++ b/path)")
+            git_header = False
+            match = _HUNK_HEADER.match(line)
+            hunk = Hunk(int(match.group(1)) if match else None)
+            current.hunks.append(hunk)
+            i += 1
+            while i < len(lines) and not lines[i].startswith("@@") and not _is_file_header(lines, i):
+                body = lines[i]
+                if body.startswith("\\"):
+                    # "\ No newline at end of file" refers to the preceding line
+                    if hunk.lines and hunk.lines[-1][0] == "+":
+                        hunk.new_eof_newline = False
+                    elif hunk.lines and hunk.lines[-1][0] == "-":
+                        hunk.old_eof_newline = False
+                    elif hunk.lines:
+                        hunk.old_eof_newline = hunk.new_eof_newline = False
+                elif body[:1] in (" ", "-", "+"):
+                    hunk.lines.append((body[0], body[1:]))
+                else:
+                    # Editors and models often strip the space from blank context lines
+                    hunk.lines.append((" ", body))
+                i += 1
+            while hunk.lines and hunk.lines[-1] == (" ", ""):
+                hunk.lines.pop()
+            if not hunk.lines:
+                current.hunks.pop()
+            continue
+        i += 1
+    if not patches:
+        raise PatchError("No file changes found; expected a unified diff with ---/+++ headers and @@ hunks")
+    for patch in patches:
+        if patch.old_path is None and patch.new_path is None:
+            raise PatchError("File header without a path")
+    return patches
+
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split())
+
+
+def _find_block(lines: List[str], block: List[str], hint: int, start: int, loose: bool) -> Optional[int]:
+    """Position at or after ``start`` where ``block`` matches, closest to ``hint``."""
+    if loose:
+        lines = [_normalize(line) for line in lines]
+        block = [_normalize(line) for line in block]
+    last = len(lines) - len(block)
+    if last < start:
+        return None
+    hint = min(max(hint, start), last)
+    for distance in range(max(hint - start, last - hint) + 1):
+        for position in (hint - distance, hint + distance):
+            if start <= position <= last and lines[position:position + len(block)] == block:
+                return position
+    return None
+
+
+def apply_hunks(lines: List[str], hunks: List[Hunk], max_fuzz: int = 2) -> Tuple[List[str], List[str], Optional[str]]:
+    """Apply hunks to a file's lines.
+
+    Each hunk is located near its header line number, first exactly, then
+    ignoring whitespace differences, then with up to ``max_fuzz`` context
+    lines dropped from either edge. Returns the new lines, a report per
+    applied hunk and an error for the first hunk that could not be placed.
+    """
+    result = list(lines)
+    reports: List[str] = []
+    # Net lines added by earlier hunks, and how far the last hunk was from its header
+    shift = 0
+    drift = 0
+    start = 0
+    for number, hunk in enumerate(hunks, 1):
+        hunk_lines = hunk.lines
+        expected = (hunk.old_start - 1 if hunk.old_start else 0) + shift
+        if not hunk.old_lines:
+            # Pure insertion: "@@ -N,0" inserts after line N
+            position = min(max(expected + (1 if hunk.old_start else 0), start), len(result))
+            added = [text for _, text in hunk_lines]
+            result[position:position] = added
+            reports.append(f"hunk {number}: inserted at line {position + 1}")
+            shift += len(added)
+            start = position + len(added)
+            continue
+
+        found = None
+        tried = set()
+        for fuzz in range(max_fuzz + 1):
+            # Drop context from the edges only; changed lines must always match
+            lead = trail = 0
+            while lead < fuzz and hunk_lines[lead][0] == " ":
+                lead += 1
+            while trail < fuzz and len(hunk_lines) - lead - trail > 1 and hunk_lines[-1 - trail][0] == " ":
+                trail += 1
+            if (lead, trail) in tried:
+                continue
+            tried.add((lead, trail))
+            trimmed = hunk_lines[lead:len(hunk_lines) - trail]
+            block = [text for tag, text in trimmed if tag != "+"]
+            if not block:
+                continue
+            for loose in (False, True):
+                position = _find_block(result, block, expected + drift + lead, start, loose)
+                if position is not None:
+                    found = (position, lead, trimmed, fuzz, loose)
+                    break
+            if found:
+                break
+        if found is None:
+            lines_text = "\n".join(f"    {text}" for text in hunk.old_lines[:8])
+            near = f" near line {hunk.old_start}" if hunk.old_start else ""
+            return result, reports, f"hunk {number} FAILED: could not find these lines{near}:\n{lines_text}"
+
+        position, lead, trimmed, fuzz, loose = found
+        replacement: List[str] = []
+        cursor = position
+        for tag, text in trimmed:
+            if tag == " ":
+                # Keep the file's own version of context lines
+                replacement.append(result[cursor])
+                cursor += 1
+            elif tag == "-":
+                cursor += 1
+            else:
+                replacement.append(text)
+        result[position:cursor] = replacement
+
+        actual = position - lead
+        drift = actual - expected if hunk.old_start else 0
+        notes = []
+        if drift:
+            notes.append(f"offset {drift:+d} lines")
+        if loose:
+            notes.append("whitespace differences ignored")
+        if fuzz:
+            notes.append(f"fuzz {fuzz}")
+        reports.append(f"hunk {number}: applied at line {actual + 1}" + (f" ({', '.join(notes)})" if notes else ""))
+        shift += len(replacement) - (cursor - position)
+        start = position + len(replacement)
+    return result, reports, None
+
+
+def _split(content: str) -> Tuple[List[str], str, bool]:
+    """Split file content into lines, its newline style and trailing-newline flag."""
+    newline = "\r\n" if "\r\n" in content else "\n"
+    if not content:
+        return [], newline, True
+    eof_newline = content.endswith(newline)
+    if eof_newline:
+        content = content[:-len(newline)]
+    return content.split(newline), newline, eof_newline
+
+
+def _join(lines: List[str], newline: str, eof_newline: bool) -> str:
+    if not lines:
+        return ""
+    return newline.join(lines) + (newline if eof_newline else "")
+
+
+class ApplyPatchTool(NativeTool):
+    name = "apply_patch"
+    description = """Apply a unified diff to one or more files in a single call. Prefer this over several edit_file calls for multi-location or multi-file changes.
+- Standard format: '--- a/path' and '+++ b/path' headers, then '@@ -start,count +start,count @@' hunks with ' ' context, '-' removed and '+' added lines
+- Create a file with '--- /dev/null', delete one with '+++ /dev/null'; git-style 'rename from'/'rename to' headers are supported
+- Hunks are located near their line numbers and tolerate small drift: whitespace differences and up to 2 mismatched context lines at the edges of a hunk
+- All-or-nothing: if any hunk or file fails, nothing is written and the report says which hunk failed"""
+    parameters = {
+        "type": "object",
+        "properties": {
+            "patch": {
+                "type": "string",
+                "description": "The unified diff to apply; paths are relative to the working directory"
+            },
+        },
+        "required": ["patch"],
+    }
+
+    def __init__(self, max_fuzz: int = 2) -> None:
+        self.max_fuzz = max_fuzz
+
+    def modified_paths(self, params: Dict[str, Any]) -> List[str]:
+        try:
+            patches = parse_patch(params["patch"])
+        except PatchError:
+            return []
+        paths = []
+        for patch in patches:
+            paths.extend(path for path in (patch.old_path, patch.new_path) if path and path not in paths)
+        return paths
+
+    async def execute(self, patch: str, **_: Any) -> ToolResult:
+        try:
+            patches = parse_patch(patch)
+        except PatchError as exc:
+            return ToolResult(success=False, error=str(exc))
+
+        # Apply everything to an in-memory view of the affected files first
+        originals: Dict[str, Optional[str]] = {}
+        state: Dict[str, Optional[str]] = {}
+
+        def load(path: str) -> Optional[str]:
+            if path not in state:
+                try:
+                    with open(path, "r", encoding="utf-8", newline="") as f:
+                        originals[path] = f.read()
+                except FileNotFoundError:
+                    originals[path] = None
+                except (OSError, UnicodeDecodeError) as exc:
+                    raise PatchError(f"cannot read {path}: {exc}") from exc
+                state[path] = originals[path]
+            return state[path]
+
+        report: List[str] = []
+        try:
+            hunk_count = self._apply(patches, load, state, report)
+        except PatchError as exc:
+            return self._failed(report, str(exc))
+
+        changed = [path for path in state if state[path] != originals[path]]
+        try:
+            self._write(changed, state, originals)
+        except OSError as exc:
+            return ToolResult(success=False, error=f"Patch not applied; failed to write files: {exc}")
+        report.append(f"Applied {hunk_count} hunk(s) to {len(patches)} file(s)")
+        return ToolResult(success=True, output="\n".join(report))
+
+    def _apply(
+        self,
+        patches: List[FilePatch],
+        load: Callable[[str], Optional[str]],
+        state: Dict[str, Optional[str]],
+        report: List[str],
+    ) -> int:
+        """Apply the patches to ``state``; raise PatchError on the first failure."""
+        hunk_count = 0
+        for file_patch in patches:
+            old_path, new_path = file_patch.old_path, file_patch.new_path
+            if old_path is None:
+                if load(new_path) is not None:
+                    raise PatchError(f"{file_patch.display}: file already exists")
+                content = ""
+            else:
+                content = load(old_path)
+                if content is None:
+                    raise PatchError(f"{file_patch.display}: file not found")
+            if new_path is not None and new_path != old_path and old_path is not None and load(new_path) is not None:
+                raise PatchError(f"{file_patch.display}: target already exists")
+
+            lines, newline, eof_newline = _split(content)
+            new_lines, hunk_reports, error = apply_hunks(lines, file_patch.hunks, self.max_fuzz)
+            hunk_count += len(hunk_reports)
+            if error:
+                raise PatchError(f"{file_patch.display}: " + "; ".join(hunk_reports + [error]))
+            for hunk in file_patch.hunks:
+                if not hunk.new_eof_newline:
+                    eof_newline = False
+                elif not hunk.old_eof_newline:
+                    eof_newline = True
+
+            if new_path is None:
+                state[old_path] = None
+                report.append(f"{file_patch.display}: deleted")
+                continue
+            if old_path is not None and old_path != new_path:
+                state[old_path] = None
+            state[new_path] = _join(new_lines, newline, eof_newline)
+            detail = "; ".join(hunk_reports) or "no content changes"
+            if old_path is None:
+                detail = f"created ({len(new_lines)} lines)"
+            report.append(f"{file_patch.display}: {detail}")
+        return hunk_count
+
+    @staticmethod
+    def _failed(report: List[str], error: str) -> ToolResult:
+        return ToolResult(success=False, error="\n".join(["Patch not applied; no files were changed."] + report + [error]))
+
+    @staticmethod
+    def _write(paths: List[str], state: Dict[str, Optional[str]], originals: Dict[str, Optional[str]]) -> None:
+        """Write all changes, restoring the files already written if one fails."""
+        done: List[str] = []
+        try:
+            for path in paths:
+                _store(path, state[path])
+                done.append(path)
+        except OSError:
+            for path in done:
+                try:
+                    _store(path, originals[path])
+                except OSError:
+                    pass
+            raise
+
+
+def _store(path: str, content: Optional[str]) -> None:
+    if content is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    # Write through symlinks, so the link stays a link
+    path = os.path.realpath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_nlink > 1:
+        # Replacing the file would detach it from its other hard links
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    if st is not None:
+        os.chmod(tmp_path, stat.S_IMODE(st.st_mode))
+    os.replace(tmp_path, path)
@@ -0,0 +1,259 @@
+"""Native file and content search tool."""
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from .base import NativeTool
+from ..tools import ToolResult
+from ..walk import FileEntry, glob_to_regex, walk
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore[no-redef]
+
+# Files are read in batches so the walk can stop as soon as enough results are found
+_BATCH_SIZE = 256
+_MAX_FILE_SIZE = 10 * 1024 * 1024
+_MAX_LINE_LENGTH = 300
+
+
+def required_literal(pattern: str, flags: int = 0) -> Optional[str]:
+    """Return the longest literal every match of ``pattern`` must contain.
+
+    Only the top-level sequence of the regex is inspected; patterns with
+    top-level alternation or no literal run return None.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    if parsed.state.flags & re.IGNORECASE and not flags & re.IGNORECASE:
+        # Inline (?i) makes the literal case-insensitive too
+        return None
+    best = ""
+    current: List[str] = []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(arg))
+            continue
+        run = "".join(current)
+        if len(run) > len(best):
+            best = run
+        current = []
+    run = "".join(current)
+    if len(run) > len(best):
+        best = run
+    return best or None
+
+
+def _is_binary(data: bytes) -> bool:
+    return b"\0" in data[:8192]
+
+
+class SearchTool(NativeTool):
+    name = "search"
+    description = """Search the workspace without shelling out. Matches file paths against a glob and/or file contents against a regex.
+- Respects .gitignore and skips binary files and directories such as .git/, node_modules/ and .venv/
+- With only 'glob', lists matching files; with 'pattern', returns path:line: text for each matching line
+- Results are capped by max_results; narrow the glob or path if the output is truncated"""
+    read_only = True
+    parameters = {
+        "type": "object",
+        "properties": {
+            "pattern": {
+                "type": "string",
+                "description": "Regular expression to search for in file contents (Python syntax)"
+            },
+            "glob": {
+                "type": "string",
+                "description": "Only consider files matching this glob, e.g. '*.py' or 'src/**/*.ts'"
+            },
+            "path": {
+                "type": "string",
+                "description": "Directory to search (default: current directory)",
+                "default": "."
+            },
+            "ignore_case": {
+                "type": "boolean",
+                "description": "Case-insensitive matching (default: false)",
+                "default": False
+            },
+            "fixed_strings": {
+                "type": "boolean",
+                "description": "Treat pattern as a literal string instead of a regex (default: false)",
+                "default": False
+            },
+            "max_results": {
+                "type": "integer",
+                "description": "Maximum number of matching lines or files to return (default: 200)",
+                "default": 200
+            },
+        },
+    }
+
+    def __init__(self, workers: int = 8, max_output_bytes: int = 50000) -> None:
+        self.workers = workers
+        self.max_output_bytes = max_output_bytes
+
+    async def execute(
+        self,
+        pattern: str | None = None,
+        glob: str | None = None,
+        path: str = ".",
+        ignore_case: bool = False,
+        fixed_strings: bool = False,
+        max_results: int = 200,
+        **_: Any,
+    ) -> ToolResult:
+        if not pattern and not glob:
+            return ToolResult(success=False, error="Provide a pattern, a glob, or both")
+        if not os.path.isdir(path):
+            return ToolResult(success=False, error=f"Directory not found: {path}")
+        try:
+            matcher = self._compile(pattern, ignore_case, fixed_strings) if pattern else None
+        except re.error as exc:
+            return ToolResult(success=False, error=f"Invalid regex: {exc}")
+        return await asyncio.to_thread(self._search, path, matcher, glob, max(max_results, 1))
+
+    @staticmethod
+    def _compile(pattern: str, ignore_case: bool, fixed_strings: bool) -> Tuple["re.Pattern[bytes]", Callable[[bytes], bool]]:
+        source = re.escape(pattern) if fixed_strings else pattern
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex = re.compile(source.encode("utf-8"), flags)
+        literal = required_literal(source, flags & re.IGNORECASE)
+        if not literal:
+            return regex, lambda data: True
+        encoded = literal.encode("utf-8")
+        if ignore_case:
+            # A case-insensitive literal search is still far cheaper than the full regex
+            return regex, re.compile(re.escape(encoded), re.IGNORECASE).search
+        return regex, lambda data: encoded in data
+
+    def _search(self, root: str, matcher: Any, glob: str | None, max_results: int) -> ToolResult:
+        stop = threading.Event()
+        glob_match = self._glob_matcher(glob)
+        lines: List[str] = []
+        output_bytes = 0
+        files_with_matches = 0
+        truncated = False
+
+        def accept(line: str) -> bool:
+            nonlocal output_bytes, truncated
+            if len(lines) >= max_results or output_bytes + len(line) > self.max_output_bytes:
+                truncated = True
+                stop.set()
+                return False
+            lines.append(line)
+            output_bytes += len(line) + 1
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            batch: List[FileEntry] = []
+            entries = walk(root, executor=executor, stop=stop)
+            for entry in entries:
+                if glob_match is not None and not glob_match(entry.rel):
+                    continue
+                if matcher is None:
+                    if not accept(os.path.join(root, entry.rel) if root != "." else entry.rel):
+                        break
+                    continue
+                batch.append(entry)
+                if len(batch) >= _BATCH_SIZE:
+                    files_with_matches += self._search_batch(executor, batch, root, matcher, stop, accept)
+                    batch = []
+                    if stop.is_set():
+                        break
+            if batch and not stop.is_set():
+                files_with_matches += self._search_batch(executor, batch, root, matcher, stop, accept)
+            entries.close()
+
+        if not lines:
+            return ToolResult(success=True, output="No matches found")
+        if matcher is None:
+            summary = f"[{len(lines)} files"
+        else:
+            summary = f"[{len(lines)} matching lines in {files_with_matches} files"
+        summary += "; results truncated, narrow the search]" if truncated else "]"
+        return ToolResult(success=True, output="\n".join(lines) + "\n" + summary)
+
+    @staticmethod
+    def _glob_matcher(glob: str | None) -> Optional[Callable[[str], bool]]:
+        if not glob:
+            return None
+        if glob.startswith("./"):
+            glob = glob[2:]
+        regex = re.compile(glob_to_regex(glob) + r"\Z")
+        if "/" in glob:
+            return lambda rel: regex.match(rel) is not None
+        return lambda rel: regex.match(rel.rsplit("/", 1)[-1]) is not None
+
+    def _search_batch(
+        self,
+        executor: ThreadPoolExecutor,
+        batch: List[FileEntry],
+        root: str,
+        matcher: Any,
+        stop: threading.Event,
+        accept: Callable[[str], bool],
+    ) -> int:
+        regex, prefilter = matcher
+        files = 0
+        # Each task searches a slice of files to keep thread pool overhead low
+        size = max(len(batch) // self.workers, 1)
+        chunks = [batch[i:i + size] for i in range(0, len(batch), size)]
+        results = executor.map(lambda chunk: [self._search_file(e, regex, prefilter, stop) for e in chunk], chunks)
+        # Results come back in walk order, so output is deterministic
+        for entry, matches in zip(batch, (matches for chunk in results for matches in chunk)):
+            if not matches:
+                continue
+            files += 1
+            display = os.path.join(root, entry.rel) if root != "." else entry.rel
+            for line_number, text in matches:
+                if not accept(f"{display}:{line_number}: {text}"):
+                    return files
+        return files
+
+    @staticmethod
+    def _search_file(
+        entry: FileEntry,
+        regex: "re.Pattern[bytes]",
+        prefilter: Callable[[bytes], Any],
+        stop: threading.Event,
+    ) -> List[Tuple[int, str]]:
+        if stop.is_set() or entry.size > _MAX_FILE_SIZE:
+            return []
+        try:
+            with open(entry.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return []
+        if not prefilter(data) or _is_binary(data):
+            return []
+        matches: List[Tuple[int, str]] = []
+        line_number = 1
+        position = 0
+        last_line_start = -1
+        for match in regex.finditer(data):
+            start = match.start()
+            line_number += data.count(b"\n", position, start)
+            position = start
+            line_start = data.rfind(b"\n", 0, start) + 1
+            if line_start == last_line_start:
+                continue
+            last_line_start = line_start
+            line_end = data.find(b"\n", start)
+            if line_end == -1:
+                line_end = len(data)
+            text = data[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r")
+            if len(text) > _MAX_LINE_LENGTH:
+                text = text[:_MAX_LINE_LENGTH] + "..."
+            matches.append((line_number, text))
+            if stop.is_set():
+                break
+        return matches
@@ -2,20 +2,88 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict
+import os
+import shlex
+from typing import Any, Dict, Optional
 
 from .base import NativeTool
+from .executor import CommandExecutor
+from .jobs import JobManager
 from ..tools import ToolResult
 
 
+# Commands whose output depends only on the state of the workspace
+_READ_ONLY_COMMANDS = frozenset({
+    "basename", "cat", "cmp", "cut", "diff", "dirname", "du", "echo", "egrep",
+    "fd", "fgrep", "file", "find", "grep", "head", "jq", "ls", "md5sum", "nl",
+    "pwd", "realpath", "rg", "sha1sum", "sha256sum", "sort", "stat", "tail",
+    "tr", "tree", "uniq", "wc", "which",
+})
+_READ_ONLY_GIT_COMMANDS = frozenset({
+    "blame", "diff", "grep", "log", "ls-files", "rev-parse", "show", "status",
+})
+_WRITING_ARGS = frozenset({
+    "-delete", "-exec", "-execdir", "-fls", "-fprint", "-fprint0", "-fprintf", "-ok", "-okdir",
+})
+# Commands whose short -o flag names an output file
+_OUTPUT_FLAG_COMMANDS = frozenset({"sort", "tree"})
+_COMMAND_SEPARATORS = frozenset({"|", "||", "&&", ";"})
+
+
+def is_read_only_command(command: str) -> bool:
+    """Conservatively decide whether a shell command has no side effects.
+
+    Only pipelines and lists of allowlisted commands without redirections,
+    substitutions or writing flags qualify.
+    """
+    if any(marker in command for marker in ("`", "$(", "<(", ">(", "\n")):
+        return False
+    try:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+    except ValueError:
+        return False
+
+    segments = [[]]
+    for token in tokens:
+        if token in _COMMAND_SEPARATORS:
+            segments.append([])
+        elif not token.strip("<>&|;()"):
+            # Redirections, background jobs and subshells
+            return False
+        else:
+            segments[-1].append(token)
+
+    segments = [argv for argv in segments if argv]
+    if not segments:
+        return False
+    for argv in segments:
+        program = os.path.basename(argv[0])
+        if "=" in argv[0]:
+            return False
+        if program == "git":
+            subcommand = next((arg for arg in argv[1:] if not arg.startswith("-")), None)
+            if subcommand not in _READ_ONLY_GIT_COMMANDS:
+                return False
+        elif program not in _READ_ONLY_COMMANDS:
+            return False
+        if any(arg in _WRITING_ARGS or arg.startswith("--output") for arg in argv[1:]):
+            return False
+        if program in _OUTPUT_FLAG_COMMANDS and any(
+            arg.startswith("-") and not arg.startswith("--") and "o" in arg for arg in argv[1:]
+        ):
+            return False
+    return True
+
+
 class ShellTool(NativeTool):
     name = "shell"
     description = """Execute shell commands. Best practices:
+- For searching file contents or finding files by name: prefer the search tool, which is fast, respects .gitignore and works even when 'rg'/'fd' are not installed
 - For file listing: use 'git ls-files' (respects .gitignore) or 'find' with exclusions for .venv/, __pycache__/, .git/, node_modules/, .pytest_cache/, etc.
-- For searching file contents: prefer 'rg' (ripgrep) which is fast and automatically respects .gitignore
 - For directory traversal: exclude common build/cache directories to avoid noise
-- Use specific file extensions or patterns when possible to narrow results
-- Consider using tools like 'fd' for file finding as an alternative to 'find'"""
+- Use specific file extensions or patterns when possible to narrow results"""
     parameters = {
         "type": "object",
         "properties": {
@@ -25,27 +93,51 @@ class ShellTool(NativeTool):
             },
             "timeout": {
                 "type": "number", 
-                "description": "Optional timeout in seconds (default: 300)",
+                "description": "Optional timeout in seconds (default: 300); does not apply to background jobs",
                 "default": 300
             },
+            "background": {
+                "type": "boolean",
+                "description": "Start the command as a background job and return its job id immediately; use the job tool to poll output, send input or kill it. Use for builds, test suites and servers that take a while",
+                "default": False
+            },
         },
         "required": ["command"],
     }
 
-    async def execute(self, command: str, timeout: float | None = 300, **_: Any) -> ToolResult:
-        try:
-            proc = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-            )
+    def __init__(self, jobs: Optional[JobManager] = None, executor: Optional[CommandExecutor] = None) -> None:
+        self.jobs = jobs
+        self.executor = executor or CommandExecutor()
+
+    def is_read_only(self, params: Dict[str, Any]) -> bool:
+        if params.get("background"):
+            return False
+        return is_read_only_command(params.get("command", ""))
+
+    async def close(self) -> None:
+        if self.jobs is not None:
+            await asyncio.to_thread(self.jobs.close)
+
+    async def execute(self, command: str, timeout: float | None = 300, background: bool = False, **_: Any) -> ToolResult:
+        if background:
+            if self.jobs is None:
+                return ToolResult(success=False, error="Background jobs are not enabled")
             try:
-                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-            except asyncio.TimeoutError:
-                proc.kill()
-                return ToolResult(success=False, error="Command timed out")
-            output = stdout.decode().strip()
-            return ToolResult(success=True, output=output)
+                job = self.jobs.start(command)
+            except Exception as exc:
+                return ToolResult(success=False, error=str(exc))
+            return ToolResult(
+                success=True,
+                output=f"Started job {job.id} (pid {job.process.pid}). Use the job tool to poll its output or status.",
+            )
+        try:
+            result = await self.executor.run(command, timeout=timeout)
         except Exception as exc:
             return ToolResult(success=False, error=str(exc))
-
+        if result.timed_out:
+            return ToolResult(success=False, error="Command timed out", metadata=result.metadata)
+        output = result.output.strip()
+        if result.signal is not None:
+            reason = result.limit_exceeded or f"terminated by signal {result.signal}"
+            return ToolResult(success=False, error=f"{output}\n[Command {reason}]".lstrip(), metadata=result.metadata)
+        return ToolResult(success=True, output=output, metadata=result.metadata)
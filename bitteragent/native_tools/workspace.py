@@ -0,0 +1,52 @@
+"""Workspace overview and symbol lookup tool."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from .base import NativeTool
+from ..tools import ToolResult
+from ..workspace import WorkspaceIndex
+
+
+class WorkspaceTool(NativeTool):
+    name = "workspace_overview"
+    description = """Get oriented in the workspace in one call instead of running ls -R/find/cat.
+- Without 'symbol': returns a compact file tree with sizes, languages and the top-level functions/classes of each file
+- With 'symbol': returns where a function, class or method is defined (file:line)"""
+    read_only = True
+    parameters = {
+        "type": "object",
+        "properties": {
+            "path": {
+                "type": "string",
+                "description": "Subdirectory to focus on, relative to the workspace root (default: whole workspace)",
+                "default": ""
+            },
+            "depth": {
+                "type": "integer",
+                "description": "Directory depth to expand in the tree (default: 2)",
+                "default": 2
+            },
+            "symbol": {
+                "type": "string",
+                "description": "Name of a symbol to look up instead of returning the tree"
+            },
+        },
+    }
+
+    def __init__(self, index: WorkspaceIndex) -> None:
+        self.index = index
+
+    async def execute(self, path: str = "", depth: int = 2, symbol: str | None = None, **_: Any) -> ToolResult:
+        try:
+            if symbol:
+                matches = await asyncio.to_thread(self.index.find_symbol, symbol)
+                if not matches:
+                    return ToolResult(success=True, output=f"No symbols matching '{symbol}'")
+                lines = [f"{rel}:{line}: {kind} {name}" for rel, kind, name, line in matches]
+                return ToolResult(success=True, output="\n".join(lines))
+            output = await asyncio.to_thread(self.index.overview, path, max(depth, 1))
+            return ToolResult(success=True, output=output)
+        except Exception as exc:
+            return ToolResult(success=False, error=str(exc))
@@ -2,5 +2,8 @@
 
 from .base import Provider
 from .anthropic import AnthropicProvider
+from .batch import BatchProvider
+from .openai import OpenAIProvider
+from .rate_limit import RateLimiter
 
-__all__ = ["Provider", "AnthropicProvider"]
+__all__ = ["Provider", "AnthropicProvider", "BatchProvider", "OpenAIProvider", "RateLimiter"]
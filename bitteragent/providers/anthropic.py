@@ -3,16 +3,89 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Dict, List, Callable, Optional
+import random
+from typing import Any, Dict, List, Callable, Optional, Sequence
 
 import anthropic
 
 
 from .base import Provider
+from .json_stream import IncrementalJSONParser, ToolInputError
+from .rate_limit import RateLimiter
+
+# Maximum output tokens per request, matched by model name prefix
+MODEL_OUTPUT_LIMITS: Dict[str, int] = {
+    "claude-opus-4": 32000,
+    "claude-sonnet-4": 64000,
+    "claude-3-7-sonnet": 64000,
+    "claude-haiku-4": 64000,
+    "claude-3-5-sonnet": 8192,
+    "claude-3-5-haiku": 8192,
+    "claude-3-haiku": 4096,
+}
+DEFAULT_OUTPUT_LIMIT = 4096
+
+
+def model_output_limit(model: str) -> int:
+    """Largest max_tokens the model accepts."""
+    for prefix in sorted(MODEL_OUTPUT_LIMITS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_OUTPUT_LIMITS[prefix]
+    return DEFAULT_OUTPUT_LIMIT
+
+
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+def _usage_dict(usage: Any, into: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Copy the token counts that are set on an SDK usage object."""
+    into = {} if into is None else into
+    for name in _USAGE_FIELDS:
+        value = getattr(usage, name, None)
+        if isinstance(value, int):
+            into[name] = value
+    return into
+
+
+def _add_usage(total: Dict[str, int], usage: Dict[str, int]) -> None:
+    for name, value in usage.items():
+        total[name] = total.get(name, 0) + value
+
+
+class _ShownText:
+    """Passes streamed text to a callback once across the requests made for one response.
+
+    Each request's text starts at ``start`` in the response; text before
+    ``shown`` already reached the callback, e.g. from a request that was
+    retried or repeated with more tokens, and is held back.
+    """
+
+    def __init__(self, callback: Callable[[str], None]) -> None:
+        self.callback = callback
+        self.start = 0
+        self.shown = 0
+        self.position = 0
+
+    def begin(self) -> None:
+        self.position = self.start
+
+    def __call__(self, text: str) -> None:
+        end = self.position + len(text)
+        if end > self.shown:
+            self.callback(text[max(self.shown - self.position, 0):])
+            self.shown = end
+        self.position = end
 
 
 class AnthropicProvider(Provider):
-    """Provider using Anthropic's API."""
+    """Provider using Anthropic's API.
+
+    ``max_tokens`` is the output limit requests start from. It grows with the
+    largest tool input seen in the session and never exceeds
+    ``output_limit`` (the model's limit by default). A response cut off at
+    the limit is continued if it is plain text, or retried with a doubled
+    limit if a tool call was truncated, up to ``max_continuations`` times.
+    """
 
     def __init__(
         self,
@@ -21,109 +94,235 @@ class AnthropicProvider(Provider):
         max_retries: int = 3,
         timeout: int = 600,
         text_callback: Optional[Callable[[str], None]] = None,
+        tool_input_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        max_tokens: int = 8192,
+        output_limit: Optional[int] = None,
+        max_continuations: int = 2,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
     ) -> None:
         if anthropic is None:
             raise ImportError(
                 "anthropic package not installed. Install with: pip install anthropic"
             )
-        self.client = anthropic.AsyncAnthropic(api_key=api_key, timeout=timeout)
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, timeout=timeout, base_url=base_url)
         self.model = model
         self.max_retries = max_retries
+        self.output_limit = output_limit or model_output_limit(model)
+        self.max_tokens = min(max_tokens, self.output_limit)
+        self.max_continuations = max_continuations
+        self.rate_limiter = rate_limiter
+        # Raised when a truncated tool call needed a larger limit, so later requests start there
+        self._max_tokens_floor = 0
+        self._largest_tool_input = 0
         self.text_callback = text_callback
+        # Receives partially streamed tool arguments as top-level members complete
+        self.tool_input_callback = tool_input_callback
         # Track token usage
         self.total_input_tokens = 0
         self.total_output_tokens = 0
 
-    async def complete(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]] | None = None) -> Dict[str, Any]:
+    def _build_request(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        tools: List[Dict[str, Any]] | None,
+        system: str | None,
+    ) -> Dict[str, Any]:
+        """Prepare request arguments once so retries can reuse them."""
+        # Support callers that still pass the system prompt as a leading message
+        if system is None and messages and messages[0].get("role") == "system":
+            system = messages[0].get("content", "")
+            messages = messages[1:]
+
+        kwargs: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.request_max_tokens(),
+        }
+        if system:
+            kwargs["system"] = system
+        if tools:
+            kwargs["tools"] = tools
+        return kwargs
+
+    def request_max_tokens(self) -> int:
+        """Output limit for the next request."""
+        # Roughly 3 characters per token for code and JSON; leave 50% headroom plus room for text
+        needed = self._largest_tool_input // 2 + 1024
+        return min(max(self.max_tokens, self._max_tokens_floor, needed), self.output_limit)
+
+    def _observe(self, content: List[Dict[str, Any]]) -> None:
+        for block in content:
+            if block.get("type") == "tool_use":
+                size = len(json.dumps(block.get("input", {}), ensure_ascii=False))
+                self._largest_tool_input = max(self._largest_tool_input, size)
+
+    def _track_usage(self, usage: Dict[str, int]) -> None:
+        self.total_input_tokens += usage.get("input_tokens", 0)
+        self.total_output_tokens += usage.get("output_tokens", 0)
+
+    async def _consume_stream(self, stream: Any, shown: Optional[_ShownText] = None) -> Dict[str, Any]:
+        """Assemble streamed content blocks, accumulating deltas in chunk lists."""
+        text_callback = shown if shown is not None else self.text_callback
+        content: List[Dict[str, Any]] = []
+        input_errors: Dict[str, str] = {}
+        text_parts: List[str] = []
+        current_tool_use: Dict[str, Any] | None = None
+        parser: IncrementalJSONParser | None = None
+        usage: Dict[str, int] = {}
+        stop_reason: Optional[str] = None
+
+        async for event in stream:
+            if event.type == "message_start":
+                # Input token counts arrive up front, output counts with message_delta
+                _usage_dict(getattr(event.message, "usage", None), usage)
+            elif event.type == "message_delta":
+                # Output token counts are cumulative
+                _usage_dict(getattr(event, "usage", None), usage)
+                stop_reason = getattr(event.delta, "stop_reason", None) or stop_reason
+            elif event.type == "content_block_start":
+                if event.content_block.type == "text":
+                    text_parts = []
+                elif event.content_block.type == "tool_use":
+                    current_tool_use = {
+                        "type": "tool_use",
+                        "id": event.content_block.id,
+                        "name": event.content_block.name,
+                        "input": {}
+                    }
+                    parser = IncrementalJSONParser()
+            elif event.type == "content_block_delta":
+                if event.delta.type == "text_delta":
+                    text_parts.append(event.delta.text)
+                    text_callback(event.delta.text)
+                elif event.delta.type == "input_json_delta" and parser is not None:
+                    if parser.feed(event.delta.partial_json) and self.tool_input_callback:
+                        self.tool_input_callback(current_tool_use["name"], dict(parser.partial))
+            elif event.type == "content_block_stop":
+                if current_tool_use is not None:
+                    try:
+                        current_tool_use["input"] = parser.result()
+                    except ToolInputError as exc:
+                        # Keep a valid block for the history; the agent reports the error
+                        input_errors[current_tool_use["id"]] = str(exc)
+                    content.append(current_tool_use)
+                    current_tool_use = None
+                    parser = None
+                elif text_parts:
+                    content.append({"type": "text", "text": "".join(text_parts)})
+                    text_parts = []
+            elif event.type == "message_stop":
+                break
+
+        # A stream that ends mid-block still yields what arrived so far
+        if current_tool_use is not None:
+            try:
+                current_tool_use["input"] = parser.result()
+            except ToolInputError as exc:
+                input_errors[current_tool_use["id"]] = str(exc)
+            content.append(current_tool_use)
+        elif text_parts:
+            content.append({"type": "text", "text": "".join(text_parts)})
+
+        self._track_usage(usage)
+        response: Dict[str, Any] = {"content": content, "usage": usage, "stop_reason": stop_reason}
+        if input_errors:
+            response["tool_input_errors"] = input_errors
+        return response
+
+    async def complete(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        tools: List[Dict[str, Any]] | None = None,
+        system: str | None = None,
+    ) -> Dict[str, Any]:
+        kwargs = self._build_request(messages, tools, system)
+        shown = _ShownText(self.text_callback) if self.text_callback else None
+        response = await self._request(kwargs, shown)
+        usage = dict(response["usage"])
+        for _ in range(self.max_continuations):
+            if response.get("stop_reason") != "max_tokens":
+                break
+            content = response["content"]
+            if content and all(block.get("type") == "text" for block in content):
+                # Plain text: prefill what we have and let the model carry on
+                continuation = self._continuation(kwargs, content)
+                if shown is not None:
+                    # New text after the prefill
+                    shown.start = shown.shown = len(continuation["messages"][-1]["content"])
+                more = await self._request(continuation, shown)
+                _add_usage(usage, more["usage"])
+                response = self._merge_continuation(content, more)
+            elif kwargs["max_tokens"] < self.output_limit:
+                # A truncated tool call cannot be resumed; ask again with more room
+                kwargs = {**kwargs, "max_tokens": min(kwargs["max_tokens"] * 2, self.output_limit)}
+                self._max_tokens_floor = kwargs["max_tokens"]
+                if shown is not None:
+                    # The answer starts over; hold back the text already shown
+                    shown.start = 0
+                response = await self._request(kwargs, shown)
+                _add_usage(usage, response["usage"])
+            else:
+                break
+        if response.get("stop_reason") == "max_tokens":
+            self._flag_truncated_tool_use(response)
+        self._observe(response["content"])
+        response["usage"] = usage
+        return response
+
+    @staticmethod
+    def _continuation(kwargs: Dict[str, Any], content: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # The API rejects a final assistant message that ends in whitespace
+        prefill = "".join(block["text"] for block in content).rstrip()
+        messages = [*kwargs["messages"], {"role": "assistant", "content": prefill}]
+        return {**kwargs, "messages": messages}
+
+    @staticmethod
+    def _merge_continuation(content: List[Dict[str, Any]], more: Dict[str, Any]) -> Dict[str, Any]:
+        text = "".join(block["text"] for block in content).rstrip()
+        blocks = list(more["content"])
+        if blocks and blocks[0].get("type") == "text":
+            text += blocks.pop(0)["text"]
+        return {**more, "content": [{"type": "text", "text": text}, *blocks]}
+
+    @staticmethod
+    def _flag_truncated_tool_use(response: Dict[str, Any]) -> None:
+        """Mark a tool call cut off by the output limit even if its partial input parsed."""
+        content = response["content"]
+        if content and content[-1].get("type") == "tool_use":
+            errors = response.setdefault("tool_input_errors", {})
+            errors.setdefault(
+                content[-1]["id"], "tool input was cut off by the output token limit"
+            )
+
+    def _message_dict(self, resp: Any) -> Dict[str, Any]:
+        """Convert a complete SDK message to the response format."""
+        usage = _usage_dict(getattr(resp, "usage", None))
+        self._track_usage(usage)
+        content = [block.model_dump() for block in resp.content]
+        return {"content": content, "usage": usage, "stop_reason": getattr(resp, "stop_reason", None)}
+
+    async def _request(self, kwargs: Dict[str, Any], shown: Optional[_ShownText] = None) -> Dict[str, Any]:
         last_exc: Exception | None = None
         for attempt in range(self.max_retries):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
             try:
-                # Extract system message if present
-                system_message = None
-                filtered_messages = []
-                for msg in messages:
-                    if msg.get("role") == "system":
-                        system_message = msg.get("content", "")
-                    else:
-                        filtered_messages.append(msg)
-                
-                kwargs = {
-                    "model": self.model,
-                    "messages": filtered_messages,
-                    "max_tokens": 4096,
-                }
-                if system_message:
-                    kwargs["system"] = system_message
-                if tools:
-                    kwargs["tools"] = tools
-                
                 # Use streaming if we have a text callback
                 if self.text_callback:
-                    kwargs["stream"] = True
-                    stream = await self.client.messages.create(**kwargs)
-                    
-                    content = []
-                    current_text = ""
-                    current_tool_use = None
-                    current_tool_input_json = ""
-                    
-                    async for event in stream:
-                        if event.type == "content_block_start":
-                            if event.content_block.type == "text":
-                                current_text = ""
-                            elif event.content_block.type == "tool_use":
-                                current_tool_use = {
-                                    "type": "tool_use",
-                                    "id": event.content_block.id,
-                                    "name": event.content_block.name,
-                                    "input": {}
-                                }
-                                current_tool_input_json = ""
-                        elif event.type == "content_block_delta":
-                            if event.delta.type == "text_delta":
-                                current_text += event.delta.text
-                                self.text_callback(event.delta.text)
-                            elif event.delta.type == "input_json_delta":
-                                current_tool_input_json += event.delta.partial_json
-                        elif event.type == "content_block_stop":
-                            if current_text:
-                                content.append({"type": "text", "text": current_text})
-                                current_text = ""
-                            elif current_tool_use:
-                                # Parse the accumulated JSON for tool input
-                                try:
-                                    current_tool_use["input"] = json.loads(current_tool_input_json) if current_tool_input_json else {}
-                                except json.JSONDecodeError:
-                                    current_tool_use["input"] = {}
-                                content.append(current_tool_use)
-                                current_tool_use = None
-                                current_tool_input_json = ""
-                        elif event.type == "message_stop":
-                            # Track usage if available
-                            if hasattr(event, 'usage'):
-                                self.total_input_tokens += getattr(event.usage, 'input_tokens', 0)
-                                self.total_output_tokens += getattr(event.usage, 'output_tokens', 0)
-                            break
-                    
-                    return {"content": content}
+                    if shown is None:
+                        shown = _ShownText(self.text_callback)
+                    # A retry after a broken stream repeats text that was already shown
+                    shown.begin()
+                    stream = await self.client.messages.create(**kwargs, stream=True)
+                    return await self._consume_stream(stream, shown)
                 else:
                     # Non-streaming version
                     resp = await self.client.messages.create(**kwargs)
-                    
-                    # Track token usage
-                    if hasattr(resp, 'usage'):
-                        self.total_input_tokens += getattr(resp.usage, 'input_tokens', 0)
-                        self.total_output_tokens += getattr(resp.usage, 'output_tokens', 0)
-                    
-                    # Convert response content blocks to dictionary format
-                    content = []
-                    for block in resp.content:
-                        block_dict = block.model_dump()
-                        content.append(block_dict)
-                    
-                    return {"content": content}
+                    return self._message_dict(resp)
             except Exception as exc:
                 last_exc = exc
                 if attempt < self.max_retries - 1:
-                    await asyncio.sleep(2 ** attempt)
+                    # Jitter keeps concurrent agents from retrying in lockstep
+                    await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1.5))
         raise RuntimeError(f"Anthropic API call failed after {self.max_retries} attempts: {last_exc}") from last_exc
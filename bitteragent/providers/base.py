@@ -1,8 +1,9 @@
 """Base provider interface."""
 from __future__ import annotations
 
+import copy
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, TYPE_CHECKING
+from typing import Any, Dict, List, Sequence, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..tools import ToolRegistry
@@ -12,10 +13,36 @@ class Provider(ABC):
     """Abstract LLM provider."""
 
     @abstractmethod
-    async def complete(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]] | None = None) -> Dict[str, Any]:
-        """Return a completion given conversation messages and tools."""
+    async def complete(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        tools: List[Dict[str, Any]] | None = None,
+        system: str | None = None,
+    ) -> Dict[str, Any]:
+        """Return a completion given conversation messages and tools.
+
+        ``messages`` is a read-only view of the conversation history and must
+        not be modified. The system prompt is passed separately via ``system``.
+        The response holds the assistant ``content`` blocks and, if the
+        backend reports it, the request's token ``usage``.
+        """
         raise NotImplementedError
     
+    async def close(self) -> None:
+        """Release connections held by the provider."""
+
+    def without_callbacks(self) -> "Provider":
+        """A provider sharing this one's connections that reports no streamed deltas.
+
+        Sub-agents use it so their text does not appear as the parent's.
+        """
+        if getattr(self, "text_callback", None) is None and getattr(self, "tool_input_callback", None) is None:
+            return self
+        view = copy.copy(self)
+        view.text_callback = None  # type: ignore[attr-defined]
+        view.tool_input_callback = None  # type: ignore[attr-defined]
+        return view
+
     def get_tools_schema(self, registry: ToolRegistry) -> List[Dict[str, Any]]:
         """Convert tool registry to provider-specific schema format.
         
@@ -0,0 +1,158 @@
+"""Message Batches provider for high-throughput offline runs."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from .anthropic import AnthropicProvider, _ShownText
+
+# Batch results worth resubmitting; invalid requests fail straight away
+_RETRY_RESULTS = frozenset({"expired", "canceled"})
+_RETRY_ERRORS = frozenset({"api_error", "overloaded_error", "rate_limit_error", "timeout_error"})
+
+_Pending = Tuple[str, Dict[str, Any], "asyncio.Future[Dict[str, Any]]", int]
+
+
+class BatchProvider(AnthropicProvider):
+    """AnthropicProvider that sends requests through the Message Batches API.
+
+    Share one instance between many concurrently running agents. Each
+    request waits in a queue; the queue is submitted as one batch when it
+    holds ``flush_size`` requests or ``flush_interval`` seconds after the
+    first one arrived. Every submitted batch is polled every
+    ``poll_interval`` seconds, and each agent resumes as soon as the batch
+    holding its request has ended.
+
+    Batches trade latency (minutes to hours) for throughput and cost, so this
+    is meant for evaluation sweeps, not interactive use. Responses are never
+    streamed; ``text_callback`` is ignored. Whoever created the provider
+    calls :meth:`shutdown` at the end.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-sonnet-4-20250514",
+        flush_size: int = 100,
+        flush_interval: float = 5.0,
+        poll_interval: float = 30.0,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.pop("text_callback", None)
+        super().__init__(api_key=api_key, model=model, **kwargs)
+        self.flush_size = max(flush_size, 1)
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self._ids = itertools.count(1)
+        self._pending: List[_Pending] = []
+        self._flush_timer: Optional[asyncio.Task[None]] = None
+        self._batches: set[asyncio.Task[None]] = set()
+        self.batches_submitted = 0
+
+    def without_callbacks(self) -> "BatchProvider":
+        # Nothing is streamed, and a copy would split the shared queue
+        return self
+
+    async def _request(self, kwargs: Dict[str, Any], shown: Optional[_ShownText] = None) -> Dict[str, Any]:
+        future: asyncio.Future[Dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._enqueue(kwargs, future, attempt=0)
+        return await future
+
+    def _enqueue(self, kwargs: Dict[str, Any], future: asyncio.Future, attempt: int) -> None:
+        self._pending.append((f"req-{next(self._ids)}", kwargs, future, attempt))
+        if len(self._pending) >= self.flush_size:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_timer = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Submit queued requests now instead of waiting for the flush interval."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        # Requests whose agents gave up (cancelled or timed out) are not sent
+        pending = [item for item in self._pending if not item[2].done()]
+        self._pending = []
+        for start in range(0, len(pending), self.flush_size):
+            task = asyncio.create_task(self._run_batch(pending[start:start + self.flush_size]))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, requests: List[_Pending]) -> None:
+        by_id = {custom_id: (kwargs, future, attempt) for custom_id, kwargs, future, attempt in requests}
+        try:
+            batch_id = await self._create_batch(requests)
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                batch = await self.client.messages.batches.retrieve(batch_id)
+                if batch.processing_status == "ended":
+                    break
+            async for entry in await self.client.messages.batches.results(batch_id):
+                item = by_id.pop(entry.custom_id, None)
+                if item is not None:
+                    self._resolve(entry.result, *item)
+            error: Exception = RuntimeError(f"Batch {batch_id} returned no result for the request")
+        except asyncio.CancelledError:
+            error = RuntimeError("Batch provider closed before the request finished")
+            raise
+        except Exception as exc:
+            error = RuntimeError(f"Message batch failed: {exc}")
+        finally:
+            for _, future, _ in by_id.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _create_batch(self, requests: List[_Pending]) -> str:
+        last_exc: Exception | None = None
+        for attempt in range(self.max_retries):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                batch = await self.client.messages.batches.create(
+                    requests=[{"custom_id": custom_id, "params": kwargs} for custom_id, kwargs, _, _ in requests]
+                )
+                self.batches_submitted += 1
+                return batch.id
+            except Exception as exc:
+                last_exc = exc
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1.5))
+        raise RuntimeError(f"creating the batch failed after {self.max_retries} attempts: {last_exc}") from last_exc
+
+    def _resolve(self, result: Any, kwargs: Dict[str, Any], future: asyncio.Future, attempt: int) -> None:
+        if future.done():
+            return
+        if result.type == "succeeded":
+            future.set_result(self._message_dict(result.message))
+            return
+        error = getattr(getattr(result, "error", None), "error", None)
+        error_type = getattr(error, "type", None)
+        if (result.type in _RETRY_RESULTS or error_type in _RETRY_ERRORS) and attempt + 1 < self.max_retries:
+            # Goes out with the next batch
+            self._enqueue(kwargs, future, attempt + 1)
+            return
+        message = getattr(error, "message", None) or result.type
+        future.set_exception(RuntimeError(f"Batch request {result.type}: {message}"))
+
+    async def close(self) -> None:
+        """No-op: each agent sharing the provider closes it when its run ends."""
+
+    async def shutdown(self) -> None:
+        """Cancel outstanding batches and fail their requests; call once all agents are done."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        for _, _, future, _ in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Batch provider closed before the request was sent"))
+        self._pending = []
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
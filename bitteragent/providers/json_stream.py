@@ -0,0 +1,148 @@
+"""Incremental parsing of streamed tool input JSON."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List
+
+# Characters that change parser state outside strings
+_STRUCTURAL = re.compile(r'["{}\[\],]')
+# Run of string content, including complete escape sequences
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+
+
+class ToolInputError(ValueError):
+    """Raised when streamed tool input is truncated or malformed."""
+
+
+class IncrementalJSONParser:
+    """Accumulate a streamed JSON object in linear time.
+
+    Chunks are kept in a list and joined once at the end instead of being
+    concatenated on every delta. While feeding, the parser tracks string and
+    nesting state so that each top-level member of the object is decoded as
+    soon as it is complete, which makes arguments such as ``file_path``
+    available before a large ``content`` value has finished streaming.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[str] = []
+        self._member: List[str] = []
+        self._size = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._top_level = 0
+        self._member_failed = False
+        # Members completed in the top-level object, and whether anything followed its closing brace
+        self._members = 0
+        self._trailing = False
+        self.partial: Dict[str, Any] = {}
+
+    @property
+    def complete(self) -> bool:
+        """Whether the top-level value has been closed."""
+        return self._size > 0 and self._depth == 0 and not self._in_string
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume a chunk and return the names of newly completed members."""
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        completed: List[str] = []
+        if self._depth == 0 and self._top_level and chunk.strip():
+            self._trailing = True
+        # Start of the current top-level member within this chunk, if one is open
+        start = 0 if self._depth >= 1 else None
+        i = 0
+        n = len(chunk)
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                i = _STRING_BODY.match(chunk, i).end()
+                if i >= n:
+                    break
+                if chunk[i] == '"':
+                    self._in_string = False
+                else:
+                    # Backslash at the end of the chunk escapes the next one
+                    self._escape = True
+                i += 1
+                continue
+
+            match = _STRUCTURAL.search(chunk, i)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.start()
+            i = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._top_level += 1
+                    if char == "{":
+                        start = i
+            elif char in "}]":
+                if self._depth == 1 and start is not None:
+                    self._finish_member(chunk[start:pos], completed, closing=True)
+                    start = None
+                self._depth -= 1
+                if self._depth == 0 and chunk[i:].strip():
+                    self._trailing = True
+            elif self._depth == 1 and start is not None:
+                self._finish_member(chunk[start:pos], completed)
+                start = i
+
+        if start is not None:
+            self._member.append(chunk[start:])
+        return completed
+
+    def _finish_member(self, tail: str, completed: List[str], closing: bool = False) -> None:
+        self._member.append(tail)
+        text = "".join(self._member)
+        self._member = []
+        if not text.strip():
+            # Only "{}" has an empty member; "{,", ",," and ",}" are malformed
+            if not (closing and self._members == 0):
+                self._member_failed = True
+            return
+        self._members += 1
+        try:
+            member = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            # The final parse reports malformed input
+            self._member_failed = True
+            return
+        self.partial.update(member)
+        completed.extend(member)
+
+    def result(self) -> Dict[str, Any]:
+        """Return the decoded object, raising ToolInputError if it is invalid."""
+        if not self._chunks:
+            return {}
+        if not self.complete:
+            raise ToolInputError(
+                f"tool input JSON was truncated after {self._size} characters"
+            )
+        if (
+            self._top_level == 1
+            and not self._member_failed
+            and not self._trailing
+            and self._chunks[0].lstrip().startswith("{")
+        ):
+            # Every member already decoded cleanly while streaming
+            return dict(self.partial)
+        text = "".join(self._chunks)
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ToolInputError(f"tool input is not valid JSON: {exc}") from exc
+        if not isinstance(value, dict):
+            raise ToolInputError("tool input must be a JSON object")
+        return value
@@ -0,0 +1,342 @@
+"""OpenAI-compatible chat-completions provider."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, TYPE_CHECKING
+
+import httpx
+
+from ..adapters.openai import OpenAIAdapter
+from .base import Provider
+from .json_stream import IncrementalJSONParser, ToolInputError
+from .rate_limit import RateLimiter
+
+if TYPE_CHECKING:
+    from ..tools import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+# finish_reason values mapped to the Anthropic stop_reason vocabulary the agent uses
+_STOP_REASONS = {
+    "stop": "end_turn",
+    "tool_calls": "tool_use",
+    "function_call": "tool_use",
+    "length": "max_tokens",
+    "content_filter": "refusal",
+}
+_RETRY_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+def _result_text(content: Any) -> str:
+    """Flatten tool_result content, which may be a list of text blocks."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return "" if content is None else str(content)
+
+
+def _convert_message(
+    message: Dict[str, Any], converted: List[Dict[str, Any]], calls: Optional[List[List[Any]]] = None,
+) -> None:
+    """Append the chat-completions form of one message to ``converted``.
+
+    ``calls`` collects [tool_use block, its input, converted function] for
+    every tool call, so arguments can be re-encoded if the input is replaced.
+    """
+    role = message.get("role")
+    content = message.get("content")
+    if isinstance(content, str) or content is None:
+        converted.append({"role": role, "content": content or ""})
+        return
+    if role == "assistant":
+        text = "".join(block.get("text", "") for block in content if block.get("type") == "text")
+        tool_calls = []
+        for block in content:
+            if block.get("type") != "tool_use":
+                continue
+            function = {"name": block["name"], "arguments": json.dumps(block.get("input", {}))}
+            tool_calls.append({"id": block["id"], "type": "function", "function": function})
+            if calls is not None:
+                calls.append([block, block.get("input"), function])
+        entry: Dict[str, Any] = {"role": "assistant", "content": text or None}
+        if tool_calls:
+            entry["tool_calls"] = tool_calls
+        converted.append(entry)
+        return
+    # User turns: tool results become tool messages, which must directly follow the call
+    texts = []
+    for block in content:
+        if block.get("type") == "tool_result":
+            converted.append({
+                "role": "tool",
+                "tool_call_id": block.get("tool_use_id"),
+                "content": _result_text(block.get("content")),
+            })
+        elif block.get("type") == "text":
+            texts.append(block.get("text", ""))
+    if texts:
+        converted.append({"role": "user", "content": "\n\n".join(texts)})
+
+
+def to_openai_messages(messages: Sequence[Dict[str, Any]], system: Optional[str]) -> List[Dict[str, Any]]:
+    """Convert the agent's Anthropic-style history to chat-completions messages."""
+    converted: List[Dict[str, Any]] = []
+    if system:
+        converted.append({"role": "system", "content": system})
+    for message in messages:
+        _convert_message(message, converted)
+    return converted
+
+
+class ConvertedHistory:
+    """Chat-completions messages of one history, converted incrementally.
+
+    Messages appended to the history since the last request are converted
+    and appended; the converted prefix is reused. Tool calls whose input was
+    replaced in the history, e.g. by input compaction, get their arguments
+    re-encoded. If the history was truncated or rewritten, ``update``
+    returns False and the caller converts it from scratch.
+    """
+
+    def __init__(self, system: Optional[str]) -> None:
+        self.system = system
+        self.messages: List[Dict[str, Any]] = [{"role": "system", "content": system}] if system else []
+        self.count = 0
+        self.last: Optional[Dict[str, Any]] = None
+        self.calls: List[List[Any]] = []
+
+    def update(self, messages: Sequence[Dict[str, Any]]) -> bool:
+        if len(messages) < self.count or (self.count and messages[self.count - 1] is not self.last):
+            return False
+        for call in self.calls:
+            block, arguments, function = call
+            if block.get("input") is not arguments:
+                call[1] = block.get("input")
+                function["arguments"] = json.dumps(block.get("input", {}))
+        for message in messages[self.count:]:
+            _convert_message(message, self.messages, self.calls)
+        self.count = len(messages)
+        self.last = messages[-1] if self.count else None
+        return True
+
+
+class OpenAIProvider(Provider):
+    """Provider for OpenAI-compatible chat-completions endpoints.
+
+    Works with OpenAI and local servers such as vLLM and llama.cpp. Requests
+    go through one pooled keepalive HTTP client and are always streamed;
+    tool-call arguments are assembled incrementally as they arrive.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        base_url: str = "https://api.openai.com/v1",
+        max_retries: int = 3,
+        timeout: float = 600,
+        text_callback: Optional[Callable[[str], None]] = None,
+        tool_input_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        max_tokens: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_connections: int = 16,
+    ) -> None:
+        self.model = model
+        self.max_retries = max_retries
+        self.text_callback = text_callback
+        self.tool_input_callback = tool_input_callback
+        self.max_tokens = max_tokens
+        self.rate_limiter = rate_limiter
+        self.adapter = OpenAIAdapter()
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        # Created on first use and recreated when the event loop changes, e.g. chat's asyncio.run per message
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Converted messages per history view, so each request only converts what was appended
+        self._histories: "weakref.WeakKeyDictionary[Any, ConvertedHistory]" = weakref.WeakKeyDictionary()
+        self.total_input_tokens = 0
+        self.total_output_tokens = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # A client from a finished loop cannot be used or closed; its connections died with the loop
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def without_callbacks(self) -> "Provider":
+        # Create the client first so the view shares its connection pool
+        self.client
+        return super().without_callbacks()
+
+    def get_tools_schema(self, registry: ToolRegistry) -> List[Dict[str, Any]]:
+        return [self.adapter.to_schema(tool) for tool in registry.tools.values()]
+
+    async def close(self) -> None:
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+    def _convert(self, messages: Sequence[Dict[str, Any]], system: Optional[str]) -> List[Dict[str, Any]]:
+        try:
+            history = self._histories.get(messages)
+        except TypeError:
+            # Plain lists cannot be weakly referenced; convert them in full
+            return to_openai_messages(messages, system)
+        if history is None or history.system != system or not history.update(messages):
+            history = ConvertedHistory(system)
+            history.update(messages)
+            self._histories[messages] = history
+        return history.messages
+
+    def _build_request(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        tools: List[Dict[str, Any]] | None,
+        system: str | None,
+    ) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "model": self.model,
+            "messages": self._convert(messages, system),
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        if tools:
+            body["tools"] = tools
+        if self.max_tokens is not None:
+            body["max_tokens"] = self.max_tokens
+        return body
+
+    async def complete(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        tools: List[Dict[str, Any]] | None = None,
+        system: str | None = None,
+    ) -> Dict[str, Any]:
+        body = self._build_request(messages, tools, system)
+        last_exc: Exception | None = None
+        for attempt in range(self.max_retries):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                async with self.client.stream("POST", "/chat/completions", json=body) as response:
+                    if response.status_code < 400:
+                        return await self._consume_stream(response.aiter_lines())
+                    status = response.status_code
+                    detail = (await response.aread()).decode(errors="replace")[:500]
+            except httpx.TransportError as exc:
+                last_exc = exc
+            else:
+                last_exc = RuntimeError(f"HTTP {status}: {detail}")
+                if status not in _RETRY_STATUS:
+                    raise last_exc
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1.5))
+        raise RuntimeError(
+            f"OpenAI-compatible API call failed after {self.max_retries} attempts: {last_exc}"
+        ) from last_exc
+
+    async def _consume_stream(self, lines: Any) -> Dict[str, Any]:
+        """Assemble server-sent chat-completion chunks into content blocks."""
+        text_parts: List[str] = []
+        # Tool calls by stream index: [id, name, parser]
+        calls: Dict[int, List[Any]] = {}
+        usage: Dict[str, int] = {}
+        finish_reason: Optional[str] = None
+        # Set once deltas reached a callback
+        emitted = False
+
+        try:
+            async for line in lines:
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    # Keep reading to the end of the body so the connection returns to the pool
+                    continue
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping malformed stream chunk: %.200s", data)
+                    continue
+                if chunk.get("usage"):
+                    usage = {
+                        "input_tokens": chunk["usage"].get("prompt_tokens") or 0,
+                        "output_tokens": chunk["usage"].get("completion_tokens") or 0,
+                    }
+                for choice in chunk.get("choices") or ():
+                    delta = choice.get("delta") or {}
+                    text = delta.get("content")
+                    if text:
+                        text_parts.append(text)
+                        if self.text_callback:
+                            self.text_callback(text)
+                            emitted = True
+                    for call in delta.get("tool_calls") or ():
+                        entry = calls.get(call.get("index", 0))
+                        if entry is None:
+                            entry = calls[call.get("index", 0)] = [None, "", IncrementalJSONParser()]
+                        if call.get("id"):
+                            entry[0] = call["id"]
+                        function = call.get("function") or {}
+                        if function.get("name"):
+                            entry[1] += function["name"]
+                        if function.get("arguments"):
+                            if entry[2].feed(function["arguments"]) and self.tool_input_callback:
+                                self.tool_input_callback(entry[1], dict(entry[2].partial))
+                                emitted = True
+                    if choice.get("finish_reason"):
+                        finish_reason = choice["finish_reason"]
+        except httpx.TransportError as exc:
+            if not emitted:
+                raise
+            # Retrying would pass the same deltas to the callbacks a second time
+            raise RuntimeError(f"Stream interrupted after output was shown: {exc}") from exc
+
+        content: List[Dict[str, Any]] = []
+        if text_parts:
+            content.append({"type": "text", "text": "".join(text_parts)})
+        input_errors: Dict[str, str] = {}
+        for index in sorted(calls):
+            call_id, name, parser = calls[index]
+            # Some local servers omit call ids
+            call_id = call_id or f"call_{index}"
+            try:
+                arguments = parser.result()
+            except ToolInputError as exc:
+                arguments = {}
+                input_errors[call_id] = str(exc)
+            content.append({"type": "tool_use", "id": call_id, "name": name, "input": arguments})
+
+        self.total_input_tokens += usage.get("input_tokens", 0)
+        self.total_output_tokens += usage.get("output_tokens", 0)
+        response: Dict[str, Any] = {
+            "content": content,
+            "usage": usage,
+            "stop_reason": _STOP_REASONS.get(finish_reason, finish_reason),
+        }
+        if input_errors:
+            response["tool_input_errors"] = input_errors
+        return response
@@ -0,0 +1,39 @@
+"""Client-side request rate limiting."""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Spaces requests evenly to stay under a requests-per-minute limit.
+
+    Agents sharing one API key (e.g. concurrent benchmark tasks) each get a
+    share of the key's limit, which keeps them from tripping 429s and then
+    retrying in lockstep.
+    """
+
+    def __init__(self, requests_per_minute: float) -> None:
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.interval = 60.0 / requests_per_minute
+        self._next = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """Limiter for BITTERAGENT_MAX_RPM, or None if it is unset."""
+        value = os.environ.get("BITTERAGENT_MAX_RPM")
+        if not value or float(value) <= 0:
+            return None
+        return cls(float(value))
+
+    async def acquire(self) -> None:
+        """Wait for the next request slot."""
+        now = time.monotonic()
+        # Reserve the slot before sleeping so concurrent callers queue up behind it
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
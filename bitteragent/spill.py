@@ -0,0 +1,88 @@
+"""Spilling of oversized tool results to disk."""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Tuple
+
+
+class SpillStore:
+    """Session-scoped storage for tool outputs too large to inline.
+
+    Outputs above ``threshold`` characters are written to a temporary
+    directory and replaced in the conversation by a compact preview and a
+    handle that the ``read_output`` tool can page through.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        threshold: int = 20000,
+        preview_lines: int = 20,
+        preview_chars: int = 2000,
+    ) -> None:
+        self.threshold = threshold
+        self.preview_lines = preview_lines
+        self.preview_chars = preview_chars
+        self._directory = directory
+        self._owns_directory = directory is None
+        self._handles: Dict[str, Tuple[str, int, int]] = {}
+        self._counter = 0
+
+    @property
+    def directory(self) -> str:
+        """Spill directory, created on first use."""
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="bitteragent-spill-")
+        return self._directory
+
+    def maybe_spill(self, content: str) -> str:
+        """Return content unchanged, or a preview if it was spilled to disk."""
+        if len(content) <= self.threshold:
+            return content
+        self._counter += 1
+        handle = f"out-{self._counter}"
+        path = os.path.join(self.directory, f"{handle}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        line_count = content.count("\n") + (0 if content.endswith("\n") else 1)
+        size = len(content.encode("utf-8"))
+        self._handles[handle] = (path, size, line_count)
+        return self._preview(handle, content, size, line_count)
+
+    def _preview(self, handle: str, content: str, size: int, line_count: int) -> str:
+        lines = content.splitlines()
+        head = "\n".join(lines[:self.preview_lines])[:self.preview_chars]
+        tail = "\n".join(lines[-self.preview_lines:])[-self.preview_chars:]
+        return (
+            f"[Output too large to show in full: {size} bytes, {line_count} lines. "
+            f"Saved as handle \"{handle}\"; use the read_output tool with this handle "
+            f"to page through it by line offset and limit.]\n"
+            f"--- first {min(self.preview_lines, line_count)} lines ---\n{head}\n"
+            f"--- last {min(self.preview_lines, line_count)} lines ---\n{tail}"
+        )
+
+    def read(self, handle: str, offset: int = 0, limit: int = 200) -> Tuple[List[str], int]:
+        """Return the requested lines of a spilled output and its total line count."""
+        if handle not in self._handles:
+            raise KeyError(handle)
+        path, _, line_count = self._handles[handle]
+        lines: List[str] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                if index >= offset + limit:
+                    break
+                if index >= offset:
+                    lines.append(line)
+        return lines, line_count
+
+    def handles(self) -> List[str]:
+        return list(self._handles)
+
+    def close(self) -> None:
+        """Remove spilled outputs if the directory was created by this store."""
+        if self._owns_directory and self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._handles.clear()
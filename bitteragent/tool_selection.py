@@ -0,0 +1,140 @@
+"""Per-turn selection of the tool schemas sent to the model."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Set
+
+from .tools import Tool, ToolRegistry, ToolResult
+
+ENABLE_TOOLS = "enable_tools"
+
+
+class ToolSelector:
+    """Chooses which tool groups are sent with each request.
+
+    Groups in ``always`` are sent from the first turn. Any other group is
+    activated when the model calls one of its tools, when a tool result or
+    the prompt matches the group's trigger pattern, or when the model asks
+    for it through the ``enable_tools`` tool, whose description lists every
+    group. ``enable_tools`` is sent whenever the registry has optional groups.
+    Active groups stay active for the rest of the session and tools
+    keep their registration order, so the tools prefix of the request only
+    changes when a group is added and prompt caching keeps working.
+    """
+
+    def __init__(
+        self,
+        always: Iterable[str] = ("core",),
+        triggers: Optional[Dict[str, str]] = None,
+        summaries: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.always = tuple(always)
+        self.triggers: Dict[str, Pattern[str]] = {
+            group: re.compile(pattern) for group, pattern in (triggers or {}).items()
+        }
+        self.summaries = dict(summaries or {})
+        self.active: Set[str] = set(self.always)
+        self._meta: Optional[EnableToolsTool] = None
+        # Schema sizes in characters, summed over requests, to measure the savings
+        self.requests = 0
+        self.chars_sent = 0
+        self.chars_full = 0
+
+    def select(self, registry: ToolRegistry) -> ToolRegistry:
+        """Registry holding the active groups' tools and ``enable_tools``, if any group is optional."""
+        names = [name for name, group in registry.groups.items() if group in self.active]
+        subset = registry.subset(names)
+        # Sent even once every group is active: a group dropped from ``active`` can be re-enabled,
+        # and the tools prefix does not change when the last group activates
+        optional = [group for group in registry.group_names() if group not in self.always]
+        if optional:
+            subset.tools[ENABLE_TOOLS] = self.meta_tool(registry)
+            subset.groups[ENABLE_TOOLS] = ENABLE_TOOLS
+        return subset
+
+    def meta_tool(self, registry: ToolRegistry) -> "EnableToolsTool":
+        # Built once, listing every optional group, so its schema never changes
+        if self._meta is None:
+            groups = {
+                group: [name for name, g in registry.groups.items() if g == group]
+                for group in registry.group_names() if group not in self.always
+            }
+            self._meta = EnableToolsTool(self, groups)
+        return self._meta
+
+    def activate(self, groups: Iterable[str]) -> List[str]:
+        added = [group for group in groups if group not in self.active]
+        self.active.update(added)
+        return added
+
+    def deactivate(self, groups: Iterable[str]) -> List[str]:
+        """Stop sending optional groups, e.g. to trim a long session; the model can re-enable them."""
+        removed = [group for group in groups if group in self.active and group not in self.always]
+        self.active.difference_update(removed)
+        return removed
+
+    def observe_prompt(self, text: str) -> None:
+        self.activate(group for group, pattern in self.triggers.items() if pattern.search(text))
+
+    def observe(self, registry: ToolRegistry, calls: Sequence[Dict[str, Any]], outputs: Sequence[str]) -> None:
+        """Activate groups of tools the model called and groups triggered by their results."""
+        self.activate(registry.groups[call.get("name")] for call in calls if call.get("name") in registry.groups)
+        for output in outputs:
+            if output:
+                self.observe_prompt(output)
+
+    def record(self, sent: List[Dict[str, Any]], full_chars: int) -> None:
+        """Count one request's schema size against the size of the full registry's schemas."""
+        self.requests += 1
+        self.chars_sent += len(json.dumps(sent))
+        self.chars_full += full_chars
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "active_groups": sorted(self.active),
+            "schema_chars_sent": self.chars_sent,
+            "schema_chars_full": self.chars_full,
+            # Roughly 4 characters per token for JSON schemas
+            "tokens_saved_estimate": (self.chars_full - self.chars_sent) // 4,
+        }
+
+
+class EnableToolsTool(Tool):
+    """Lets the model activate tool groups that are not sent yet."""
+
+    name = ENABLE_TOOLS
+
+    def __init__(self, selector: ToolSelector, groups: Dict[str, List[str]]) -> None:
+        self.selector = selector
+        self.groups = groups
+        lines = ["Make more tools available from the next turn on. Groups:"]
+        for group, names in groups.items():
+            summary = selector.summaries.get(group)
+            lines.append(f"- {group}: {', '.join(names)}" + (f" ({summary})" if summary else ""))
+        self.description = "\n".join(lines)
+        self.parameters = {
+            "type": "object",
+            "properties": {
+                "groups": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(groups)},
+                    "description": "Groups to enable",
+                },
+            },
+            "required": ["groups"],
+        }
+
+    def is_read_only(self, params: Dict[str, Any]) -> bool:
+        return False
+
+    def modified_paths(self, params: Dict[str, Any]) -> List[str]:
+        return []
+
+    async def execute(self, groups: List[str], **_: Any) -> ToolResult:
+        added = self.selector.activate(groups)
+        names = [name for group in added for name in self.groups.get(group, [])]
+        if not names:
+            return ToolResult(success=True, output="Those tools are already available")
+        return ToolResult(success=True, output=f"Enabled: {', '.join(names)}")
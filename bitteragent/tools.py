@@ -2,9 +2,22 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import logging
+import os
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+
+from .validation import ValidationError, Validator, compile_schema
+
+logger = logging.getLogger(__name__)
+
+# Extra time given to tools that honor their own timeout parameter
+TIMEOUT_GRACE = 5.0
 
 
 @dataclass
@@ -13,6 +26,9 @@ class ToolResult:
     success: bool
     output: str | None = None
     error: str | None = None
+    # Execution details for callers (e.g. resource usage); not sent to the model.
+    # "waiting": True marks a poll of work still in progress, which the loop guard does not count as a repeat
+    metadata: Dict[str, Any] = field(default_factory=dict)
 
 
 class Tool(ABC):
@@ -21,21 +37,58 @@ class Tool(ABC):
     name: str = "tool"
     description: str = ""
     parameters: Dict[str, Any] = {}
+    # Read-only tools have no side effects, so repeated calls can be memoized
+    read_only: bool = False
 
     @abstractmethod
     async def execute(self, **kwargs: Any) -> ToolResult:
         """Execute the tool with given parameters."""
         raise NotImplementedError
 
+    def is_read_only(self, params: Dict[str, Any]) -> bool:
+        """Whether a call with these parameters leaves the workspace unchanged."""
+        return self.read_only
+
+    def memo_paths(self, params: Dict[str, Any]) -> List[str]:
+        """Files whose state a read-only call's result depends on."""
+        return []
+
+    def modified_paths(self, params: Dict[str, Any]) -> Optional[List[str]]:
+        """Files a call may modify, or None if it may modify anything."""
+        return [] if self.is_read_only(params) else None
+
+    async def close(self) -> None:
+        """Release resources held by the tool, e.g. background processes."""
+
+
+class ToolObserver:
+    """Receives notifications around tool executions."""
+
+    def before_tool(self, tool: Tool, params: Dict[str, Any]) -> None:
+        """Called with validated parameters before the tool executes."""
+
+    def after_tool(self, tool: Tool, params: Dict[str, Any], result: ToolResult) -> None:
+        """Called after the tool has executed."""
+
 
 class ToolRegistry:
-    """Registry for tools."""
+    """Registry for tools.
+
+    Each tool belongs to a group (``"default"`` unless given), which a
+    :class:`~bitteragent.tool_selection.ToolSelector` uses to send only
+    part of the registry with a request.
+    """
 
     def __init__(self) -> None:
         self.tools: Dict[str, Tool] = {}
+        self.groups: Dict[str, str] = {}
+        self.observers: List[ToolObserver] = []
 
-    def register(self, tool: Tool) -> None:
+    def register(self, tool: Tool, group: str = "default") -> None:
+        # Compile the parameter schema up front so calls only pay for validation
+        get_validator(tool)
         self.tools[tool.name] = tool
+        self.groups[tool.name] = group
 
     def get(self, name: str) -> Optional[Tool]:
         return self.tools.get(name)
@@ -43,9 +96,185 @@ class ToolRegistry:
     def list(self) -> List[str]:
         return list(self.tools.keys())
 
+    def group_names(self) -> List[str]:
+        """Groups in order of first registration."""
+        return list(dict.fromkeys(self.groups.values()))
+
+    def subset(self, names: Sequence[str]) -> "ToolRegistry":
+        """Registry sharing these tools, in registration order, and the observers."""
+        wanted = set(names)
+        subset = ToolRegistry()
+        for name, tool in self.tools.items():
+            if name in wanted:
+                subset.tools[name] = tool
+                subset.groups[name] = self.groups[name]
+        subset.observers = self.observers
+        return subset
+
+    def add_observer(self, observer: ToolObserver) -> None:
+        self.observers.append(observer)
+
+    async def close(self) -> None:
+        for tool in self.tools.values():
+            try:
+                await tool.close()
+            except Exception:
+                logger.exception("Failed to close tool %s", tool.name)
+
+
+def _file_state(path: str) -> Tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class ToolCache:
+    """Memo cache for results of read-only tool calls.
+
+    Entries are keyed by tool name, canonical parameters and working
+    directory, and are revalidated against the stats of the files the call
+    depends on. Any call that is not read-only clears the cache. While
+    ``bypass`` returns True (e.g. background jobs may be changing files) the
+    cache neither serves nor stores results.
+    """
+
+    def __init__(self, max_entries: int = 256, bypass: Optional[Callable[[], bool]] = None) -> None:
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Tuple[Any, ...], ToolResult, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.time_saved = 0.0
+
+    @staticmethod
+    def _key(tool: Tool, params: Dict[str, Any]) -> Tuple[str, str, str]:
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return (tool.name, canonical, os.getcwd())
+
+    @staticmethod
+    def _state(tool: Tool, params: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple((path, _file_state(path)) for path in tool.memo_paths(params))
+
+    def get(self, tool: Tool, params: Dict[str, Any]) -> Optional[ToolResult]:
+        if self.bypass is not None and self.bypass():
+            self.invalidate()
+            self.misses += 1
+            return None
+        key = self._key(tool, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            state, result, elapsed = entry
+            if state == self._state(tool, params):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.time_saved += elapsed
+                return result
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, tool: Tool, params: Dict[str, Any], result: ToolResult, elapsed: float) -> None:
+        if self.bypass is not None and self.bypass():
+            return
+        self._entries[self._key(tool, params)] = (self._state(tool, params), result, elapsed)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "time_saved": self.time_saved,
+        }
+
+
+_validators: "WeakKeyDictionary[Tool, Validator]" = WeakKeyDictionary()
+
+
+def get_validator(tool: Tool) -> Validator:
+    """Return the compiled parameter validator for a tool."""
+    validator = _validators.get(tool)
+    if validator is None:
+        validator = _validators[tool] = compile_schema(tool.parameters)
+    return validator
+
+
+async def run_tool(
+    tool: Tool,
+    params: Dict[str, Any],
+    cache: Optional[ToolCache] = None,
+    observers: Sequence[ToolObserver] = (),
+    timeout: Optional[float] = None,
+) -> ToolResult:
+    """Run a tool and ensure it respects ToolResult structure.
+
+    With a cache, repeated read-only calls are served from it, and any other
+    call invalidates it. Observers are notified around every execution.
+    ``timeout`` caps the tool's own ``timeout`` parameter, if it has one, and
+    bounds the whole execution.
+    """
+    try:
+        params = get_validator(tool)(params)
+    except ValidationError as exc:
+        # Reject bad arguments before the tool performs any I/O
+        return ToolResult(success=False, error=str(exc))
+    read_only = tool.is_read_only(params)
+    if cache is not None:
+        if read_only:
+            cached = cache.get(tool, params)
+            if cached is not None:
+                return cached
+        else:
+            cache.invalidate()
+
+    _notify(observers, "before_tool", tool, params)
+    start = time.perf_counter()
+    try:
+        if timeout is None:
+            result = await _execute(tool, params)
+        else:
+            result = await _execute_with_timeout(tool, params, timeout)
+    finally:
+        if cache is not None and not read_only:
+            cache.invalidate()
+    _notify(observers, "after_tool", tool, params, result)
+    if cache is not None and read_only and result.success:
+        cache.put(tool, params, result, time.perf_counter() - start)
+    return result
+
+
+def _notify(observers: Sequence[ToolObserver], event: str, *args: Any) -> None:
+    for observer in observers:
+        try:
+            getattr(observer, event)(*args)
+        except Exception:
+            # Observers must never break tool execution
+            logger.exception("Tool observer %r failed in %s", observer, event)
+
+
+async def _execute_with_timeout(tool: Tool, params: Dict[str, Any], timeout: float) -> ToolResult:
+    if "timeout" in tool.parameters.get("properties", {}):
+        # Let the tool time out by itself so it can clean up and report partial state
+        requested = params.get("timeout")
+        params = {**params, "timeout": timeout if requested is None else min(requested, timeout)}
+    try:
+        return await asyncio.wait_for(_execute(tool, params), timeout + TIMEOUT_GRACE)
+    except asyncio.TimeoutError:
+        return ToolResult(success=False, error=f"Tool call cancelled after {timeout:.0f}s: the run's time budget ran out")
+
 
-async def run_tool(tool: Tool, params: Dict[str, Any]) -> ToolResult:
-    """Run a tool and ensure it respects ToolResult structure."""
+async def _execute(tool: Tool, params: Dict[str, Any]) -> ToolResult:
     try:
         return await tool.execute(**params)
     except TypeError as exc:
@@ -0,0 +1,269 @@
+"""Compiled validation of tool parameters against their JSON schemas."""
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+Validator = Callable[[Dict[str, Any]], Dict[str, Any]]
+# A checker returns the (possibly coerced) value or raises ValidationError
+Checker = Callable[[Any], Any]
+
+
+class ValidationError(ValueError):
+    """Raised when tool parameters do not match the tool's schema."""
+
+
+def _describe(value: Any) -> str:
+    """Short description of a value for error messages."""
+    kind = {
+        bool: "boolean", int: "integer", float: "number", str: "string",
+        list: "array", dict: "object", type(None): "null",
+    }.get(type(value), type(value).__name__)
+    text = repr(value)
+    if len(text) > 40:
+        text = text[:37] + "..."
+    return f"{kind} {text}"
+
+
+def _fail(expected: str, value: Any) -> None:
+    raise ValidationError(f"expected {expected}, got {_describe(value)}")
+
+
+def _check_string(value: Any) -> Any:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    _fail("string", value)
+
+
+def _check_integer(value: Any) -> Any:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    _fail("integer", value)
+
+
+def _check_number(value: Any) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            pass
+        else:
+            return int(number) if number.is_integer() and "." not in value else number
+    _fail("number", value)
+
+
+def _check_boolean(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    if value in (0, 1) and not isinstance(value, float):
+        return bool(value)
+    _fail("boolean", value)
+
+
+def _check_null(value: Any) -> Any:
+    if value is None:
+        return value
+    _fail("null", value)
+
+
+def _decode_container(value: Any, kind: type) -> Any:
+    """Accept containers that were sent JSON-encoded as a string."""
+    if isinstance(value, str):
+        try:
+            decoded = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+        if isinstance(decoded, kind):
+            return decoded
+    return value
+
+
+def _compile_array(schema: Dict[str, Any]) -> Checker:
+    items = _compile(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+
+    def check(value: Any) -> Any:
+        value = _decode_container(value, list)
+        if not isinstance(value, list):
+            _fail("array", value)
+        if min_items is not None and len(value) < min_items:
+            raise ValidationError(f"expected at least {min_items} item(s), got {len(value)}")
+        if max_items is not None and len(value) > max_items:
+            raise ValidationError(f"expected at most {max_items} item(s), got {len(value)}")
+        if items is None:
+            return value
+        result = []
+        for index, item in enumerate(value):
+            try:
+                result.append(items(item))
+            except ValidationError as exc:
+                raise ValidationError(f"[{index}]: {exc}") from None
+        return result
+
+    return check
+
+
+def _compile_object(schema: Dict[str, Any]) -> Checker:
+    validate = _compile_properties(schema)
+
+    def check(value: Any) -> Any:
+        value = _decode_container(value, dict)
+        if not isinstance(value, dict):
+            _fail("object", value)
+        return validate(value)
+
+    return check
+
+
+_SIMPLE: Dict[str, Checker] = {
+    "string": _check_string,
+    "integer": _check_integer,
+    "number": _check_number,
+    "boolean": _check_boolean,
+    "null": _check_null,
+}
+
+
+def _compile_type(name: str, schema: Dict[str, Any]) -> Checker | None:
+    if name == "array":
+        return _compile_array(schema)
+    if name == "object":
+        return _compile_object(schema)
+    return _SIMPLE.get(name)
+
+
+def _allows_null(schema: Dict[str, Any]) -> bool:
+    types = schema.get("type")
+    return types == "null" or (isinstance(types, list) and "null" in types)
+
+
+def _compile(schema: Dict[str, Any]) -> Checker:
+    """Compile a (sub)schema into a single checker function."""
+    types = schema.get("type")
+    if isinstance(types, str):
+        checker = _compile_type(types, schema)
+    elif isinstance(types, list):
+        alternatives = [c for c in (_compile_type(name, schema) for name in types) if c is not None]
+        expected = " or ".join(types)
+
+        def checker(value: Any) -> Any:
+            # Prefer an exact match before trying coercions
+            for alternative in alternatives:
+                try:
+                    result = alternative(value)
+                except ValidationError:
+                    continue
+                if type(result) is type(value):
+                    return result
+            for alternative in alternatives:
+                try:
+                    return alternative(value)
+                except ValidationError:
+                    continue
+            _fail(expected, value)
+    else:
+        checker = None
+
+    checks: List[Checker] = [checker] if checker else []
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any) -> Any:
+            if value not in allowed:
+                choices = ", ".join(json.dumps(choice) for choice in allowed)
+                raise ValidationError(f"expected one of {choices}, got {_describe(value)}")
+            return value
+
+        checks.append(check_enum)
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value: Any) -> Any:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if minimum is not None and value < minimum:
+                    raise ValidationError(f"expected a value >= {minimum}, got {value}")
+                if maximum is not None and value > maximum:
+                    raise ValidationError(f"expected a value <= {maximum}, got {value}")
+            return value
+
+        checks.append(check_range)
+
+    if not checks:
+        return lambda value: value
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: Any) -> Any:
+        for check in checks:
+            value = check(value)
+        return value
+
+    return check_all
+
+
+def _compile_properties(schema: Dict[str, Any]) -> Validator:
+    properties: Dict[str, Dict[str, Any]] = schema.get("properties") or {}
+    required: Tuple[str, ...] = tuple(schema.get("required") or ())
+    checkers = {name: _compile(prop) for name, prop in properties.items()}
+    # Optional parameters sent as null are treated as omitted
+    omit_if_null = {
+        name for name, prop in properties.items()
+        if name not in required and not _allows_null(prop)
+    }
+    defaults = [(name, prop["default"]) for name, prop in properties.items() if "default" in prop]
+
+    def validate(params: Dict[str, Any]) -> Dict[str, Any]:
+        missing = [name for name in required if name not in params]
+        if missing:
+            raise ValidationError(f"Missing required parameter(s): {', '.join(missing)}")
+        result = dict(params)
+        errors = []
+        for name, value in params.items():
+            checker = checkers.get(name)
+            if checker is None:
+                continue
+            if value is None and name in omit_if_null:
+                del result[name]
+                continue
+            try:
+                result[name] = checker(value)
+            except ValidationError as exc:
+                errors.append(f"'{name}': {exc}")
+        if errors:
+            raise ValidationError(f"Invalid parameter(s): {'; '.join(errors)}")
+        for name, default in defaults:
+            if name not in result:
+                result[name] = copy.deepcopy(default) if isinstance(default, (list, dict)) else default
+        return result
+
+    return validate
+
+
+def compile_schema(schema: Dict[str, Any] | None) -> Validator:
+    """Compile a tool's ``parameters`` schema into a validator.
+
+    The validator checks required parameters and types, coerces common
+    mistakes (such as numbers sent as strings), fills in defaults and returns
+    a new parameter dict. It raises ValidationError with a message the model
+    can act on.
+    """
+    if not schema or not schema.get("properties"):
+        required = tuple((schema or {}).get("required") or ())
+        if not required:
+            return dict
+    return _compile_properties(schema)
@@ -0,0 +1,352 @@
+"""Incrementally maintained index of the workspace."""
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .tools import Tool, ToolObserver, ToolResult
+from .walk import walk
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+LANGUAGES = {
+    ".py": "Python", ".pyi": "Python", ".js": "JavaScript", ".jsx": "JavaScript",
+    ".mjs": "JavaScript", ".cjs": "JavaScript", ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".go": "Go", ".rs": "Rust", ".java": "Java", ".kt": "Kotlin", ".scala": "Scala",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".hpp": "C++",
+    ".cs": "C#", ".rb": "Ruby", ".php": "PHP", ".swift": "Swift", ".sh": "Shell",
+    ".bash": "Shell", ".lua": "Lua", ".r": "R", ".jl": "Julia", ".hs": "Haskell",
+    ".ml": "OCaml", ".ex": "Elixir", ".exs": "Elixir", ".sql": "SQL", ".md": "Markdown",
+    ".rst": "reStructuredText", ".json": "JSON", ".yaml": "YAML", ".yml": "YAML",
+    ".toml": "TOML", ".html": "HTML", ".css": "CSS", ".scss": "SCSS",
+}
+SPECIAL_FILES = {"Makefile": "Makefile", "Dockerfile": "Dockerfile", "CMakeLists.txt": "CMake"}
+
+# Lightweight symbol patterns for languages without a parser in the standard library
+_JS_PATTERNS = [
+    ("function", r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"),
+    ("class", r"^(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"),
+    ("function", r"^(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*=>"),
+]
+_TS_PATTERNS = _JS_PATTERNS + [
+    ("interface", r"^(?:export\s+)?interface\s+([A-Za-z_$][\w$]*)"),
+    ("type", r"^(?:export\s+)?type\s+([A-Za-z_$][\w$]*)\s*="),
+]
+_SYMBOL_PATTERNS: Dict[str, List[Tuple[str, str]]] = {
+    "JavaScript": _JS_PATTERNS,
+    "TypeScript": _TS_PATTERNS,
+    "Go": [
+        ("func", r"^func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"),
+        ("type", r"^type\s+([A-Za-z_]\w*)"),
+    ],
+    "Rust": [
+        ("fn", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+([A-Za-z_]\w*)"),
+        ("type", r"^(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type)\s+([A-Za-z_]\w*)"),
+    ],
+    "Java": [("class", r"^\s*(?:public\s+|protected\s+|private\s+)?(?:abstract\s+|final\s+|static\s+)*(?:class|interface|enum|record)\s+([A-Za-z_]\w*)")],
+    "Kotlin": [
+        ("class", r"^\s*(?:\w+\s+)*(?:class|interface|object)\s+([A-Za-z_]\w*)"),
+        ("fun", r"^\s*(?:\w+\s+)*fun\s+(?:<[^>]*>\s*)?([A-Za-z_]\w*)"),
+    ],
+    "C#": [("class", r"^\s*(?:\w+\s+)*(?:class|interface|struct|enum|record)\s+([A-Za-z_]\w*)")],
+    "C": [
+        ("type", r"^(?:typedef\s+)?(?:struct|enum|union)\s+([A-Za-z_]\w*)\s*\{"),
+        ("macro", r"^#define\s+([A-Za-z_]\w*)"),
+    ],
+    "C++": [
+        ("type", r"^(?:template\s*<[^>]*>\s*)?(?:class|struct|enum(?:\s+class)?|union)\s+([A-Za-z_]\w*)\s*(?:[:{]|$)"),
+        ("namespace", r"^namespace\s+([A-Za-z_]\w*)"),
+    ],
+    "Ruby": [("def", r"^\s*(?:def|class|module)\s+([A-Za-z_][\w.:?!]*)")],
+    "PHP": [("def", r"^\s*(?:abstract\s+|final\s+)?(?:class|interface|trait|function)\s+([A-Za-z_]\w*)")],
+    "Shell": [("function", r"^(?:function\s+)?([A-Za-z_][\w-]*)\s*\(\)\s*\{?")],
+}
+_COMPILED_PATTERNS = {
+    language: [(kind, re.compile(pattern, re.MULTILINE)) for kind, pattern in patterns]
+    for language, patterns in _SYMBOL_PATTERNS.items()
+}
+
+# (kind, name, line)
+Symbol = Tuple[str, str, int]
+
+
+def detect_language(rel: str) -> Optional[str]:
+    name = rel.rsplit("/", 1)[-1]
+    if name in SPECIAL_FILES:
+        return SPECIAL_FILES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1].lower())
+
+
+def _python_symbols(source: str) -> List[Symbol]:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    symbols: List[Symbol] = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(("def", node.name, node.lineno))
+        elif isinstance(node, ast.ClassDef):
+            symbols.append(("class", node.name, node.lineno))
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    symbols.append(("method", f"{node.name}.{child.name}", child.lineno))
+    return symbols
+
+
+def _regex_symbols(source: str, language: str) -> List[Symbol]:
+    symbols: List[Symbol] = []
+    for kind, regex in _COMPILED_PATTERNS.get(language, ()):
+        for match in regex.finditer(source):
+            line = source.count("\n", 0, match.start()) + 1
+            symbols.append((kind, match.group(1), line))
+    symbols.sort(key=lambda symbol: symbol[2])
+    return symbols
+
+
+def extract_symbols(source: str, language: Optional[str]) -> List[Symbol]:
+    """Return the top-level symbols defined in a source file."""
+    if language == "Python":
+        return _python_symbols(source)
+    if language in _COMPILED_PATTERNS:
+        return _regex_symbols(source, language)
+    return []
+
+
+@dataclass
+class FileInfo:
+    """Indexed metadata for a single file."""
+    size: int
+    mtime_ns: int
+    language: Optional[str] = None
+    symbols: List[Symbol] = field(default_factory=list)
+
+
+def default_cache_path(root: str, name: str = "workspace", ext: str = "json") -> str:
+    """Per-workspace cache file under the user's cache directory."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base, "bitteragent", f"{name}-{digest}.{ext}")
+
+
+def _format_size(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} GB"
+
+
+class WorkspaceIndex(ToolObserver):
+    """File tree, language and symbol index kept current by mtime scans.
+
+    The index is loaded from its cache file (or built) on first use. Files
+    written through tools that report their modified paths are re-indexed
+    directly; any other side-effecting call triggers a rescan that only
+    re-parses files whose size or mtime changed.
+    """
+
+    def __init__(
+        self,
+        root: str = ".",
+        cache_path: Optional[str] = None,
+        max_file_size: int = 1024 * 1024,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path or default_cache_path(self.root)
+        self.max_file_size = max_file_size
+        self.files: Dict[str, FileInfo] = {}
+        self._loaded = False
+        self._dirty = False
+        self._pending: Set[str] = set()
+
+    # Maintenance
+
+    def _index_file(self, rel: str, size: int, mtime_ns: int) -> FileInfo:
+        language = detect_language(rel)
+        info = FileInfo(size=size, mtime_ns=mtime_ns, language=language)
+        if language and size <= self.max_file_size and (language == "Python" or language in _COMPILED_PATTERNS):
+            try:
+                with open(os.path.join(self.root, rel), "r", encoding="utf-8", errors="replace") as f:
+                    info.symbols = extract_symbols(f.read(), language)
+            except OSError:
+                pass
+        return info
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return
+        self.files = {
+            rel: FileInfo(size, mtime_ns, language, [tuple(symbol) for symbol in symbols])
+            for rel, (size, mtime_ns, language, symbols) in data.get("files", {}).items()
+        }
+
+    def save(self) -> None:
+        data = {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "files": {
+                rel: [info.size, info.mtime_ns, info.language, info.symbols]
+                for rel, info in self.files.items()
+            },
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as exc:
+            logger.warning("Could not save workspace index: %s", exc)
+
+    def refresh(self) -> int:
+        """Rescan the tree and re-index changed files; return the number changed."""
+        seen: Set[str] = set()
+        changed = 0
+        for entry in walk(self.root):
+            seen.add(entry.rel)
+            info = self.files.get(entry.rel)
+            if info is None or info.size != entry.size or info.mtime_ns != entry.mtime_ns:
+                self.files[entry.rel] = self._index_file(entry.rel, entry.size, entry.mtime_ns)
+                changed += 1
+        for rel in set(self.files) - seen:
+            del self.files[rel]
+            changed += 1
+        self._dirty = False
+        self._pending.clear()
+        if changed:
+            self.save()
+        return changed
+
+    def update_paths(self, paths: Iterable[str]) -> None:
+        """Re-index specific files, e.g. after they were written by a tool."""
+        changed = False
+        for path in paths:
+            absolute = os.path.abspath(os.path.join(self.root, path))
+            if not absolute.startswith(self.root + os.sep):
+                continue
+            rel = os.path.relpath(absolute, self.root).replace(os.sep, "/")
+            try:
+                st = os.stat(absolute)
+            except OSError:
+                changed |= self.files.pop(rel, None) is not None
+                continue
+            self.files[rel] = self._index_file(rel, st.st_size, st.st_mtime_ns)
+            changed = True
+        if changed:
+            self.save()
+
+    def ensure_current(self) -> None:
+        """Bring the index up to date before answering a query."""
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+            self.refresh()
+        elif self._dirty:
+            self.refresh()
+        elif self._pending:
+            pending = list(self._pending)
+            self._pending.clear()
+            self.update_paths(pending)
+
+    def after_tool(self, tool: Tool, params: Dict[str, Any], result: ToolResult) -> None:
+        paths = tool.modified_paths(params)
+        if paths is None:
+            self._dirty = True
+        elif paths:
+            self._pending.update(paths)
+
+    # Queries
+
+    def overview(self, path: str = "", depth: int = 2, max_entries: int = 200) -> str:
+        """Compact tree with sizes, languages and top-level symbols."""
+        self.ensure_current()
+        prefix = path.strip("/")
+        if prefix in (".", ""):
+            prefix = ""
+        files = {
+            rel[len(prefix) + 1:] if prefix else rel: info
+            for rel, info in self.files.items()
+            if not prefix or rel.startswith(prefix + "/")
+        }
+        if not files:
+            return f"No indexed files under {path or self.root}"
+
+        total = sum(info.size for info in files.values())
+        lines = [f"{os.path.join(self.root, prefix) if prefix else self.root}: {len(files)} files, {_format_size(total)}"]
+        languages: Dict[str, List[int]] = {}
+        for info in files.values():
+            if info.language:
+                stats = languages.setdefault(info.language, [0, 0])
+                stats[0] += 1
+                stats[1] += info.size
+        if languages:
+            ranked = sorted(languages.items(), key=lambda item: -item[1][1])[:8]
+            lines.append("Languages: " + ", ".join(
+                f"{name} {count} files ({_format_size(size)})" for name, (count, size) in ranked
+            ))
+
+        # Aggregate directories beyond the requested depth
+        directories: Dict[str, List[int]] = {}
+        shown: List[str] = []
+        for rel in files:
+            parts = rel.split("/")
+            for level in range(1, len(parts)):
+                directory = "/".join(parts[:level])
+                stats = directories.setdefault(directory, [0, 0])
+                stats[0] += 1
+                stats[1] += files[rel].size
+            if len(parts) <= depth:
+                shown.append(rel)
+        entries = sorted(
+            [d for d in directories if d.count("/") < depth] + shown,
+            key=lambda rel: rel.split("/"),
+        )
+        for count, rel in enumerate(entries):
+            if count >= max_entries:
+                lines.append(f"... {len(entries) - max_entries} more entries; narrow with path")
+                break
+            indent = "  " * rel.count("/")
+            name = rel.rsplit("/", 1)[-1]
+            if rel in directories:
+                file_count, size = directories[rel]
+                lines.append(f"{indent}{name}/ ({file_count} files, {_format_size(size)})")
+            else:
+                info = files[rel]
+                line = f"{indent}{name} ({_format_size(info.size)})"
+                names = [name for kind, name, _ in info.symbols if kind != "method"]
+                top = names[:6]
+                if top:
+                    more = len(names) - len(top)
+                    line += ": " + ", ".join(top) + (f", +{more} more" if more > 0 else "")
+                lines.append(line)
+        return "\n".join(lines)
+
+    def find_symbol(self, name: str, limit: int = 50) -> List[Tuple[str, str, str, int]]:
+        """Find symbols by exact name, falling back to case-insensitive substring."""
+        self.ensure_current()
+        exact: List[Tuple[str, str, str, int]] = []
+        partial: List[Tuple[str, str, str, int]] = []
+        needle = name.lower()
+        for rel in sorted(self.files):
+            for kind, symbol, line in self.files[rel].symbols:
+                if symbol == name or symbol.rsplit(".", 1)[-1] == name:
+                    exact.append((rel, kind, symbol, line))
+                elif needle in symbol.lower():
+                    partial.append((rel, kind, symbol, line))
+        return (exact or partial)[:limit]
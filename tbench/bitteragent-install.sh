@@ -1,18 +1,60 @@
 #!/bin/bash
+# Fail on any error; the offline attempt below is inside an if, so its failure falls back to PyPI
 set -e
 
 echo "Installing BitterAgent..."
 
-# Install Python and pip if not available
-apt-get update
-apt-get install -y python3 python3-pip
+# Prebuilt wheels copied in by the adapter (see build-wheelhouse.sh)
+WHEELHOUSE="${BITTERAGENT_WHEELHOUSE:-/installed-agent/wheelhouse}"
+# Lets pip install into the system interpreter despite PEP 668; older pips ignore it
+export PIP_BREAK_SYSTEM_PACKAGES=1
+export PIP_DISABLE_PIP_VERSION_CHECK=1
 
-# Install BitterAgent from PyPI
-# Use --break-system-packages to override PEP 668 protection in containers
-pip3 install --break-system-packages bitteragent
+python_ok() {
+    command -v python3 >/dev/null 2>&1 && python3 -c 'import sys; sys.exit(sys.version_info < (3, 12))'
+}
+
+has_wheels() {
+    ls "$WHEELHOUSE"/bitteragent-*.whl >/dev/null 2>&1
+}
+
+# Only touch apt when there is no usable Python at all
+if ! python_ok; then
+    apt-get update
+    apt-get install -y python3 python3-pip
+fi
+
+installed=0
+if has_wheels; then
+    # Run pip from its wheel so a missing pip does not require apt either
+    PIP_WHEEL="$(ls "$WHEELHOUSE"/pip-*.whl 2>/dev/null | head -n 1)"
+    if python3 -m pip --version >/dev/null 2>&1; then
+        PIP="python3 -m pip"
+    elif [ -n "$PIP_WHEEL" ]; then
+        PIP="python3 $PIP_WHEEL/pip"
+    else
+        PIP=""
+    fi
+    if [ -n "$PIP" ] && $PIP install --quiet --no-index --find-links "$WHEELHOUSE" bitteragent; then
+        installed=1
+        echo "Installed BitterAgent from $WHEELHOUSE"
+    else
+        echo "Offline install failed; falling back to PyPI"
+    fi
+fi
+
+if [ "$installed" = 0 ]; then
+    if ! python3 -m pip --version >/dev/null 2>&1; then
+        apt-get update
+        apt-get install -y python3-pip
+    fi
+    python3 -m pip install --quiet bitteragent
+fi
 
 # Verify installation
-python3 -m pip show bitteragent || echo "Warning: BitterAgent module not found after installation"
-python3 -c "import bitteragent" || echo "Warning: Cannot import bitteragent module"
+if ! python3 -c "import bitteragent"; then
+    echo "Error: Cannot import bitteragent module after installation"
+    exit 1
+fi
 
-echo "BitterAgent installation complete!"
\ No newline at end of file
+echo "BitterAgent installation complete!"
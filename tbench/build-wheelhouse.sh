@@ -0,0 +1,42 @@
+#!/bin/bash
+set -e
+
+# Build a wheelhouse with bitteragent, its dependencies and pip itself so that
+# terminal-bench containers can install the agent offline.
+# Usage: ./tbench/build-wheelhouse.sh [output-dir]
+#
+# Binary dependencies are downloaded for each Python version in
+# PYTHON_VERSIONS and each architecture in PLATFORMS, so the wheelhouse works
+# regardless of the host it was built on.
+
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+REPO_DIR="$(dirname "$SCRIPT_DIR")"
+WHEELHOUSE="${1:-$SCRIPT_DIR/wheelhouse}"
+PYTHON_VERSIONS="${PYTHON_VERSIONS:-3.12 3.13}"
+PLATFORMS="${PLATFORMS:-x86_64 aarch64}"
+
+rm -rf "$WHEELHOUSE"
+mkdir -p "$WHEELHOUSE"
+
+echo "Building bitteragent wheel..."
+python3 -m pip wheel --no-deps --wheel-dir "$WHEELHOUSE" "$REPO_DIR"
+AGENT_WHEEL="$(ls "$WHEELHOUSE"/bitteragent-*.whl)"
+
+# pip can run straight from its wheel, so containers without pip need no apt
+python3 -m pip download --no-deps --dest "$WHEELHOUSE" pip
+
+for version in $PYTHON_VERSIONS; do
+    for arch in $PLATFORMS; do
+        echo "Downloading dependencies for Python $version on $arch..."
+        python3 -m pip download \
+            --dest "$WHEELHOUSE" \
+            --only-binary=:all: \
+            --python-version "$version" \
+            --platform "manylinux2014_$arch" \
+            --platform "manylinux_2_17_$arch" \
+            --platform "manylinux_2_28_$arch" \
+            "$AGENT_WHEEL"
+    done
+done
+
+echo "Wheelhouse ready: $WHEELHOUSE ($(ls "$WHEELHOUSE" | wc -l) wheels)"
@@ -1,16 +1,24 @@
 #!/bin/bash
 
 # Script to run terminal-bench with bitteragent
-# Usage: ./tbench/run_terminal_bench.sh [task-id] [model]
+# Usage: ./tbench/run_terminal_bench.sh [task-id] [model] [n-concurrent]
 #
 # Requires:
 #   - terminal-bench installed: pip install terminal-bench
 #   - bitteragent installed: pip install bitteragent
-#   - ANTHROPIC_API_KEY environment variable set
+#   - ANTHROPIC_API_KEY for anthropic/... models, or OPENAI_API_KEY and/or
+#     OPENAI_BASE_URL for openai/... models (local servers need no key)
+#
+# Optional environment:
+#   - N_CONCURRENT: tasks to run at once (default: 4)
+#   - API_RPM: total API requests per minute, shared evenly by concurrent tasks
+#   - BITTERAGENT_WHEELHOUSE: wheels for an offline install in each container
+#     (default: tbench/wheelhouse if built with ./tbench/build-wheelhouse.sh)
 
 # Parse arguments - all are optional
 TASK_ID=""
 MODEL="anthropic/claude-sonnet-4-20250514"
+N_CONCURRENT="${N_CONCURRENT:-4}"
 
 # Process arguments
 if [ $# -ge 1 ] && [ -n "$1" ]; then
@@ -21,16 +29,41 @@ if [ $# -ge 2 ] && [ -n "$2" ]; then
     MODEL="$2"
 fi
 
-# Check for API key
-if [ -z "$ANTHROPIC_API_KEY" ]; then
-    echo "Error: ANTHROPIC_API_KEY environment variable is not set"
-    echo "Please set it with: export ANTHROPIC_API_KEY=your-key-here"
-    exit 1
+if [ $# -ge 3 ] && [ -n "$3" ]; then
+    N_CONCURRENT="$3"
 fi
 
+# Check for the credentials of the model's provider (models without a prefix are Anthropic's)
+PROVIDER="anthropic"
+case "$MODEL" in
+    */*) PROVIDER="${MODEL%%/*}" ;;
+esac
+
+case "$PROVIDER" in
+    anthropic)
+        if [ -z "$ANTHROPIC_API_KEY" ]; then
+            echo "Error: ANTHROPIC_API_KEY environment variable is not set"
+            echo "Please set it with: export ANTHROPIC_API_KEY=your-key-here"
+            exit 1
+        fi
+        ;;
+    openai)
+        if [ -z "$OPENAI_API_KEY" ] && [ -z "$OPENAI_BASE_URL" ]; then
+            echo "Error: neither OPENAI_API_KEY nor OPENAI_BASE_URL is set for $MODEL"
+            echo "Set OPENAI_API_KEY for the OpenAI API, or OPENAI_BASE_URL for a local server"
+            exit 1
+        fi
+        ;;
+    *)
+        echo "Error: unsupported provider in $MODEL (use anthropic/<model> or openai/<model>)"
+        exit 1
+        ;;
+esac
+
 # Run terminal-bench with the BitterAgent installed adapter
 echo "Running terminal-bench with BitterAgent..."
 echo "Model: $MODEL"
+echo "Concurrent tasks: $N_CONCURRENT"
 
 # Add current directory's parent to PYTHONPATH so tbench module can be imported
 # This assumes the script is run from within the bitteragent repo
@@ -40,7 +73,19 @@ export PYTHONPATH="$(dirname "$SCRIPT_DIR"):$PYTHONPATH"
 ADAPTER_PATH="tbench.terminal_bench_installed_adapter:BitterAgentInstalledAdapter"
 
 # Build the tb run command
-TB_CMD="tb run --dataset terminal-bench-core==head --agent-import-path $ADAPTER_PATH --model $MODEL --n-concurrent 1"
+TB_CMD="tb run --dataset terminal-bench-core==head --agent-import-path $ADAPTER_PATH --model $MODEL --n-concurrent $N_CONCURRENT"
+TB_CMD="$TB_CMD --agent-kwarg n_concurrent=$N_CONCURRENT"
+
+if [ -n "$API_RPM" ]; then
+    echo "API rate limit: $API_RPM requests/minute shared across tasks"
+    TB_CMD="$TB_CMD --agent-kwarg api_rpm=$API_RPM"
+fi
+
+if [ -n "$BITTERAGENT_WHEELHOUSE" ]; then
+    TB_CMD="$TB_CMD --agent-kwarg wheelhouse=$BITTERAGENT_WHEELHOUSE"
+elif [ ! -d "$SCRIPT_DIR/wheelhouse" ]; then
+    echo "No wheelhouse found; containers will install from PyPI (build one with ./tbench/build-wheelhouse.sh)"
+fi
 
 # Add task ID if specified
 if [ -n "$TASK_ID" ]; then
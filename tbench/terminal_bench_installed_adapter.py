@@ -7,6 +7,10 @@ from terminal_bench.agents.installed_agents.abstract_installed_agent import (
     AbstractInstalledAgent,
 )
 from terminal_bench.terminal.models import TerminalCommand
+from terminal_bench.terminal.tmux_session import TmuxSession
+
+# Default location of the wheelhouse built by build-wheelhouse.sh
+DEFAULT_WHEELHOUSE = Path(__file__).parent / "wheelhouse"
 
 
 class BitterAgentInstalledAdapter(AbstractInstalledAgent):
@@ -16,14 +20,38 @@ class BitterAgentInstalledAdapter(AbstractInstalledAgent):
     def name() -> str:
         return "bitteragent-installed"
     
-    def __init__(self, model_name: str = "claude-sonnet-4-20250514", **kwargs):
+    def __init__(
+        self,
+        model_name: str = "claude-sonnet-4-20250514",
+        deadline_sec: float | None = None,
+        wheelhouse: str | None = None,
+        n_concurrent: int | str = 1,
+        api_rpm: float | str | None = None,
+        **kwargs,
+    ):
         """Initialize the BitterAgent adapter.
         
         Args:
             model_name: Model to use (format: provider/model or just model)
+            deadline_sec: Wall-clock budget for the agent; set it a little below
+                the task's agent timeout so the agent can finish cleanly
+            wheelhouse: Directory of prebuilt wheels copied into each container
+                for an offline install (default: BITTERAGENT_WHEELHOUSE or
+                tbench/wheelhouse if it exists; otherwise install from PyPI)
+            n_concurrent: Number of tasks run at once, used to share api_rpm
+            api_rpm: Total API requests per minute allowed across all
+                concurrent tasks; each agent gets an equal share
             **kwargs: Additional arguments passed to BaseAgent
         """
         super().__init__(**kwargs)
+        self._deadline_sec = deadline_sec
+        wheelhouse = wheelhouse or os.environ.get("BITTERAGENT_WHEELHOUSE")
+        if wheelhouse is None and DEFAULT_WHEELHOUSE.is_dir():
+            wheelhouse = str(DEFAULT_WHEELHOUSE)
+        self._wheelhouse = Path(wheelhouse) if wheelhouse else None
+        # Agent kwargs from the tb command line arrive as strings
+        self._n_concurrent = max(int(n_concurrent), 1)
+        self._api_rpm = float(api_rpm) if api_rpm not in (None, "") else None
         
         # Parse model name
         if "/" in model_name:
@@ -45,9 +73,18 @@ class BitterAgentInstalledAdapter(AbstractInstalledAgent):
         if self._provider == "anthropic":
             env["ANTHROPIC_API_KEY"] = os.environ["ANTHROPIC_API_KEY"]
         elif self._provider == "openai":
-            env["OPENAI_API_KEY"] = os.environ["OPENAI_API_KEY"]
+            # Local OpenAI-compatible servers (vLLM, llama.cpp) may not need a key
+            for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL"):
+                if os.environ.get(name):
+                    env[name] = os.environ[name]
         else:
             raise ValueError(f"Unsupported provider: {self._provider}")
+        env["BITTERAGENT_MODEL"] = f"{self._provider}/{self._model}"
+        
+        if self._deadline_sec is not None:
+            env["BITTERAGENT_DEADLINE"] = str(self._deadline_sec)
+        if self._api_rpm is not None:
+            env["BITTERAGENT_MAX_RPM"] = f"{self._api_rpm / self._n_concurrent:g}"
         
         return env
     
@@ -56,6 +93,12 @@ class BitterAgentInstalledAdapter(AbstractInstalledAgent):
         """Script to install the agent in the container."""
         return Path(__file__).parent / "bitteragent-install.sh"
     
+    def perform_task(self, instruction: str, session: TmuxSession, logging_dir: Path | None = None):
+        """Copy the wheelhouse in before the base class runs the install script."""
+        if self._wheelhouse is not None and any(self._wheelhouse.glob("bitteragent-*.whl")):
+            session.copy_to_container(self._wheelhouse, container_dir="/installed-agent/wheelhouse")
+        return super().perform_task(instruction, session, logging_dir)
+    
     def _run_agent_commands(self, instruction: str) -> list[TerminalCommand]:
         """Commands to run the agent with the given task instruction."""
         escaped_instruction = shlex.quote(instruction)
@@ -12,7 +12,7 @@ class DummyProvider(Provider):
     def __init__(self) -> None:
         self.step = 0
 
-    async def complete(self, messages, tools=None):  # type: ignore[override]
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
         if self.step == 0:
             self.step += 1
             return {
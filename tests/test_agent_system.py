@@ -13,9 +13,9 @@ class MockProvider(Provider):
     def __init__(self):
         self.calls: List[Dict[str, Any]] = []
     
-    async def complete(self, messages: List[Dict[str, Any]], tools=None) -> Dict[str, Any]:
+    async def complete(self, messages, tools=None, system=None) -> Dict[str, Any]:
         """Capture messages and return text response."""
-        self.calls.append({"messages": messages.copy(), "tools": tools})
+        self.calls.append({"messages": list(messages), "tools": tools, "system": system})
         return {"content": [{"type": "text", "text": "Response"}]}
 
 
@@ -34,17 +34,15 @@ def test_agent_system_prompt_handling():
     # Run the agent
     result = asyncio.run(agent.run("Hello"))
     
-    # Check that the provider received the system prompt
+    # Check that the provider received the system prompt separately
     assert len(provider.calls) == 1
+    assert provider.calls[0]["system"] == system_prompt
     messages = provider.calls[0]["messages"]
     
-    # System prompt should be first message
-    assert messages[0]["role"] == "system"
-    assert messages[0]["content"] == system_prompt
-    
-    # User message should follow
-    assert messages[1]["role"] == "user"
-    assert messages[1]["content"] == "Hello"
+    # Messages contain only the conversation
+    assert len(messages) == 1
+    assert messages[0]["role"] == "user"
+    assert messages[0]["content"] == "Hello"
     
     # Result should be the response
     assert result == "Response"
@@ -68,6 +66,7 @@ def test_agent_without_system_prompt():
     messages = provider.calls[0]["messages"]
     
     # No system message, just user message
+    assert provider.calls[0]["system"] is None
     assert len(messages) == 1
     assert messages[0]["role"] == "user"
     assert messages[0]["content"] == "Hello"
@@ -93,19 +92,17 @@ def test_agent_preserves_conversation_history():
     # Second interaction
     asyncio.run(agent.run("Second"))
     
-    # Check second call includes history but system prompt is still first
+    # Check second call includes history and still carries the system prompt
+    assert provider.calls[1]["system"] == system_prompt
     second_call_messages = provider.calls[1]["messages"]
     
-    assert second_call_messages[0]["role"] == "system"
-    assert second_call_messages[0]["content"] == system_prompt
-    
-    assert second_call_messages[1]["role"] == "user"
-    assert second_call_messages[1]["content"] == "First"
+    assert second_call_messages[0]["role"] == "user"
+    assert second_call_messages[0]["content"] == "First"
     
-    assert second_call_messages[2]["role"] == "assistant"
+    assert second_call_messages[1]["role"] == "assistant"
     
-    assert second_call_messages[3]["role"] == "user"
-    assert second_call_messages[3]["content"] == "Second"
+    assert second_call_messages[2]["role"] == "user"
+    assert second_call_messages[2]["content"] == "Second"
 
 
 def test_agent_system_prompt_not_in_history():
@@ -132,4 +129,48 @@ def test_agent_system_prompt_not_in_history():
     # Check internal message history doesn't contain system prompt
     for msg in agent.messages:
         if msg.get("role") == "system":
-            assert False, "System prompt should not be in message history"
\ No newline at end of file
+            assert False, "System prompt should not be in message history"
+
+
+class ViewCapturingProvider(Provider):
+    """Provider that keeps the message objects it receives."""
+
+    def __init__(self):
+        self.received: List[Any] = []
+
+    async def complete(self, messages, tools=None, system=None) -> Dict[str, Any]:
+        self.received.append(messages)
+        return {"content": [{"type": "text", "text": "Response"}]}
+
+
+def test_agent_passes_live_read_only_view():
+    """Test that the provider gets the same history view every turn without copies."""
+    provider = ViewCapturingProvider()
+    agent = Agent(provider=provider, registry=ToolRegistry(), system_prompt="System")
+
+    asyncio.run(agent.run("First"))
+    asyncio.run(agent.run("Second"))
+
+    first, second = provider.received
+    assert first is second
+    assert len(second) == len(agent.messages) == 4
+    assert not hasattr(second, "append")
+
+
+def test_anthropic_request_built_from_view():
+    """Test request preparation keeps the view and peels a legacy system message."""
+    from bitteragent.history import MessageView
+    from bitteragent.providers.anthropic import AnthropicProvider
+
+    provider = AnthropicProvider(api_key="test-key")
+    history = [{"role": "user", "content": "Hi"}]
+    view = MessageView(history)
+
+    kwargs = provider._build_request(view, None, "System")
+    assert kwargs["messages"] is view
+    assert kwargs["system"] == "System"
+
+    legacy = [{"role": "system", "content": "Legacy"}] + history
+    kwargs = provider._build_request(legacy, None, None)
+    assert kwargs["system"] == "Legacy"
+    assert kwargs["messages"] == history
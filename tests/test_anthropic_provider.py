@@ -0,0 +1,168 @@
+"""Tests for max_tokens handling and rate limiting in AnthropicProvider."""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from bitteragent.agent import Agent
+from bitteragent.providers.anthropic import AnthropicProvider
+from bitteragent.providers.rate_limit import RateLimiter
+from bitteragent.tools import ToolRegistry
+
+
+class Block(SimpleNamespace):
+    """Content block with the SDK's model_dump."""
+
+    def model_dump(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+def text_response(text: str, stop_reason: str, output_tokens: int = 10) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=[Block(type="text", text=text)],
+        stop_reason=stop_reason,
+        usage=SimpleNamespace(input_tokens=100, output_tokens=output_tokens),
+    )
+
+
+def tool_response(tool_input: Dict[str, Any], stop_reason: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=[Block(type="tool_use", id="t1", name="write_file", input=tool_input)],
+        stop_reason=stop_reason,
+        usage=SimpleNamespace(input_tokens=100, output_tokens=50),
+    )
+
+
+class FakeMessages:
+    """Replays canned responses and records request arguments."""
+
+    def __init__(self, responses: List[SimpleNamespace]) -> None:
+        self.responses = responses
+        self.requests: List[Dict[str, Any]] = []
+
+    async def create(self, **kwargs: Any) -> SimpleNamespace:
+        self.requests.append(kwargs)
+        return self.responses.pop(0)
+
+
+def make_provider(responses: List[SimpleNamespace], **kwargs: Any) -> AnthropicProvider:
+    provider = AnthropicProvider(api_key="test-key", **kwargs)
+    provider.client = SimpleNamespace(messages=FakeMessages(responses))
+    return provider
+
+
+def test_truncated_text_is_continued():
+    """A text answer cut off at max_tokens is continued from a prefill and merged."""
+    provider = make_provider([text_response("Hello wor ", "max_tokens"), text_response("ld", "end_turn")])
+    response = asyncio.run(provider.complete([{"role": "user", "content": "hi"}]))
+
+    assert response["content"] == [{"type": "text", "text": "Hello world"}]
+    assert response["stop_reason"] == "end_turn"
+    assert response["usage"] == {"input_tokens": 200, "output_tokens": 20}
+    second = provider.client.messages.requests[1]
+    assert second["messages"][-1] == {"role": "assistant", "content": "Hello wor"}
+
+
+def test_truncated_tool_call_is_retried_with_more_tokens():
+    """A truncated tool call is retried with a doubled limit that later requests keep."""
+    provider = make_provider(
+        [
+            tool_response({"file_path": "/a"}, "max_tokens"),
+            tool_response({"file_path": "/a", "content": "x"}, "tool_use"),
+            text_response("done", "end_turn"),
+        ],
+        max_tokens=4096,
+    )
+    response = asyncio.run(provider.complete([{"role": "user", "content": "write"}]))
+
+    assert response["content"][0]["input"] == {"file_path": "/a", "content": "x"}
+    assert "tool_input_errors" not in response
+    requests = provider.client.messages.requests
+    assert [r["max_tokens"] for r in requests] == [4096, 8192]
+
+    asyncio.run(provider.complete([{"role": "user", "content": "again"}]))
+    assert requests[2]["max_tokens"] == 8192
+
+
+def test_max_tokens_adapts_to_tool_input_size():
+    """Large tool inputs raise the limit for later requests, capped per model."""
+    provider = make_provider([tool_response({"content": "x" * 60000}, "tool_use")], max_tokens=4096)
+    asyncio.run(provider.complete([{"role": "user", "content": "write"}]))
+    assert provider.request_max_tokens() > 30000
+    assert provider.request_max_tokens() <= provider.output_limit == 64000
+
+    haiku = AnthropicProvider(api_key="test-key", model="claude-3-5-haiku-20241022", max_tokens=20000)
+    assert haiku.request_max_tokens() == 8192
+
+
+def test_truncation_at_model_limit_is_reported_to_agent():
+    """When the limit cannot be raised further the agent tells the model to split the call."""
+    provider = make_provider(
+        [tool_response({"file_path": "/a"}, "max_tokens"), text_response("ok", "end_turn")],
+        output_limit=4096,
+        max_tokens=4096,
+    )
+    agent = Agent(provider=provider, registry=ToolRegistry())
+    assert asyncio.run(agent.run("write")) == "ok"
+
+    result = agent.messages[2]["content"][0]["content"]
+    assert "cut off by the output token limit" in result
+    assert "split large content" in result
+
+
+def test_rate_limiter_spaces_requests():
+    """Requests through a shared limiter are spaced by the per-request interval."""
+    limiter = RateLimiter(requests_per_minute=600)  # one request per 0.1s
+    provider = make_provider([text_response(str(i), "end_turn") for i in range(4)], rate_limiter=limiter)
+
+    async def burst():
+        start = time.monotonic()
+        await asyncio.gather(*(provider.complete([{"role": "user", "content": "hi"}]) for _ in range(4)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(burst())
+    assert 0.25 <= elapsed < 1.0
+
+
+def stream_events(texts: List[str], tool_json: str, stop_reason: str) -> List[SimpleNamespace]:
+    ns = SimpleNamespace
+    events = [ns(type="content_block_start", content_block=ns(type="text"))]
+    events += [ns(type="content_block_delta", delta=ns(type="text_delta", text=text)) for text in texts]
+    events += [
+        ns(type="content_block_stop"),
+        ns(type="content_block_start", content_block=ns(type="tool_use", id="t1", name="write_file")),
+        ns(type="content_block_delta", delta=ns(type="input_json_delta", partial_json=tool_json)),
+        ns(type="content_block_stop"),
+        ns(type="message_delta", delta=ns(stop_reason=stop_reason), usage=ns(output_tokens=50)),
+        ns(type="message_stop"),
+    ]
+    return events
+
+
+class StreamingMessages(FakeMessages):
+    """Replays canned event lists as streams."""
+
+    async def create(self, **kwargs: Any) -> Any:
+        self.requests.append(kwargs)
+        events = self.responses.pop(0)
+
+        async def stream():
+            for event in events:
+                yield event
+        return stream()
+
+
+def test_repeated_tool_call_request_shows_text_once():
+    """Text streamed before a truncated tool call is not shown again when the call is repeated."""
+    shown: List[str] = []
+    provider = AnthropicProvider(api_key="test-key", max_tokens=4096, text_callback=shown.append)
+    provider.client = SimpleNamespace(messages=StreamingMessages([
+        stream_events(["Writing", " it", " now"], '{"file_path": "/a", "content": "xx', "max_tokens"),
+        stream_events(["Writing it", " now, then", " testing"], '{"file_path": "/a", "content": "x"}', "tool_use"),
+    ]))
+    response = asyncio.run(provider.complete([{"role": "user", "content": "write"}]))
+
+    assert response["content"][0]["text"] == "Writing it now, then testing"
+    assert response["content"][1]["input"] == {"file_path": "/a", "content": "x"}
+    # Every delta reaches the callback once; the repeat only adds what is new
+    assert shown == ["Writing", " it", " now", ", then", " testing"]
@@ -0,0 +1,138 @@
+"""Tests for BatchProvider against a local fake Message Batches endpoint."""
+import asyncio
+import json
+from typing import Any, Callable, Dict, List
+
+from bitteragent.agent import Agent
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.batch import BatchProvider
+from bitteragent.tools import ToolRegistry
+
+
+def message(content: List[Dict[str, Any]], stop_reason: str) -> Dict[str, Any]:
+    return {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-sonnet-4-20250514",
+        "content": content, "stop_reason": stop_reason, "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+
+
+class FakeBatchServer:
+    """HTTP server implementing batch create, retrieve and results.
+
+    ``respond`` maps one request's params to its result. A batch reports
+    ``ended`` on the first poll after it was created.
+    """
+
+    def __init__(self, respond: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+        self.respond = respond
+        self.batches: Dict[str, List[Dict[str, Any]]] = {}
+
+    def batch(self, batch_id: str, status: str) -> Dict[str, Any]:
+        return {
+            "id": batch_id, "type": "message_batch", "processing_status": status,
+            "request_counts": {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": "2025-01-01T00:00:00Z", "expires_at": "2025-01-02T00:00:00Z",
+            "ended_at": None, "archived_at": None, "cancel_initiated_at": None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if status == "ended" else None,
+        }
+
+    def route(self, method: str, path: str, body: bytes) -> bytes:
+        path = path.split("?")[0]
+        if method == "POST" and path == "/v1/messages/batches":
+            batch_id = f"msgbatch_{len(self.batches) + 1}"
+            self.batches[batch_id] = json.loads(body)["requests"]
+            return json.dumps(self.batch(batch_id, "in_progress")).encode()
+        batch_id = path.split("/")[4]
+        if path.endswith("/results"):
+            return "".join(
+                json.dumps({"custom_id": request["custom_id"], "result": self.respond(request["params"])}) + "\n"
+                for request in self.batches[batch_id]
+            ).encode()
+        return json.dumps(self.batch(batch_id, "ended")).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode().split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, value = line.decode().split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            data = self.route(method, path, body)
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+        writer.close()
+
+    async def __aenter__(self) -> "FakeBatchServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.server.close()
+
+
+def shell_then_answer(params: Dict[str, Any]) -> Dict[str, Any]:
+    """First turn runs ``echo <task>``; the second answers with the tool output."""
+    last = params["messages"][-1]["content"]
+    if isinstance(last, str):
+        call = {"type": "tool_use", "id": "t1", "name": "shell", "input": {"command": f"echo {last}"}}
+        return {"type": "succeeded", "message": message([call], "tool_use")}
+    return {"type": "succeeded", "message": message([{"type": "text", "text": f"got {last[0]['content']}"}], "end_turn")}
+
+
+def test_concurrent_agents_share_batches():
+    """Turns from concurrent agents go out together and each agent resumes with its own result."""
+    async def scenario():
+        async with FakeBatchServer(shell_then_answer) as server:
+            provider = BatchProvider(api_key="k", base_url=server.url, flush_size=5, flush_interval=10, poll_interval=0.01)
+            registry = ToolRegistry()
+            registry.register(ShellTool())
+            agents = [Agent(provider=provider, registry=registry) for _ in range(5)]
+            try:
+                results = await asyncio.gather(*(agent.run(f"task{i}") for i, agent in enumerate(agents)))
+            finally:
+                await provider.shutdown()
+            return results, provider, server
+
+    results, provider, server = asyncio.run(scenario())
+    assert results == [f"got task{i}" for i in range(5)]
+    # One batch per turn, each holding all five agents' requests
+    assert provider.batches_submitted == 2
+    assert [len(requests) for requests in server.batches.values()] == [5, 5]
+    assert provider.total_input_tokens == 100
+
+
+def test_flush_interval_and_retry():
+    """A partial queue flushes after the interval and overloaded results are resubmitted."""
+    failures = {"left": 1}
+
+    def flaky(params: Dict[str, Any]) -> Dict[str, Any]:
+        if failures["left"]:
+            failures["left"] -= 1
+            return {"type": "errored", "error": {"type": "error", "error": {"type": "overloaded_error", "message": "busy"}}}
+        return {"type": "succeeded", "message": message([{"type": "text", "text": "ok"}], "end_turn")}
+
+    async def scenario():
+        async with FakeBatchServer(flaky) as server:
+            provider = BatchProvider(api_key="k", base_url=server.url, flush_size=100, flush_interval=0.05, poll_interval=0.01)
+            try:
+                response = await provider.complete([{"role": "user", "content": "hi"}])
+            finally:
+                await provider.shutdown()
+            return response, provider
+
+    response, provider = asyncio.run(scenario())
+    assert response["content"][0]["text"] == "ok"
+    assert response["stop_reason"] == "end_turn"
+    assert provider.batches_submitted == 2
@@ -0,0 +1,117 @@
+"""Tests for run budgets."""
+import asyncio
+import time
+from typing import Any
+
+from bitteragent.agent import Agent
+from bitteragent.budget import RunBudget
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.base import Provider
+from bitteragent.tools import Tool, ToolRegistry, ToolResult, run_tool
+
+
+class ShellLoopProvider(Provider):
+    """Keeps asking for a shell command, reporting usage for each request."""
+
+    model = "claude-sonnet-4-20250514"
+
+    def __init__(self, command: str = "echo hi") -> None:
+        self.command = command
+        self.requests = 0
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.requests += 1
+        return {
+            "content": [
+                {"type": "text", "text": f"step {self.requests}"},
+                {"type": "tool_use", "id": str(self.requests), "name": "shell",
+                 "input": {"command": f"{self.command} {self.requests}"}},
+            ],
+            "usage": {"input_tokens": 1000, "output_tokens": 100},
+        }
+
+
+class SlowProvider(Provider):
+    """Never answers in time."""
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        await asyncio.sleep(30)
+        return {"content": [{"type": "text", "text": "late"}]}
+
+
+def _registry() -> ToolRegistry:
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    return registry
+
+
+def test_usage_and_cost_accounting():
+    """Usage is summed per request and priced by model."""
+    budget = RunBudget()
+    budget.record({"input_tokens": 1_000_000, "output_tokens": 100_000, "cache_read_input_tokens": 1_000_000},
+                  "claude-sonnet-4-20250514")
+    budget.record({"input_tokens": 10}, "some-unknown-model")
+
+    assert budget.requests == 2
+    assert budget.input_tokens == 1_000_010
+    assert abs(budget.cost - (3.0 + 1.5 + 0.3)) < 1e-9
+    assert budget.unpriced == {"some-unknown-model"}
+
+
+def test_token_budget_stops_with_partial_result():
+    """Running out of tokens stops the run with the latest text and a reason."""
+    provider = ShellLoopProvider()
+    agent = Agent(provider=provider, registry=_registry(), budget=RunBudget(max_output_tokens=300))
+    output = asyncio.run(agent.run("go"))
+
+    assert provider.requests == 3
+    assert agent.stop_reason is not None and agent.stop_reason.kind == "budget"
+    assert "output token budget" in agent.stop_reason.message
+    assert output.startswith("step 3")
+    assert agent.budget.summary()["output_tokens"] == 300
+    assert agent.messages[-1]["content"][0]["type"] == "tool_result"
+
+
+def test_deadline_clamps_provider_call():
+    """A provider call cannot outlive the deadline."""
+    agent = Agent(provider=SlowProvider(), registry=_registry(), budget=RunBudget(deadline=0.5, reserve=0.0))
+    start = time.monotonic()
+    asyncio.run(agent.run("go"))
+
+    assert time.monotonic() - start < 5
+    assert agent.stop_reason is not None and agent.stop_reason.kind == "budget"
+    assert "deadline" in agent.stop_reason.message
+
+
+def test_deadline_clamps_tool_timeout():
+    """A tool's own timeout is reduced to the time left and the command is killed."""
+    budget = RunBudget(deadline=0.5, reserve=0.0)
+    agent = Agent(provider=ShellLoopProvider("sleep 30; echo"), registry=_registry(), budget=budget)
+    start = time.monotonic()
+    asyncio.run(agent.run("go"))
+
+    assert time.monotonic() - start < 5
+    assert agent.stop_reason is not None and agent.stop_reason.kind == "budget"
+    results = agent.messages[2]["content"]
+    assert results[0]["content"] == "Command timed out"
+
+
+class NoTimeoutTool(Tool):
+    """Tool without a timeout parameter that hangs."""
+
+    name = "hang"
+    parameters = {"type": "object", "properties": {}}
+
+    async def execute(self, **kwargs: Any) -> ToolResult:
+        await asyncio.sleep(30)
+        return ToolResult(success=True, output="finished")
+
+
+def test_run_tool_timeout_without_timeout_parameter(monkeypatch):
+    """Tools without a timeout parameter are cancelled after a grace period."""
+    import bitteragent.tools as tools
+
+    monkeypatch.setattr(tools, "TIMEOUT_GRACE", 0.1)
+    result = asyncio.run(run_tool(NoTimeoutTool(), {}, timeout=0.1))
+    assert not result.success
+    assert "time budget" in result.error
@@ -0,0 +1,81 @@
+"""Tests for workspace checkpoints and the rollback tool."""
+import asyncio
+import os
+
+import pytest
+
+from bitteragent.checkpoints import CheckpointStore
+from bitteragent.native_tools.checkpoint import CheckpointTool
+from bitteragent.native_tools.file_ops import EditFileTool, WriteFileTool
+from bitteragent.native_tools.patch import ApplyPatchTool
+from bitteragent.tools import ToolRegistry, run_tool
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    root = tmp_path / "repo"
+    root.mkdir()
+    for i in range(50):
+        (root / f"module_{i}.py").write_text(f"value = {i}\n" * 100)
+    (root / "run.sh").write_text("echo hi\n")
+    os.chmod(root / "run.sh", 0o755)
+    monkeypatch.chdir(root)
+    store = CheckpointStore(directory=str(tmp_path / "store"))
+    registry = ToolRegistry()
+    for tool in (WriteFileTool(), EditFileTool(), ApplyPatchTool(), CheckpointTool(store)):
+        registry.register(tool)
+    registry.add_observer(store)
+
+    def call(name, **params):
+        return asyncio.run(run_tool(registry.get(name), params, observers=registry.observers))
+
+    return root, store, call
+
+
+def test_rollback_to_checkpoint(workspace):
+    """Edits, new files and patches after a checkpoint are undone in one call."""
+    root, store, call = workspace
+    assert call("edit_file", file_path="run.sh", old_string="hi", new_string="v1").success
+    assert "Created checkpoint before-refactor" in call("checkpoint", action="create", label="before-refactor").output
+
+    call("write_file", file_path="run.sh", content="rm -rf /\n")
+    call("write_file", file_path="new/helper.py", content="x = 1\n")
+    patch = "--- a/module_3.py\n+++ b/module_3.py\n@@ -1,2 +1,2 @@\n-value = 3\n+value = 30\n value = 3\n"
+    assert call("apply_patch", patch=patch).success
+    listing = call("checkpoint", action="list").output
+    assert "before-refactor (id 1" in listing and "3 files changed since" in listing
+
+    result = call("checkpoint", action="rollback", to="before-refactor")
+    assert result.success, result.error
+    assert (root / "run.sh").read_text() == "echo v1\n"
+    assert os.stat(root / "run.sh").st_mode & 0o777 == 0o755
+    assert not (root / "new" / "helper.py").exists()
+    assert (root / "module_3.py").read_text() == "value = 3\n" * 100
+    assert "deleted new/helper.py" in result.output
+
+    # Rolling back the first edit with steps
+    assert call("checkpoint", action="rollback", steps=1).success
+    assert (root / "run.sh").read_text() == "echo hi\n"
+
+
+def test_cost_scales_with_changed_files(workspace):
+    """Only touched files are saved, identical pre-images once; failed calls are not recorded."""
+    root, store, call = workspace
+    original = (root / "module_1.py").read_text()
+    for i in range(3):
+        call("write_file", file_path="module_1.py", content=original)
+    assert not call("edit_file", file_path="module_2.py", old_string="missing", new_string="x").success
+
+    assert len(store.changes) == 3
+    saved = {image.object_path for change in store.changes for image in change.files.values()}
+    if store.reflinks == 0:
+        # Content-addressed copies: the same content is stored once
+        assert len(saved) == 1
+        # module_1 once, plus the pre-image taken before the failed edit of module_2
+        assert store.bytes_copied == 2 * len(original)
+    assert sum(len(files) for _, _, files in os.walk(store.directory)) <= 4
+
+    assert "restored module_1.py" in call("checkpoint", action="rollback", steps=3).output
+    assert (root / "module_1.py").read_text() == original
+    assert "Nothing to restore" in call("checkpoint", action="rollback", steps=1).output
+    assert call("checkpoint", action="rollback", to="nope").error.startswith("Unknown checkpoint: nope")
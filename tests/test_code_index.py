@@ -0,0 +1,110 @@
+"""Tests for the ranked code search index."""
+import asyncio
+import os
+
+import pytest
+
+from bitteragent.code_index import CodeIndex, tokenize
+from bitteragent.native_tools.code_search import CodeSearchTool
+from bitteragent.native_tools.file_ops import WriteFileTool
+from bitteragent.tools import run_tool
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    (root / "auth").mkdir(parents=True)
+    (root / "auth" / "session.py").write_text(
+        "class UserSession:\n    def refresh_token(self):\n        return self.token\n"
+    )
+    (root / "config").mkdir()
+    (root / "config" / "loader.py").write_text("def parse_config(path):\n    return load(path)\n")
+    (root / "notes.md").write_text("Nothing about sessions here.\n")
+    (root / ".gitignore").write_text("build/\n")
+    (root / "build").mkdir()
+    (root / "build" / "session.py").write_text("UserSession = None\n")
+    return root, str(tmp_path / "index" / "code.idx")
+
+
+def test_tokenize_splits_identifiers():
+    """Test that compound identifiers also index their parts."""
+    counts = tokenize("getUserSession(user_session) HTTPServer")
+    assert counts["getusersession"] == 1
+    assert counts["user_session"] == 1
+    assert counts["user"] == 2 and counts["session"] == 2
+    assert counts["http"] == 1 and counts["server"] == 1
+
+
+def test_search_ranks_files_with_snippets(repo):
+    """Test that the most relevant file ranks first with matching lines."""
+    root, index_path = repo
+    index = CodeIndex(str(root), index_path=index_path)
+    results, matched = index.search("user session refresh")
+    assert results[0][0] == "auth/session.py"
+    assert results[0][2][0] == (1, "class UserSession:")
+    assert all(rel != "build/session.py" for rel, _, _ in results)
+
+    results, _ = index.search("parseConfig")
+    assert results[0][0] == "config/loader.py"
+    assert index.search("nonexistent_identifier") == ([], 0)
+    assert index.search("session", path="config")[0] == []
+    index.close()
+
+
+def test_index_persists_and_tracks_changes(repo):
+    """Test reloading the saved index and incremental updates through the delta."""
+    root, index_path = repo
+    index = CodeIndex(str(root), index_path=index_path, min_compact=100)
+    index.ensure_current()
+    index.close()
+    assert os.path.exists(index_path)
+
+    index = CodeIndex(str(root), index_path=index_path, min_compact=100)
+    index.ensure_current()
+    assert len(index._segment.docs) == 4
+    (root / "config" / "loader.py").write_text("def read_settings():\n    pass\n")
+    os.remove(root / "notes.md")
+    assert index.refresh() == 2
+    assert os.path.exists(index.delta_path)
+    assert index.search("parse") == ([], 0)
+    assert index.search("read_settings")[0][0][0] == "config/loader.py"
+    assert index.search("sessions")[0] == []
+
+    # A fresh instance sees the same state from the base segment plus delta
+    reloaded = CodeIndex(str(root), index_path=index_path, min_compact=100)
+    assert reloaded.search("read_settings")[0][0][0] == "config/loader.py"
+    reloaded.compact()
+    assert not os.path.exists(reloaded.delta_path)
+    assert len(reloaded._segment.docs) == 3
+    assert reloaded.search("read_settings")[0][0][0] == "config/loader.py"
+    assert reloaded.search("parse") == ([], 0)
+    index.close()
+    reloaded.close()
+
+
+def test_observer_reindexes_written_files(repo, monkeypatch):
+    """Test that files written through tools are searchable immediately."""
+    root, index_path = repo
+    monkeypatch.chdir(root)
+    index = CodeIndex(str(root), index_path=index_path)
+    index.ensure_current()
+    params = {"file_path": "auth/oauth.py", "content": "def exchange_code():\n    pass\n"}
+    asyncio.run(run_tool(WriteFileTool(), params, observers=[index]))
+    assert index._pending == {"auth/oauth.py"}
+    assert index.search("exchange code")[0][0][0] == "auth/oauth.py"
+    index.close()
+
+
+def test_code_search_tool_output(repo):
+    """Test the tool's path:line output format."""
+    root, index_path = repo
+    tool = CodeSearchTool(CodeIndex(str(root), index_path=index_path))
+    result = asyncio.run(tool.execute(query="refresh token", max_results=1))
+    assert result.success
+    lines = result.output.splitlines()
+    assert lines[0] == "auth/session.py:2: def refresh_token(self):"
+    assert lines[-1] == "[top 1 of 1 matching files]"
+
+    result = asyncio.run(tool.execute(query="zzz_missing"))
+    assert result.output == "No matches found"
+    tool.index.close()
@@ -0,0 +1,135 @@
+"""Tests for the delegate tool running sub-agents."""
+import asyncio
+from typing import Any, Dict, List
+
+from bitteragent.agent import Agent
+from bitteragent.budget import RunBudget
+from bitteragent.native_tools.delegate import CHILD_SYSTEM_PROMPT, DelegateTool
+from bitteragent.native_tools.file_ops import WriteFileTool
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.base import Provider
+from bitteragent.tools import ToolRegistry
+
+USAGE = {"input_tokens": 100, "output_tokens": 10}
+
+
+class ScriptedProvider(Provider):
+    """Parent delegates three tasks; each child echoes its task then reports it."""
+
+    def __init__(self, child_turns: int = 1) -> None:
+        self.child_turns = child_turns
+        self.child_tools: List[List[str]] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        if system == CHILD_SYSTEM_PROMPT:
+            return await self._child(messages, tools)
+        if len(messages) == 1:
+            tasks = [{"task": f"look at part {i}"} for i in range(3)]
+            tasks[2]["tools"] = ["shell", "write_file"]
+            return {"content": [{"type": "tool_use", "id": "d1", "name": "delegate", "input": {"tasks": tasks}}],
+                    "usage": USAGE}
+        return {"content": [{"type": "text", "text": "summary"}], "usage": USAGE}
+
+    async def _child(self, messages, tools) -> Dict[str, Any]:
+        self.child_tools.append(sorted(tool["name"] for tool in tools))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            self.in_flight -= 1
+        task = messages[0]["content"]
+        turn = (len(messages) + 1) // 2
+        if turn <= self.child_turns:
+            call = {"type": "tool_use", "id": f"c{turn}", "name": "shell", "input": {"command": f"echo {task.split()[-1]}"}}
+            return {"content": [{"type": "text", "text": "checking"}, call], "usage": USAGE}
+        output = messages[-1]["content"][0]["content"]
+        return {"content": [{"type": "text", "text": f"part {output} is fine"}], "usage": USAGE}
+
+
+def _agent(provider: ScriptedProvider, **kwargs: Any) -> Agent:
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    registry.register(WriteFileTool())
+    budget = RunBudget()
+    registry.register(DelegateTool(provider, registry, child_tools=("shell", "read_file"), budget=budget, **kwargs))
+    return Agent(provider=provider, registry=registry, budget=budget)
+
+
+def test_children_run_concurrently_and_return_only_answers():
+    """Children run in parallel up to the limit with restricted tools; only answers reach the parent."""
+    provider = ScriptedProvider()
+    agent = _agent(provider, max_concurrency=2)
+    assert asyncio.run(agent.run("investigate")) == "summary"
+
+    result = agent.messages[2]["content"][0]["content"]
+    assert "## Task 1: look at part 0\npart 0 is fine" in result
+    assert "## Task 3: look at part 2\npart 2 is fine" in result
+    assert "checking" not in result
+    assert provider.peak == 2
+    # Never the delegate tool itself, and never tools outside child_tools
+    assert all(names == ["shell"] for names in provider.child_tools)
+    # Two parent requests plus two per child
+    assert agent.budget.requests == 8
+    assert agent.budget.input_tokens == 800
+
+
+def test_child_token_budget_is_enforced():
+    """A child that exceeds its token budget is stopped and its partial answer returned."""
+    provider = ScriptedProvider(child_turns=100)
+    agent = _agent(provider, max_output_tokens=30)
+    asyncio.run(agent.run("investigate"))
+
+    result = agent.messages[2]["content"][0]["content"]
+    assert result.count("output token budget of 30 used") == 3
+    assert "checking" in result
+    # Each child stops after the three requests that reach the budget
+    assert agent.budget.requests == 2 + 3 * 3
+
+
+def test_child_limits_follow_what_the_parent_has_left():
+    """Children get at most the parent's remaining budget, less what running children may still use."""
+    provider = ScriptedProvider(child_turns=100)
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    budget = RunBudget(max_output_tokens=45)
+    registry.register(DelegateTool(provider, registry, child_tools=("shell",), budget=budget, max_output_tokens=30))
+    agent = Agent(provider=provider, registry=registry, budget=budget)
+    asyncio.run(agent.run("investigate"))
+
+    result = agent.messages[2]["content"][0]["content"]
+    # 35 tokens were left after the parent's first request: 30 for the first child, 5 for the second
+    assert "output token budget of 30 used (30)" in result
+    assert "output token budget of 5 used (10)" in result
+    assert "output token budget of 0 used (0)" in result
+    assert budget.requests == 1 + 3 + 1
+    assert agent.stop_reason.kind == "budget"
+
+
+class StreamingProvider(ScriptedProvider):
+    """Passes the text of every response to ``text_callback``, like a streaming provider."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.text_callback = None
+        self.shown: List[str] = []
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        response = await super().complete(messages, tools, system)
+        if self.text_callback is not None:
+            for block in response["content"]:
+                if block["type"] == "text":
+                    self.text_callback(block["text"])
+        return response
+
+
+def test_children_do_not_stream_through_the_parent():
+    """Only the parent's text reaches the callback; the children's answers still come back."""
+    provider = StreamingProvider()
+    provider.text_callback = provider.shown.append
+    agent = _agent(provider)
+    assert asyncio.run(agent.run("investigate")) == "summary"
+    assert provider.shown == ["summary"]
+    assert "part 1 is fine" in agent.messages[2]["content"][0]["content"]
@@ -0,0 +1,131 @@
+"""Tests for the agent event bus."""
+import asyncio
+import io
+import json
+import time
+
+from bitteragent.agent import Agent
+from bitteragent.events import EventBus, NDJSONWriter, run_with_consumers
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.base import Provider
+from bitteragent.tools import ToolRegistry
+
+
+class EchoProvider(Provider):
+    """Streams a little text, runs a few shell commands, then answers."""
+
+    def __init__(self, events: EventBus, steps: int = 3) -> None:
+        self.events = events
+        self.steps = steps
+        self.requests = 0
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.requests += 1
+        for part in ("thin", "king"):
+            self.events.publish("text_delta", text=part)
+        if self.requests <= self.steps:
+            return {
+                "content": [{"type": "tool_use", "id": str(self.requests), "name": "shell",
+                             "input": {"command": f"echo {self.requests}"}}],
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            }
+        return {"content": [{"type": "text", "text": "done"}], "usage": {"input_tokens": 10, "output_tokens": 5}}
+
+
+def _agent(events: EventBus, steps: int = 3) -> Agent:
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    return Agent(provider=EchoProvider(events, steps), registry=registry, events=events)
+
+
+def test_coalescing_and_drop_accounting():
+    """Queued text deltas merge and overflow drops the oldest events with a notice."""
+    async def scenario():
+        bus = EventBus()
+        subscription = bus.subscribe(maxsize=3)
+        for part in ("a", "b", "c"):
+            bus.publish("text_delta", text=part)
+        for turn in range(4):
+            bus.publish("turn_start", turn=turn)
+        bus.close()
+        return [event async for event in subscription], subscription.dropped
+
+    events, dropped = asyncio.run(scenario())
+    assert dropped == 2
+    assert [(e.type, e.data) for e in events] == [
+        ("dropped", {"count": 2}),
+        ("turn_start", {"turn": 1}),
+        ("turn_start", {"turn": 2}),
+        ("turn_start", {"turn": 3}),
+    ]
+
+    async def merged():
+        bus = EventBus()
+        subscription = bus.subscribe()
+        for part in ("a", "b", "c"):
+            bus.publish("text_delta", text=part)
+        bus.close()
+        return [event async for event in subscription]
+
+    assert [e.data["text"] for e in asyncio.run(merged())] == ["abc"]
+
+
+def test_agent_event_sequence():
+    """A run publishes turns, tool start/end, usage and a final run_end."""
+    events = EventBus()
+    agent = _agent(events, steps=1)
+    seen = []
+
+    async def collect(subscription):
+        async for event in subscription:
+            seen.append(event)
+
+    result = asyncio.run(run_with_consumers(events, [collect], agent.run("go")))
+    assert result == "done"
+    types = [e.type for e in seen]
+    assert types == [
+        "turn_start", "text_delta", "usage", "tool_start", "tool_end",
+        "turn_start", "text_delta", "usage", "run_end",
+    ]
+    tool_end = seen[4].data
+    assert tool_end["success"] and tool_end["output"] == "1"
+    assert seen[-1].data["usage"]["input_tokens"] == 20
+    assert [e.seq for e in seen] == sorted(e.seq for e in seen)
+
+
+def test_slow_consumer_does_not_stall_agent():
+    """The agent finishes at full speed while a slow consumer lags behind."""
+    events = EventBus()
+    agent = _agent(events, steps=5)
+    finished = {}
+
+    async def slow(subscription):
+        async for _ in subscription:
+            await asyncio.sleep(0.2)
+
+    async def timed_run():
+        start = time.monotonic()
+        result = await agent.run("go")
+        finished["agent"] = time.monotonic() - start
+        return result
+
+    start = time.monotonic()
+    asyncio.run(run_with_consumers(events, [slow], timed_run(), maxsize=4))
+    total = time.monotonic() - start
+    assert finished["agent"] < 1.0 < total
+
+
+def test_ndjson_truncates_lazily():
+    """NDJSON output truncates large payloads without touching the originals."""
+    bus = EventBus()
+    stream = io.StringIO()
+    params = {"file_path": "/a", "content": "x" * 100_000}
+
+    async def publish():
+        bus.publish("tool_start", id="t1", name="write_file", params=params)
+
+    asyncio.run(run_with_consumers(bus, [NDJSONWriter(stream, max_chars=100).consume], publish()))
+    line = json.loads(stream.getvalue())
+    assert line["type"] == "tool_start" and line["name"] == "write_file"
+    assert line["params"]["content"].endswith("[99900 more chars]")
+    assert len(params["content"]) == 100_000
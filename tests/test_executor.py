@@ -0,0 +1,89 @@
+"""Tests for the resource-governed command executor."""
+import asyncio
+import sys
+
+import pytest
+
+from bitteragent.native_tools.executor import CommandExecutor, HostSlots, ResourceLimits
+from bitteragent.native_tools.shell import ShellTool
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX rlimits")
+
+
+@pytest.fixture
+def slots(tmp_path):
+    return HostSlots(count=2, directory=str(tmp_path / "slots"))
+
+
+def test_reports_resource_usage(slots):
+    """Test that results carry exit status, peak RSS and CPU time."""
+    tool = ShellTool(executor=CommandExecutor(ResourceLimits(), slots))
+    result = asyncio.run(tool.execute(command="echo hello; exit 3"))
+    assert result.success
+    assert result.output == "hello"
+    metadata = result.metadata
+    assert metadata["exit_code"] == 3
+    assert metadata["max_rss_kb"] > 0
+    assert metadata["cpu_user"] >= 0 and metadata["cpu_system"] >= 0
+    assert metadata["slot"] in (0, 1)
+
+
+def test_file_size_and_cpu_limits(slots, tmp_path):
+    """Test that runaway writes and CPU loops are stopped by rlimits."""
+    limits = ResourceLimits(file_size=1024 * 1024, cpu_seconds=1)
+    tool = ShellTool(executor=CommandExecutor(limits, slots))
+
+    result = asyncio.run(tool.execute(command=f"exec head -c 10000000 /dev/zero > {tmp_path}/big"))
+    assert not result.success
+    assert "[Command file size limit exceeded]" in result.error
+    assert (tmp_path / "big").stat().st_size == 1024 * 1024
+
+    result = asyncio.run(tool.execute(command="exec python3 -c 'while True: pass'", timeout=30))
+    assert not result.success
+    assert result.metadata["limit_exceeded"] == "CPU time limit exceeded"
+
+
+def test_address_space_limit(slots):
+    """Test that a large allocation fails instead of exhausting host memory."""
+    limits = ResourceLimits(address_space=512 * 1024 * 1024)
+    executor = CommandExecutor(limits, slots)
+    result = asyncio.run(executor.run(f"{sys.executable} -c 'bytearray(2 * 1024 ** 3)'"))
+    assert result.exit_code != 0
+    assert "MemoryError" in result.output
+
+
+def test_address_space_limit_is_opt_in(monkeypatch):
+    """Test that address space is only limited when BITTERAGENT_RLIMIT_AS is set."""
+    monkeypatch.delenv("BITTERAGENT_RLIMIT_AS", raising=False)
+    assert "RLIMIT_AS" not in ResourceLimits.from_env().rlimits()
+    monkeypatch.setenv("BITTERAGENT_RLIMIT_AS", str(2 ** 34))
+    assert ResourceLimits.from_env().rlimits()["RLIMIT_AS"] == [2 ** 34, 2 ** 34]
+
+
+def test_output_is_capped(slots):
+    """Test that huge outputs keep only their head and tail."""
+    executor = CommandExecutor(ResourceLimits(), slots, max_output=2000, tail_output=500)
+    result = asyncio.run(executor.run("seq 1 100000"))
+    assert result.output.startswith("1\n2\n")
+    assert result.output.endswith("99999\n100000\n")
+    assert "bytes of output omitted" in result.output
+    assert len(result.output) < 2200
+
+
+def test_host_slots_limit_concurrency(tmp_path):
+    """Test that commands beyond the slot count wait for a free slot."""
+    executor = CommandExecutor(ResourceLimits(), HostSlots(count=1, directory=str(tmp_path / "slots")))
+
+    async def run_two():
+        return await asyncio.gather(executor.run("sleep 0.3"), executor.run("sleep 0.3"))
+
+    first, second = asyncio.run(run_two())
+    assert max(first.metadata["queue_time"], second.metadata["queue_time"]) >= 0.25
+
+
+def test_timeout_kills_process_group(slots):
+    """Test that a timed-out command is killed with its children."""
+    tool = ShellTool(executor=CommandExecutor(ResourceLimits(), slots))
+    result = asyncio.run(tool.execute(command="sleep 30 & sleep 30", timeout=0.5))
+    assert not result.success
+    assert result.error == "Command timed out"
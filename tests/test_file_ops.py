@@ -6,7 +6,7 @@ from pathlib import Path
 
 import pytest
 
-from bitteragent.native_tools.file_ops import ReadFileTool, WriteFileTool, EditFileTool
+from bitteragent.native_tools.file_ops import ReadFileTool, ReadFilesTool, WriteFileTool, EditFileTool
 
 
 @pytest.fixture
@@ -169,4 +169,54 @@ def test_edit_file_same_strings(temp_file):
     ))
     
     assert not result.success
-    assert "cannot be the same" in result.error
\ No newline at end of file
+    assert "cannot be the same" in result.error
+
+def test_read_files_multiple_ranges(temp_dir):
+    """Test reading several ranges with per-file errors."""
+    first = os.path.join(temp_dir, "first.txt")
+    second = os.path.join(temp_dir, "second.txt")
+    Path(first).write_text("".join(f"a{i}\n" for i in range(10)))
+    Path(second).write_text("b0\nb1\n")
+    tool = ReadFilesTool()
+    result = asyncio.run(tool.execute(files=[
+        {"file_path": first, "offset": 2, "limit": 3},
+        {"file_path": os.path.join(temp_dir, "missing.txt"), "offset": 0, "limit": 10},
+        {"file_path": second, "offset": 0, "limit": 10},
+    ]))
+    assert result.success
+    sections = result.output.split("\n\n")
+    assert sections[0] == (
+        f"==> {first} (lines 3-5) <==\n     3\ta2\n     4\ta3\n     5\ta4\n"
+        "[more lines follow; continue with offset=5]"
+    )
+    assert sections[1].endswith("[error: File not found]")
+    assert sections[2] == f"==> {second} (lines 1-2) <==\n     1\tb0\n     2\tb1"
+
+
+def test_read_files_shares_budget(temp_dir):
+    """Test that the output budget is shared and truncation is reported."""
+    small = os.path.join(temp_dir, "small.txt")
+    large = os.path.join(temp_dir, "large.txt")
+    Path(small).write_text("tiny\n")
+    Path(large).write_text(("x" * 99 + "\n") * 20)
+    tool = ReadFilesTool(max_bytes=505)
+    result = asyncio.run(tool.execute(files=[
+        {"file_path": large, "offset": 0, "limit": 1000},
+        {"file_path": small, "offset": 0, "limit": 1000},
+    ]))
+    assert "(lines 1-5) <==" in result.output
+    assert "[truncated to fit the output budget; continue with offset=5]" in result.output
+    assert "     1\ttiny" in result.output
+
+
+def test_read_files_always_advances_past_long_lines(temp_dir):
+    """Test that a line longer than the budget is cut and the continue offset moves past it."""
+    path = os.path.join(temp_dir, "minified.js")
+    Path(path).write_text("short\n" + "y" * 5000 + "\nlast\n")
+    tool = ReadFilesTool(max_bytes=100)
+    result = asyncio.run(tool.execute(files=[{"file_path": path, "offset": 1, "limit": 10}]))
+    assert result.output.startswith(f"==> {path} (lines 2-2) <==\n     2\t" + "y" * 100 + "\n")
+    assert "[line 2 cut to 100 of 5000 bytes]" in result.output
+    assert result.output.endswith("[truncated to fit the output budget; continue with offset=2]")
+    result = asyncio.run(tool.execute(files=[{"file_path": path, "offset": 2, "limit": 10}]))
+    assert "     3\tlast" in result.output
@@ -0,0 +1,127 @@
+"""Tests for interning and compacting large strings in the conversation history."""
+import asyncio
+import json
+
+from bitteragent.agent import Agent
+from bitteragent.history import BlobStore, InputCompactor
+from bitteragent.native_tools.file_ops import EditFileTool, ReadFileTool, WriteFileTool
+from bitteragent.providers.base import Provider
+from bitteragent.tools import ToolRegistry
+
+
+def test_blob_store_shares_equal_strings_within_bound():
+    """Equal large strings share one object, small ones are left alone, and the store stays bounded."""
+    store = BlobStore(min_chars=10, max_chars=100)
+    first = "x" * 40
+    copy = "".join(["x"] * 40)
+    assert copy is not first
+    assert store.intern(first) is first
+    assert store.intern(copy) is first
+    assert store.stats()["hits"] == 1 and store.stats()["chars_saved"] == 40
+
+    short = "".join(["y"] * 5)
+    assert store.intern(short) is short and len(store) == 1
+
+    for letter in "abc":
+        store.intern(letter * 40)
+    # The oldest blob was evicted to stay within max_chars; the history keeps its own reference
+    assert store.chars <= 100
+    assert store.intern(copy) is copy
+    # Strings larger than the store are returned without being stored
+    big = "z" * 200
+    assert store.intern(big) is big and store.chars <= 100
+
+
+class WriteThenReadProvider(Provider):
+    """Writes a file, reads it back twice, then answers; records each request's JSON."""
+
+    def __init__(self, path: str, content: str) -> None:
+        self.calls = [
+            ("write_file", {"file_path": path, "content": content}),
+            ("read_file", {"file_path": path}),
+            ("read_file", {"file_path": path}),
+        ]
+        self.requests = []
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.requests.append(json.dumps(list(messages)))
+        if self.calls:
+            name, params = self.calls.pop(0)
+            # Parsed from the response, like a streamed tool_use input
+            params = json.loads(json.dumps(params))
+            return {"content": [{"type": "tool_use", "id": str(len(self.requests)), "name": name, "input": params}]}
+        return {"content": [{"type": "text", "text": "done"}]}
+
+
+def run_session(tmp_path, blob_store):
+    content = "".join(f"line {i}\n" for i in range(500))
+    provider = WriteThenReadProvider(str(tmp_path / "big.txt"), content)
+    registry = ToolRegistry()
+    registry.register(WriteFileTool())
+    registry.register(ReadFileTool())
+    agent = Agent(provider=provider, registry=registry, blob_store=blob_store)
+    assert asyncio.run(agent.run("write it")) == "done"
+    return agent, provider
+
+
+def test_agent_interns_history_without_changing_requests(tmp_path):
+    """File content written and read back is stored once, and requests are byte-identical."""
+    agent, provider = run_session(tmp_path, BlobStore())
+    written = agent.messages[1]["content"][0]["input"]["content"]
+    assert agent.messages[4]["content"][0]["content"] is written
+    assert agent.messages[6]["content"][0]["content"] is written
+    assert agent.blob_store.stats()["hits"] == 2
+
+    plain_agent, plain = run_session(tmp_path, BlobStore(min_chars=10**9))
+    assert plain_agent.messages[4]["content"][0]["content"] is not written
+    assert provider.requests == plain.requests
+
+
+class WritingProvider(Provider):
+    """Writes a new large file on every turn, with one failing edit, then answers."""
+
+    def __init__(self, directory: str, writes: int) -> None:
+        self.directory = directory
+        self.writes = writes
+        self.request_sizes = []
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.request_sizes.append(len(json.dumps(list(messages))))
+        n = len(self.request_sizes)
+        if n == 2:
+            params = {"file_path": f"{self.directory}/file_1.py", "old_string": "missing" * 200, "new_string": "x"}
+            return {"content": [{"type": "tool_use", "id": "edit", "name": "edit_file", "input": params}]}
+        if n > self.writes:
+            return {"content": [{"type": "text", "text": "done"}]}
+        params = {"file_path": f"{self.directory}/file_{n}.py", "content": f"value = {n}\n" * 500}
+        return {"content": [{"type": "tool_use", "id": str(n), "name": "write_file", "input": params}]}
+
+
+def test_compactor_stubs_old_file_writes(tmp_path):
+    """Old successful writes keep their call structure but lose their content; request size levels off."""
+    provider = WritingProvider(str(tmp_path), writes=12)
+    registry = ToolRegistry()
+    registry.register(WriteFileTool())
+    registry.register(EditFileTool())
+    compactor = InputCompactor(after_turns=3)
+    agent = Agent(provider=provider, registry=registry, input_compactor=compactor)
+    assert asyncio.run(agent.run("write files")) == "done"
+
+    first = agent.messages[1]["content"][0]
+    assert first["id"] == "1" and first["name"] == "write_file"
+    assert first["input"]["file_path"] == f"{tmp_path}/file_1.py"
+    stub = first["input"]["content"]
+    assert stub.startswith("[Omitted from the history after the call succeeded: 5000 bytes, sha256 ")
+    assert f"Read {tmp_path}/file_1.py for the current content." in stub
+    assert (tmp_path / "file_1.py").read_text() == "value = 1\n" * 500
+    # Every tool_use still has its result right after it
+    assert agent.messages[2]["content"][0]["tool_use_id"] == "1"
+
+    # The failed edit keeps its input; the last writes are still verbatim
+    assert agent.messages[3]["content"][0]["input"]["old_string"] == "missing" * 200
+    assert agent.messages[-3]["content"][0]["input"]["content"] == "value = 12\n" * 500
+    assert compactor.stats()["calls_compacted"] == 8 and compactor.stats()["calls_pending"] == 3
+
+    # Once compaction starts, each request grows by a stub instead of a file
+    growth = [b - a for a, b in zip(provider.request_sizes[6:], provider.request_sizes[7:])]
+    assert max(growth) < 1000 < 5000
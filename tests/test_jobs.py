@@ -0,0 +1,156 @@
+"""Tests for background shell jobs."""
+import asyncio
+import time
+
+import pytest
+
+from bitteragent.agent import Agent
+from bitteragent.native_tools.jobs import JobManager, JobTool, OutputBuffer
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.base import Provider
+from bitteragent.tools import ToolCache, ToolRegistry, run_tool
+
+
+@pytest.fixture
+def jobs():
+    manager = JobManager()
+    yield manager
+    manager.close()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_output_buffer_drops_oldest_output():
+    """Test that the buffer is bounded but keeps absolute offsets."""
+    buffer = OutputBuffer(max_bytes=10)
+    buffer.write(b"0123456789")
+    buffer.write(b"abcde")
+    assert buffer.end == 15
+    data, start, end = buffer.read(0, 100)
+    assert (data, start, end) == (b"56789abcde", 5, 15)
+    assert buffer.read(12, 2) == (b"cd", 12, 15)
+
+
+def test_background_job_lifecycle(jobs):
+    """Test starting a job, polling incremental output and exit status."""
+    shell = ShellTool(jobs)
+    tool = JobTool(jobs)
+    result = asyncio.run(shell.execute(command="echo first; read line; echo got $line", background=True))
+    assert result.success
+    assert result.output.startswith("Started job 1")
+
+    job = jobs.get(1)
+    wait_for(lambda: job.output.end >= 6)
+    first = asyncio.run(tool.execute(action="output", job_id=1))
+    assert first.output.splitlines()[0] == "[job 1 running; output bytes 0-6 of 6]"
+    assert first.output.endswith("first\n")
+
+    sent = asyncio.run(tool.execute(action="input", job_id=1, input="hello\n"))
+    assert sent.success
+    wait_for(lambda: not job.running)
+    second = asyncio.run(tool.execute(action="output", job_id=1))
+    assert "output bytes 6-16 of 16" in second.output
+    assert "exited with code 0" in second.output
+    assert second.output.endswith("got hello\n")
+
+    again = asyncio.run(tool.execute(action="output", job_id=1, offset=0, limit=3))
+    assert "more output available, next offset 3" in again.output
+
+
+def test_kill_and_errors(jobs):
+    """Test killing a job and reporting unknown jobs."""
+    tool = JobTool(jobs)
+    job = jobs.start("sleep 30")
+    result = asyncio.run(tool.execute(action="kill", job_id=job.id))
+    assert result.success
+    assert "killed by signal" in result.output
+    assert not job.running
+
+    result = asyncio.run(tool.execute(action="status", job_id=99))
+    assert not result.success
+    assert "Unknown job 99" in result.error
+    assert not asyncio.run(tool.execute(action="output")).success
+
+
+def test_input_and_kill_do_not_block_the_event_loop(jobs):
+    """Input to a job that never reads times out, and a slow kill runs off the event loop."""
+    tool = JobTool(jobs)
+    job = jobs.start("trap '' TERM; sleep 30")
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        with pytest.raises(RuntimeError, match="not reading its input"):
+            await jobs.write_stdin(job.id, "x" * 1_000_000, timeout=0.3)
+        during_write = ticks
+        # SIGTERM is ignored, so the kill waits out the grace period before SIGKILL
+        killed = await tool.execute(action="kill", job_id=job.id)
+        task.cancel()
+        return during_write, ticks - during_write, killed
+
+    during_write, during_kill, killed = asyncio.run(scenario())
+    assert killed.success and "killed by signal 9" in killed.output
+    assert during_write >= 5
+    assert during_kill >= 20
+
+
+def test_job_exits_while_a_child_holds_its_output(jobs):
+    """A job counts as exited once its process does, even if a child it left keeps the output open."""
+    tool = JobTool(jobs)
+    job = jobs.start("sleep 30 & echo started")
+    wait_for(lambda: not job.running)
+    assert not jobs.running()
+    status = asyncio.run(tool.execute(action="status", job_id=job.id))
+    assert "exited with code 0" in status.output and "output still open" in status.output
+    assert not status.metadata["waiting"]
+    output = asyncio.run(tool.execute(action="output", job_id=job.id))
+    assert output.output.startswith("[job 1 exited, output still open; output bytes 0-8 of 8]")
+
+    # Killing the job stops the child that held the output
+    killed = asyncio.run(tool.execute(action="kill", job_id=job.id))
+    assert killed.success and job.output_closed
+    assert "output still open" not in killed.output
+
+
+def test_cache_bypassed_while_jobs_run(jobs):
+    """Test that memoized results are not served while a job is running."""
+    cache = ToolCache(bypass=lambda: bool(jobs.running()))
+    shell = ShellTool(jobs)
+    asyncio.run(run_tool(shell, {"command": "echo hi"}, cache=cache))
+    assert asyncio.run(run_tool(shell, {"command": "echo hi"}, cache=cache)).output == "hi"
+    assert cache.hits == 1
+
+    job = jobs.start("sleep 30")
+    asyncio.run(run_tool(shell, {"command": "echo hi"}, cache=cache))
+    assert cache.hits == 1
+    jobs.kill(job.id)
+
+
+class FinalProvider(Provider):
+    async def complete(self, messages, tools=None, system=None):
+        return {"content": [{"type": "text", "text": "done"}]}
+
+
+def test_agent_close_kills_jobs(jobs):
+    """Test that closing the agent cleans up running jobs."""
+    registry = ToolRegistry()
+    registry.register(ShellTool(jobs))
+    registry.register(JobTool(jobs))
+    agent = Agent(FinalProvider(), registry)
+    job = jobs.start("sleep 30")
+    asyncio.run(agent.close())
+    assert not job.running
+    with pytest.raises(RuntimeError):
+        jobs.start("true")
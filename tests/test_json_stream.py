@@ -0,0 +1,174 @@
+"""Tests for streamed tool input assembly."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from bitteragent.agent import Agent
+from bitteragent.providers.base import Provider
+from bitteragent.providers.json_stream import IncrementalJSONParser, ToolInputError
+from bitteragent.tools import ToolRegistry
+
+
+def feed_in_chunks(parser, text, size):
+    completed = []
+    for i in range(0, len(text), size):
+        completed.extend(parser.feed(text[i:i + size]))
+    return completed
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_parser_matches_json_loads(size):
+    """Test that chunked parsing yields the same object as json.loads."""
+    value = {
+        "file_path": '/tmp/a "quoted" {name}.txt',
+        "content": 'line with "quotes", [brackets] and {braces}\n\\',
+        "nested": {"a": [1, 2, {"b": "c"}]},
+        "flag": True,
+    }
+    text = json.dumps(value)
+    parser = IncrementalJSONParser()
+    completed = feed_in_chunks(parser, text, size)
+
+    assert parser.result() == value
+    assert completed == ["file_path", "content", "nested", "flag"]
+
+
+def test_parser_exposes_partial_arguments_early():
+    """Test that completed members are available before the object closes."""
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"file_path": "/tmp/x.py", "content": "print(') == ["file_path"]
+    assert parser.partial == {"file_path": "/tmp/x.py"}
+    assert not parser.complete
+
+
+def test_parser_reports_truncated_input():
+    """Test that an unterminated object is reported as truncated."""
+    parser = IncrementalJSONParser()
+    parser.feed('{"file_path": "/tmp/x.py", "content": "abc')
+    with pytest.raises(ToolInputError, match="truncated"):
+        parser.result()
+
+
+def test_parser_reports_malformed_input():
+    """Test that invalid JSON is reported with the decoder error."""
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": tru}')
+    with pytest.raises(ToolInputError, match="not valid JSON"):
+        parser.result()
+
+
+@pytest.mark.parametrize("text", ['{"a": 1,}', '{,"a": 1}', '{"a": 1} trailing', '{"a": 1,, "b": 2}'])
+@pytest.mark.parametrize("size", [1, 1000])
+def test_parser_rejects_empty_members_and_trailing_data(text, size):
+    """Test that inputs json.loads rejects are not accepted from the streamed members."""
+    parser = IncrementalJSONParser()
+    feed_in_chunks(parser, text, size)
+    with pytest.raises(ToolInputError, match="not valid JSON"):
+        parser.result()
+
+
+def test_parser_accepts_empty_object_and_trailing_whitespace():
+    """Test that an empty object and whitespace after the closing brace are valid."""
+    for text in ("{}", ' { } ', '{"a": 1}\n  '):
+        parser = IncrementalJSONParser()
+        feed_in_chunks(parser, text, 1)
+        assert parser.result() == json.loads(text)
+
+
+def test_parser_empty_input_is_empty_object():
+    """Test that a tool call without arguments parses to an empty dict."""
+    assert IncrementalJSONParser().result() == {}
+
+
+def make_stream(events):
+    async def stream():
+        for event in events:
+            yield event
+    return stream()
+
+
+def test_anthropic_stream_assembly():
+    """Test streamed text and tool input assembly in AnthropicProvider."""
+    from bitteragent.providers.anthropic import AnthropicProvider
+
+    texts = []
+    partials = []
+    provider = AnthropicProvider(
+        api_key="test-key",
+        text_callback=texts.append,
+        tool_input_callback=lambda name, args: partials.append((name, args)),
+    )
+    ns = SimpleNamespace
+    events = [
+        ns(type="content_block_start", content_block=ns(type="text")),
+        ns(type="content_block_delta", delta=ns(type="text_delta", text="Hel")),
+        ns(type="content_block_delta", delta=ns(type="text_delta", text="lo")),
+        ns(type="content_block_stop"),
+        ns(type="content_block_start", content_block=ns(type="tool_use", id="t1", name="write_file")),
+        ns(type="content_block_delta", delta=ns(type="input_json_delta", partial_json='{"file_path": "/a",')),
+        ns(type="content_block_delta", delta=ns(type="input_json_delta", partial_json=' "content": "x"}')),
+        ns(type="content_block_stop"),
+        ns(type="content_block_start", content_block=ns(type="tool_use", id="t2", name="write_file")),
+        ns(type="content_block_delta", delta=ns(type="input_json_delta", partial_json='{"file_path": "/b", "content": "unfinished')),
+        ns(type="content_block_stop"),
+        ns(type="message_stop"),
+    ]
+    response = asyncio.run(provider._consume_stream(make_stream(events)))
+
+    assert texts == ["Hel", "lo"]
+    assert response["content"][0] == {"type": "text", "text": "Hello"}
+    assert response["content"][1]["input"] == {"file_path": "/a", "content": "x"}
+    assert response["content"][2]["input"] == {}
+    assert "truncated" in response["tool_input_errors"]["t2"]
+    assert partials[0] == ("write_file", {"file_path": "/a"})
+
+
+def test_anthropic_stream_usage():
+    """Test that streamed usage combines message_start and message_delta counts."""
+    from bitteragent.providers.anthropic import AnthropicProvider
+
+    provider = AnthropicProvider(api_key="test-key", text_callback=lambda text: None)
+    ns = SimpleNamespace
+    events = [
+        ns(type="message_start", message=ns(usage=ns(input_tokens=120, output_tokens=1, cache_read_input_tokens=50))),
+        ns(type="content_block_start", content_block=ns(type="text")),
+        ns(type="content_block_delta", delta=ns(type="text_delta", text="hi")),
+        ns(type="content_block_stop"),
+        ns(type="message_delta", delta=ns(stop_reason="end_turn"), usage=ns(output_tokens=42)),
+        ns(type="message_stop"),
+    ]
+    response = asyncio.run(provider._consume_stream(make_stream(events)))
+
+    assert response["usage"] == {"input_tokens": 120, "output_tokens": 42, "cache_read_input_tokens": 50}
+    assert provider.total_input_tokens == 120
+    assert provider.total_output_tokens == 42
+
+
+class TruncatedInputProvider(Provider):
+    """Provider that returns a tool call whose input failed to parse."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def complete(self, messages, tools=None, system=None):
+        self.calls.append(list(messages))
+        if len(self.calls) == 1:
+            return {
+                "content": [{"type": "tool_use", "id": "t1", "name": "write_file", "input": {}}],
+                "tool_input_errors": {"t1": "tool input JSON was truncated after 10 characters"},
+            }
+        return {"content": [{"type": "text", "text": "done"}]}
+
+
+def test_agent_reports_tool_input_errors():
+    """Test that the agent returns input errors to the model instead of running the tool."""
+    provider = TruncatedInputProvider()
+    agent = Agent(provider=provider, registry=ToolRegistry())
+    assert asyncio.run(agent.run("write")) == "done"
+
+    result = provider.calls[1][-1]["content"][0]
+    assert result["tool_use_id"] == "t1"
+    assert "truncated" in result["content"]
+    assert "Resend" in result["content"]
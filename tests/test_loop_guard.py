@@ -0,0 +1,133 @@
+"""Tests for loop detection in the agent loop."""
+import asyncio
+from typing import Any, Dict, List
+
+from bitteragent.agent import Agent
+from bitteragent.loop_guard import LoopGuard
+from bitteragent.native_tools.jobs import JobManager, JobTool
+from bitteragent.providers.base import Provider
+from bitteragent.tools import Tool, ToolRegistry, ToolResult
+
+
+class FailingEditTool(Tool):
+    """Edit tool that always fails the same way."""
+
+    name = "edit_file"
+    parameters = {"type": "object", "properties": {"path": {"type": "string"}}}
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def execute(self, **kwargs: Any) -> ToolResult:
+        self.calls += 1
+        return ToolResult(success=False, error=f"old_string not found (checked at 2024-05-01T10:00:0{self.calls % 10})")
+
+
+class ScriptedProvider(Provider):
+    """Replays a fixed list of tool calls, then answers with text."""
+
+    def __init__(self, calls: List[Dict[str, Any]]) -> None:
+        self.calls = calls
+        self.requests: List[List[Dict[str, Any]]] = []
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.requests.append(list(messages))
+        step = len(self.requests) - 1
+        if step < len(self.calls):
+            return {"content": [{"type": "tool_use", "id": str(step), "name": "edit_file", "input": self.calls[step]}]}
+        return {"content": [{"type": "text", "text": "done"}]}
+
+
+def _agent(calls: List[Dict[str, Any]], **guard: Any) -> Agent:
+    registry = ToolRegistry()
+    registry.register(FailingEditTool())
+    return Agent(provider=ScriptedProvider(calls), registry=registry, loop_guard=LoopGuard(**guard))
+
+
+def test_repetition_gets_notice_then_stops():
+    """Repeating a failing call is flagged once, then the run is stopped."""
+    agent = _agent([{"path": "a.py"}] * 20)
+    output = asyncio.run(agent.run("fix it"))
+
+    assert agent.stop_reason is not None
+    assert agent.stop_reason.kind == "repetition"
+    assert agent.stop_reason.turns == 6
+    assert "loop detected" in output
+    notices = [
+        block for message in agent.messages if message["role"] == "user" and isinstance(message["content"], list)
+        for block in message["content"] if block.get("type") == "text"
+    ]
+    assert len(notices) == 1
+    assert "edit_file" in notices[0]["text"]
+    # Every tool_use still has its result, so the conversation can continue
+    assert agent.messages[-1]["content"][0]["type"] == "tool_result"
+
+
+def test_cycle_detected():
+    """Alternating between two failing calls is detected as a cycle."""
+    agent = _agent([{"path": "a.py"}, {"path": "b.py"}] * 10, max_notices=0)
+    asyncio.run(agent.run("fix it"))
+
+    assert agent.stop_reason is not None
+    assert agent.stop_reason.kind == "cycle"
+    assert agent.stop_reason.turns == 6
+
+
+def test_varied_calls_not_flagged():
+    """Distinct calls run to completion without interference."""
+    agent = _agent([{"path": f"{i}.py"} for i in range(10)])
+    output = asyncio.run(agent.run("fix it"))
+
+    assert output == "done"
+    assert agent.stop_reason is None
+
+
+def test_max_turns():
+    """The turn limit stops a run that never finishes, and resets per run."""
+    agent = _agent([{"path": f"{i}.py"} for i in range(50)], max_turns=4)
+    output = asyncio.run(agent.run("fix it"))
+
+    assert agent.stop_reason is not None
+    assert agent.stop_reason.kind == "max_turns"
+    assert len(agent.provider.requests) == 4
+    assert "4 turns" in output
+
+    asyncio.run(agent.run("continue"))
+    assert len(agent.provider.requests) == 8
+
+
+class PollingProvider(Provider):
+    """Polls a background job with alternating status and output calls, then answers."""
+
+    def __init__(self, job_id: int, polls: int) -> None:
+        self.job_id = job_id
+        self.polls = polls
+        self.requests = 0
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.requests += 1
+        if self.requests > self.polls:
+            return {"content": [{"type": "text", "text": "build still running"}]}
+        action = "status" if self.requests % 2 else "output"
+        call = {"type": "tool_use", "id": str(self.requests), "name": "job", "input": {"action": action, "job_id": self.job_id}}
+        return {"content": [call]}
+
+
+def test_polling_a_running_job_is_not_a_loop():
+    """Repeated polls of a quiet running job are neither flagged nor stopped."""
+    jobs = JobManager()
+    try:
+        job = jobs.start("sleep 30")
+        registry = ToolRegistry()
+        registry.register(JobTool(jobs))
+        agent = Agent(provider=PollingProvider(job.id, polls=12), registry=registry, loop_guard=LoopGuard())
+        assert asyncio.run(agent.run("wait for the build")) == "build still running"
+        assert agent.stop_reason is None
+        assert agent.provider.requests == 13
+        assert not any(
+            block.get("type") == "text"
+            for message in agent.messages if message["role"] == "user" and isinstance(message["content"], list)
+            for block in message["content"]
+        )
+    finally:
+        jobs.close()
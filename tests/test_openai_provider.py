@@ -0,0 +1,279 @@
+"""End-to-end tests for OpenAIProvider against a local stub server."""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from bitteragent.agent import Agent
+from bitteragent.history import MessageView
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.openai import OpenAIProvider
+from bitteragent.tools import ToolRegistry
+
+
+def sse(chunks: List[Dict[str, Any]]) -> str:
+    return "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+
+
+def delta(finish_reason=None, **fields: Any) -> Dict[str, Any]:
+    return {"choices": [{"index": 0, "delta": fields, "finish_reason": finish_reason}]}
+
+
+def tool_delta(index: int, arguments: str, id: str = None, name: str = None) -> Dict[str, Any]:
+    call: Dict[str, Any] = {"index": index, "function": {"arguments": arguments}}
+    if id:
+        call["id"] = id
+    if name:
+        call["function"]["name"] = name
+    return delta(tool_calls=[call])
+
+
+class StubServer:
+    """Minimal HTTP/1.1 keepalive server replaying canned chat-completion streams."""
+
+    def __init__(self, responses: List[Tuple[int, str]]) -> None:
+        self.responses = list(responses)
+        self.requests: List[Dict[str, Any]] = []
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, value = line.decode().split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            self.requests.append({"path": request_line.split()[1].decode(), "headers": headers, "json": json.loads(body)})
+            status, payload = self.responses.pop(0)
+            data = payload.encode()
+            if status is None:
+                # Announce more data than is sent, then drop the connection mid-stream
+                writer.write(f"HTTP/1.1 200 Stub\r\nContent-Length: {len(data) + 100}\r\n\r\n".encode() + data)
+                await writer.drain()
+                break
+            writer.write(
+                f"HTTP/1.1 {status} Stub\r\nContent-Type: text/event-stream\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+        writer.close()
+
+    async def __aenter__(self) -> "StubServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.server.close()
+
+
+def test_streams_text_and_assembles_tool_calls():
+    """Text deltas stream through the callback and split tool arguments are reassembled."""
+    chunks = [
+        delta(role="assistant", content="Hel"),
+        delta(content="lo"),
+        tool_delta(0, '{"file_path": "/a",', id="call_a", name="write_file"),
+        tool_delta(0, ' "content": "x"}'),
+        tool_delta(1, '{"command": "ls"}', name="shell"),
+        delta(finish_reason="tool_calls"),
+        {"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 7}},
+    ]
+    texts: List[str] = []
+
+    async def scenario():
+        async with StubServer([(200, sse(chunks))]) as server:
+            provider = OpenAIProvider(model="local", api_key="k", base_url=server.url, text_callback=texts.append)
+            try:
+                response = await provider.complete([{"role": "user", "content": "hi"}], tools=[], system="sys")
+            finally:
+                await provider.close()
+            return response, server.requests[0]
+
+    response, request = asyncio.run(scenario())
+    assert texts == ["Hel", "lo"]
+    assert response["content"] == [
+        {"type": "text", "text": "Hello"},
+        {"type": "tool_use", "id": "call_a", "name": "write_file", "input": {"file_path": "/a", "content": "x"}},
+        {"type": "tool_use", "id": "call_1", "name": "shell", "input": {"command": "ls"}},
+    ]
+    assert response["stop_reason"] == "tool_use"
+    assert response["usage"] == {"input_tokens": 12, "output_tokens": 7}
+    assert request["path"] == "/v1/chat/completions"
+    assert request["headers"]["authorization"] == "Bearer k"
+    assert request["json"]["stream"] is True
+    assert request["json"]["messages"] == [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}]
+
+
+def test_agent_end_to_end_reuses_connection():
+    """A full tool loop runs over one keepalive connection with converted history."""
+    responses = [
+        (200, sse([tool_delta(0, '{"command": "echo hi"}', id="c1", name="shell"), delta(finish_reason="tool_calls")])),
+        (200, sse([delta(content="done"), delta(finish_reason="stop")])),
+    ]
+
+    async def scenario():
+        async with StubServer(responses) as server:
+            registry = ToolRegistry()
+            registry.register(ShellTool())
+            provider = OpenAIProvider(model="local", base_url=server.url)
+            agent = Agent(provider=provider, registry=registry, system_prompt="be brief")
+            try:
+                result = await agent.run("say hi")
+            finally:
+                await agent.close()
+            return result, server
+
+    result, server = asyncio.run(scenario())
+    assert result == "done"
+    assert server.connections == 1
+    first, second = (r["json"] for r in server.requests)
+    assert "authorization" not in server.requests[0]["headers"]
+    assert first["tools"][0]["type"] == "function"
+    assert first["tools"][0]["function"]["name"] == "shell"
+    assert second["messages"][2] == {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "shell", "arguments": '{"command": "echo hi"}'}}],
+    }
+    assert second["messages"][3] == {"role": "tool", "tool_call_id": "c1", "content": "hi"}
+
+
+def test_retries_server_errors_but_not_client_errors():
+    """5xx responses are retried; 4xx responses fail immediately."""
+    ok = sse([delta(content="ok"), delta(finish_reason="stop")])
+
+    async def scenario(responses):
+        async with StubServer(responses) as server:
+            provider = OpenAIProvider(model="local", base_url=server.url, max_retries=3)
+            try:
+                return await provider.complete([{"role": "user", "content": "hi"}]), len(server.requests)
+            finally:
+                await provider.close()
+
+    response, attempts = asyncio.run(scenario([(503, "busy"), (200, ok)]))
+    assert response["content"] == [{"type": "text", "text": "ok"}]
+    assert attempts == 2
+
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        asyncio.run(scenario([(400, "bad request"), (200, ok)]))
+
+
+def test_truncated_tool_arguments_are_reported():
+    """Arguments cut off by the length limit become a tool input error."""
+    chunks = [tool_delta(0, '{"file_path": "/a", "content": "unfini', id="c1", name="write_file"),
+              delta(finish_reason="length")]
+
+    async def scenario():
+        async with StubServer([(200, sse(chunks))]) as server:
+            provider = OpenAIProvider(model="local", base_url=server.url)
+            try:
+                return await provider.complete([{"role": "user", "content": "write"}])
+            finally:
+                await provider.close()
+
+    response = asyncio.run(scenario())
+    assert response["stop_reason"] == "max_tokens"
+    assert response["content"][0]["input"] == {}
+    assert "c1" in response["tool_input_errors"]
+
+
+def test_client_follows_event_loop_changes():
+    """Each asyncio.run gets a fresh client, as in chat's one loop per message."""
+    ok = sse([delta(content="ok"), delta(finish_reason="stop")])
+    server = StubServer([(200, ok), (200, ok)])
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    async def serve():
+        await server.__aenter__()
+        started.set()
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop)
+    started.wait(5)
+    try:
+        provider = OpenAIProvider(model="local", base_url=server.url)
+        for _ in range(2):
+            response = asyncio.run(provider.complete([{"role": "user", "content": "hi"}]))
+            assert response["content"] == [{"type": "text", "text": "ok"}]
+        asyncio.run(provider.close())
+    finally:
+        async def shutdown():
+            await server.__aexit__()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+    assert len(server.requests) == 2
+
+
+def test_history_is_converted_incrementally():
+    """Only appended messages are converted; replaced tool inputs are re-encoded."""
+    ok = sse([delta(content="ok"), delta(finish_reason="stop")])
+    messages = [
+        {"role": "user", "content": "write"},
+        {"role": "assistant", "content": [{"type": "tool_use", "id": "c1", "name": "write_file", "input": {"content": "x" * 50}}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "c1", "content": "ok"}]},
+    ]
+    view = MessageView(messages)
+
+    async def scenario():
+        async with StubServer([(200, ok)] * 3) as server:
+            provider = OpenAIProvider(model="local", base_url=server.url)
+            try:
+                await provider.complete(view, system="sys")
+                first = provider._histories[view].messages[2]
+                messages.append({"role": "user", "content": "again"})
+                messages[1]["content"][0]["input"] = {"content": "[omitted]"}
+                await provider.complete(view, system="sys")
+                assert provider._histories[view].messages[2] is first
+                # A truncated history is converted again from scratch
+                del messages[3:]
+                await provider.complete(view, system="sys")
+            finally:
+                await provider.close()
+            return [r["json"]["messages"] for r in server.requests]
+
+    first, second, third = asyncio.run(scenario())
+    assert len(first) == 4 and len(second) == 5 and len(third) == 4
+    assert second[2]["tool_calls"][0]["function"]["arguments"] == '{"content": "[omitted]"}'
+    assert second[4] == {"role": "user", "content": "again"}
+    assert third == second[:4]
+
+
+def test_bad_chunks_are_skipped_and_interrupted_streams_not_replayed():
+    """A malformed SSE line is ignored; a stream cut after shown text fails without a retry."""
+    good = "data: {not json}\n\n" + sse([delta(content="fine"), delta(finish_reason="stop")])
+    cut = "data: " + json.dumps(delta(content="par")) + "\n\n"
+    texts: List[str] = []
+
+    async def scenario():
+        async with StubServer([(200, good), (None, cut), (200, good)]) as server:
+            provider = OpenAIProvider(model="local", base_url=server.url, text_callback=texts.append, max_retries=3)
+            try:
+                response = await provider.complete([{"role": "user", "content": "hi"}])
+                with pytest.raises(RuntimeError, match="interrupted after output was shown"):
+                    await provider.complete([{"role": "user", "content": "hi"}])
+            finally:
+                await provider.close()
+            return response, len(server.requests)
+
+    response, requests = asyncio.run(scenario())
+    assert response["content"] == [{"type": "text", "text": "fine"}]
+    assert texts == ["fine", "par"]
+    assert requests == 2
@@ -0,0 +1,115 @@
+"""Tests for the apply_patch tool."""
+import asyncio
+import os
+
+import pytest
+
+from bitteragent.native_tools.patch import ApplyPatchTool, PatchError, parse_patch
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "app.py").write_text(
+        "import os\n\n\ndef load():\n    return 1\n\n\ndef save(value):\n    print(value)\n    return value\n"
+    )
+    (tmp_path / "old.txt").write_text("keep\n")
+    (tmp_path / "gone.txt").write_text("bye\n")
+    return tmp_path
+
+
+def apply(patch):
+    return asyncio.run(ApplyPatchTool().execute(patch=patch))
+
+
+def test_parse_git_style_patch():
+    """Test parsing of file operations from git and plain headers."""
+    patches = parse_patch(
+        "diff --git a/x.py b/y.py\nsimilarity index 90%\nrename from x.py\nrename to y.py\n"
+        "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1 @@\n+print()\n"
+        "--- a/old.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-x\n"
+    )
+    assert [patch.display for patch in patches] == ["R x.py -> y.py", "A new.py", "D old.py"]
+    with pytest.raises(PatchError):
+        parse_patch("just some text")
+
+
+def test_multi_file_patch_with_create_delete_rename(workdir):
+    """Test a patch that modifies, creates, deletes and renames files."""
+    result = apply(
+        "--- a/app.py\n+++ b/app.py\n"
+        "@@ -4,2 +4,2 @@\n def load():\n-    return 1\n+    return 2\n"
+        "@@ -8,3 +8,3 @@\n def save(value):\n-    print(value)\n+    log(value)\n     return value\n"
+        "--- /dev/null\n+++ b/pkg/new.py\n@@ -0,0 +1,2 @@\n+def new():\n+    pass\n"
+        "--- a/gone.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-bye\n"
+        "diff --git a/old.txt b/moved.txt\nrename from old.txt\nrename to moved.txt\n"
+    )
+    assert result.success, result.error
+    assert "hunk 2: applied at line 8" in result.output
+    assert (workdir / "app.py").read_text().count("return 2") == 1
+    assert "log(value)" in (workdir / "app.py").read_text()
+    assert (workdir / "pkg" / "new.py").read_text() == "def new():\n    pass\n"
+    assert not (workdir / "gone.txt").exists()
+    assert not (workdir / "old.txt").exists()
+    assert (workdir / "moved.txt").read_text() == "keep\n"
+
+
+def test_patch_keeps_mode_symlinks_and_hardlinks(workdir):
+    """Test that patched files keep their permissions, symlinks and hard links."""
+    (workdir / "run.sh").write_text("echo hi\n")
+    os.chmod(workdir / "run.sh", 0o755)
+    os.symlink("app.py", workdir / "link.py")
+    os.link(workdir / "old.txt", workdir / "twin.txt")
+    result = apply(
+        "--- a/run.sh\n+++ b/run.sh\n@@ -1 +1 @@\n-echo hi\n+echo bye\n"
+        "--- a/link.py\n+++ b/link.py\n@@ -4,2 +4,2 @@\n def load():\n-    return 1\n+    return 2\n"
+        "--- a/twin.txt\n+++ b/twin.txt\n@@ -1 +1 @@\n-keep\n+changed\n"
+    )
+    assert result.success, result.error
+    assert (workdir / "run.sh").read_text() == "echo bye\n"
+    assert os.stat(workdir / "run.sh").st_mode & 0o777 == 0o755
+    assert os.path.islink(workdir / "link.py")
+    assert "return 2" in (workdir / "app.py").read_text()
+    assert (workdir / "old.txt").read_text() == "changed\n"
+
+
+def test_fuzzy_matching_reports_offset_and_whitespace(workdir):
+    """Test that drifted line numbers, whitespace and stale context are tolerated."""
+    result = apply(
+        "--- a/app.py\n+++ b/app.py\n"
+        "@@ -20,4 +20,4 @@\n\n def save(value):\n-  print(value)\n+    print(value, flush=True)\n     return value\n"
+        "@@ -1,2 +1,2 @@\n-import os\n+import sys\n stale context\n"
+    )
+    assert not result.success
+    assert "hunk 1: applied at line 7 (offset -13 lines, whitespace differences ignored)" in result.error
+    assert "hunk 2 FAILED" in result.error
+
+    result = apply(
+        "--- a/app.py\n+++ b/app.py\n"
+        "@@ -1,3 +1,3 @@\n-import os\n+import sys\n\n stale context\n"
+    )
+    assert result.success, result.error
+    assert "fuzz 1" in result.output
+    assert (workdir / "app.py").read_text().startswith("import sys\n")
+
+
+def test_failed_patch_changes_nothing(workdir):
+    """Test that a failing hunk in any file leaves every file untouched."""
+    before = (workdir / "app.py").read_text()
+    result = apply(
+        "--- a/app.py\n+++ b/app.py\n@@ -4,2 +4,2 @@\n def load():\n-    return 1\n+    return 2\n"
+        "--- /dev/null\n+++ b/created.py\n@@ -0,0 +1 @@\n+x = 1\n"
+        "--- a/gone.txt\n+++ b/gone.txt\n@@ -1 +1 @@\n-not there\n+replacement\n"
+    )
+    assert not result.success
+    assert result.error.startswith("Patch not applied; no files were changed.")
+    assert "M gone.txt: hunk 1 FAILED" in result.error
+    assert (workdir / "app.py").read_text() == before
+    assert not (workdir / "created.py").exists()
+
+
+def test_modified_paths_from_patch():
+    """Test that the tool reports every path the patch touches."""
+    tool = ApplyPatchTool()
+    patch = "diff --git a/a.py b/b.py\nrename from a.py\nrename to b.py\n--- a/c.py\n+++ b/c.py\n@@ -1 +1 @@\n-x\n+y\n"
+    assert tool.modified_paths({"patch": patch}) == ["a.py", "b.py", "c.py"]
@@ -0,0 +1,126 @@
+"""Tests for the native search tool and directory walker."""
+import asyncio
+import os
+
+import pytest
+
+from bitteragent.native_tools.search import SearchTool, required_literal
+from bitteragent.walk import IgnoreRules, walk
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a small workspace with ignored and binary files."""
+    files = {
+        ".gitignore": "*.log\nbuild/\n/root_only.txt\n!keep.log\n",
+        "src/app.py": "import os\n\ndef main():\n    return os.getcwd()\n",
+        "src/util.py": "def helper():\n    return 'MAIN'\n",
+        "src/nested/root_only.txt": "main here\n",
+        "root_only.txt": "main ignored\n",
+        "debug.log": "main ignored\n",
+        "keep.log": "main kept\n",
+        "build/out.py": "def main(): pass\n",
+        "node_modules/pkg/index.js": "function main() {}\n",
+        "docs/readme.md": "no match\n",
+    }
+    for rel, content in files.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (tmp_path / "src" / "data.bin").write_bytes(b"main\0\x01\x02")
+    return tmp_path
+
+
+def test_walk_respects_gitignore_and_excludes(tree):
+    """Test that ignored files and default-excluded directories are skipped."""
+    rels = sorted(entry.rel for entry in walk(str(tree)))
+    assert rels == [
+        ".gitignore",
+        "docs/readme.md",
+        "keep.log",
+        "src/app.py",
+        "src/data.bin",
+        "src/nested/root_only.txt",
+        "src/util.py",
+    ]
+
+
+def test_ignore_rules_anchoring_and_negation():
+    """Test anchored, unanchored, directory-only and negated patterns."""
+    rules = IgnoreRules().extend("", ["*.pyc", "/dist", "docs/*.tmp", "logs/", "!important.pyc"])
+    assert rules.ignored("a/b/c.pyc", False)
+    assert not rules.ignored("a/important.pyc", False)
+    assert rules.ignored("dist", True)
+    assert not rules.ignored("src/dist", True)
+    assert rules.ignored("docs/x.tmp", False)
+    assert not rules.ignored("other/docs/x.tmp", False)
+    assert rules.ignored("a/logs", True)
+    assert not rules.ignored("a/logs", False)
+
+    nested = rules.extend("pkg", ["*.txt"])
+    assert nested.ignored("pkg/sub/a.txt", False)
+    assert not nested.ignored("other/a.txt", False)
+
+
+def test_required_literal():
+    """Test extraction of literals used for prefiltering."""
+    assert required_literal("def main") == "def main"
+    assert required_literal(r"foo\d+barbaz") == "barbaz"
+    assert required_literal("a|b") is None
+    assert required_literal(r"\w+") is None
+    assert required_literal("(?i)main") is None
+
+
+def test_content_search(tree):
+    """Test regex content search output format and filtering."""
+    result = asyncio.run(SearchTool().execute(pattern=r"def \w+\(", path=str(tree)))
+    assert result.success
+    lines = result.output.splitlines()
+    assert lines[0] == f"{os.path.join(str(tree), 'src/app.py')}:3: def main():"
+    assert lines[1].endswith("src/util.py:1: def helper():")
+    assert "build" not in result.output
+    assert "node_modules" not in result.output
+    assert lines[-1] == "[2 matching lines in 2 files]"
+
+
+def test_content_search_skips_binary_and_ignored(tree):
+    """Test that binary and gitignored files never match."""
+    result = asyncio.run(SearchTool().execute(pattern="main", path=str(tree)))
+    assert "data.bin" not in result.output
+    assert "debug.log" not in result.output
+    assert "keep.log:1: main kept" in result.output
+    assert "src/nested/root_only.txt" in result.output
+
+
+def test_ignore_case_and_glob(tree):
+    """Test case-insensitive search restricted by a glob."""
+    result = asyncio.run(SearchTool().execute(pattern="main", glob="*.py", ignore_case=True, path=str(tree)))
+    assert "util.py:2:     return 'MAIN'" in result.output
+    assert "keep.log" not in result.output
+
+
+def test_glob_only_lists_files(tree):
+    """Test file name search without a content pattern."""
+    result = asyncio.run(SearchTool().execute(glob="src/**/*.py", path=str(tree)))
+    assert result.output.splitlines()[:-1] == [
+        os.path.join(str(tree), "src/app.py"),
+        os.path.join(str(tree), "src/util.py"),
+    ]
+
+
+def test_max_results_truncates(tmp_path):
+    """Test that results stop at max_results and say so."""
+    for i in range(50):
+        (tmp_path / f"f{i:02}.txt").write_text("hit\nhit\n")
+    result = asyncio.run(SearchTool().execute(pattern="hit", path=str(tmp_path), max_results=5))
+    lines = result.output.splitlines()
+    assert len(lines) == 6
+    assert "truncated" in lines[-1]
+
+
+def test_invalid_arguments(tree):
+    """Test errors for missing criteria, bad regexes and missing directories."""
+    tool = SearchTool()
+    assert not asyncio.run(tool.execute(path=str(tree))).success
+    assert "Invalid regex" in asyncio.run(tool.execute(pattern="(", path=str(tree))).error
+    assert "not found" in asyncio.run(tool.execute(pattern="x", path=str(tree / "missing"))).error
@@ -0,0 +1,97 @@
+"""Tests for spilling oversized tool results."""
+import asyncio
+import os
+
+from bitteragent.agent import Agent
+from bitteragent.native_tools.output import ReadOutputTool
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.providers.base import Provider
+from bitteragent.spill import SpillStore
+from bitteragent.tools import ToolRegistry
+
+
+def test_small_output_is_inlined():
+    """Test that outputs below the threshold are returned unchanged."""
+    store = SpillStore(threshold=100)
+    assert store.maybe_spill("short") == "short"
+    assert store.handles() == []
+
+
+def test_large_output_is_spilled_with_preview():
+    """Test that large outputs are written to disk and summarized."""
+    store = SpillStore(threshold=100, preview_lines=2)
+    content = "".join(f"line {i}\n" for i in range(1000))
+    preview = store.maybe_spill(content)
+    try:
+        assert 'handle "out-1"' in preview
+        assert "1000 lines" in preview
+        assert f"{len(content)} bytes" in preview
+        assert "line 0\nline 1" in preview
+        assert "line 998\nline 999" in preview
+        assert "line 500" not in preview
+
+        lines, total = store.read("out-1", offset=500, limit=2)
+        assert lines == ["line 500\n", "line 501\n"]
+        assert total == 1000
+    finally:
+        store.close()
+
+
+def test_close_removes_directory():
+    """Test that closing the store removes its temporary directory."""
+    store = SpillStore(threshold=1)
+    store.maybe_spill("spilled")
+    directory = store.directory
+    assert os.path.isdir(directory)
+    store.close()
+    assert not os.path.exists(directory)
+
+
+def test_read_output_tool_pages_and_reports_unknown_handles():
+    """Test paging through spilled output with the retrieval tool."""
+    store = SpillStore(threshold=250)
+    store.maybe_spill("\n".join(str(i) for i in range(100)))
+    tool = ReadOutputTool(store)
+    try:
+        result = asyncio.run(tool.execute(handle="out-1", offset=10, limit=3))
+        assert result.success
+        assert result.output == "[out-1: lines 10-13 of 100]\n10\n11\n12\n"
+
+        result = asyncio.run(tool.execute(handle="out-9"))
+        assert not result.success
+        assert "out-1" in result.error
+    finally:
+        store.close()
+
+
+class LargeOutputProvider(Provider):
+    """Provider that runs a command with a large output, then finishes."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def complete(self, messages, tools=None, system=None):
+        self.calls.append(list(messages))
+        if len(self.calls) == 1:
+            return {"content": [{"type": "tool_use", "id": "1", "name": "shell", "input": {"command": "seq 1 20000"}}]}
+        return {"content": [{"type": "text", "text": "done"}]}
+
+
+def test_agent_spills_large_tool_results():
+    """Test that the agent stores a preview in history instead of the full output."""
+    store = SpillStore(threshold=1000)
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    provider = LargeOutputProvider()
+    agent = Agent(provider=provider, registry=registry, spill_store=store)
+    try:
+        assert asyncio.run(agent.run("count")) == "done"
+        content = agent.messages[2]["content"][0]["content"]
+        assert len(content) < 2000
+        assert 'handle "out-1"' in content
+        assert "20000" in content
+        lines, total = store.read("out-1", offset=19999, limit=1)
+        assert lines == ["20000"]
+        assert total == 20000
+    finally:
+        store.close()
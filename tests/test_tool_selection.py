@@ -0,0 +1,81 @@
+"""Tests for tool groups and per-turn tool selection."""
+import asyncio
+from typing import Any, List
+
+from bitteragent.agent import Agent
+from bitteragent.providers.base import Provider
+from bitteragent.tool_selection import ToolSelector
+from bitteragent.tools import Tool, ToolRegistry, ToolResult
+
+
+class EchoTool(Tool):
+    description = "Echoes its input"
+    parameters = {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    async def execute(self, text: str = "", **_: Any) -> ToolResult:
+        return ToolResult(success=True, output=text or self.name)
+
+
+def make_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+    for name, group in [("shell", "core"), ("job", "jobs"), ("read", "core"), ("patch", "patch"), ("output", "output")]:
+        registry.register(EchoTool(name), group=group)
+    return registry
+
+
+def test_selection_is_sticky_and_ordered():
+    """Groups activate by call, trigger or enable_tools and keep registration order."""
+    registry = make_registry()
+    selector = ToolSelector(always=("core",), triggers={"jobs": r"Started job \d+"}, summaries={"patch": "diffs"})
+    first = selector.select(registry)
+    assert first.list() == ["shell", "read", "enable_tools"]
+    assert "- patch: patch (diffs)" in first.get("enable_tools").description
+    # Repeated selection gives the identical schema, so the cached prefix stays valid
+    assert selector.select(registry).list() == first.list()
+    meta_schema = first.get("enable_tools").parameters
+
+    selector.observe(registry, [{"name": "read"}], ["Started job 3 (pid 42)"])
+    assert selector.select(registry).list() == ["shell", "job", "read", "enable_tools"]
+    selector.observe(registry, [{"name": "output"}], [""])
+    assert asyncio.run(selector.select(registry).get("enable_tools").execute(groups=["patch"])).output == "Enabled: patch"
+    # enable_tools stays once every group is active, so a dropped group can be re-enabled
+    assert selector.select(registry).list() == ["shell", "job", "read", "patch", "output", "enable_tools"]
+    assert selector.deactivate(["patch", "core"]) == ["patch"]
+    tools = selector.select(registry)
+    assert tools.list() == ["shell", "job", "read", "output", "enable_tools"]
+    assert asyncio.run(tools.get("enable_tools").execute(groups=["patch"])).output == "Enabled: patch"
+    assert selector.meta_tool(registry).parameters is meta_schema
+
+
+class RecordingProvider(Provider):
+    """Calls a tool that was not sent, then answers; records the tools of each request."""
+
+    def __init__(self) -> None:
+        self.tool_names: List[List[str]] = []
+
+    async def complete(self, messages, tools=None, system=None):  # type: ignore[override]
+        self.tool_names.append([tool["name"] for tool in tools])
+        if len(self.tool_names) == 1:
+            return {"content": [{"type": "tool_use", "id": "1", "name": "patch", "input": {"text": "applied"}}]}
+        return {"content": [{"type": "text", "text": "done"}]}
+
+
+def test_agent_sends_selected_tools():
+    """The agent sends the active subset, still runs unsent tools and measures the savings."""
+    provider = RecordingProvider()
+    selector = ToolSelector(always=("core",))
+    registry = make_registry()
+    # Optional tools with long descriptions are where the savings come from
+    registry.get("output").description = "Pages through saved output. " * 40
+    agent = Agent(provider=provider, registry=registry, tool_selector=selector)
+    assert asyncio.run(agent.run("go")) == "done"
+
+    assert provider.tool_names == [["shell", "read", "enable_tools"], ["shell", "read", "patch", "enable_tools"]]
+    assert agent.messages[2]["content"][0]["content"] == "applied"
+    stats = selector.stats()
+    assert stats["requests"] == 2
+    assert stats["schema_chars_sent"] < stats["schema_chars_full"]
+    assert stats["tokens_saved_estimate"] > 0
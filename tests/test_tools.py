@@ -4,7 +4,9 @@ from typing import Any
 
 import pytest
 
-from bitteragent.tools import Tool, ToolRegistry, ToolResult, run_tool
+from bitteragent.agent import Agent
+from bitteragent.providers.base import Provider
+from bitteragent.tools import Tool, ToolCache, ToolRegistry, ToolResult, run_tool
 
 
 class MockTool(Tool):
@@ -148,4 +150,100 @@ def test_abstract_tool_cannot_be_instantiated():
     with pytest.raises(TypeError) as exc_info:
         Tool()
     
-    assert "Can't instantiate abstract class" in str(exc_info.value)
\ No newline at end of file
+    assert "Can't instantiate abstract class" in str(exc_info.value)
+
+class CountingTool(Tool):
+    """Read-only tool that counts executions."""
+
+    name = "counting"
+    description = "Counts calls"
+    parameters = {"type": "object", "properties": {"value": {"type": "string"}}}
+    read_only = True
+
+    def __init__(self):
+        self.calls = 0
+
+    async def execute(self, value: str = "", **kwargs: Any) -> ToolResult:
+        self.calls += 1
+        return ToolResult(success=True, output=f"{value}:{self.calls}")
+
+
+def test_tool_cache_serves_repeated_read_only_calls():
+    """Test that identical read-only calls are memoized."""
+    cache = ToolCache()
+    tool = CountingTool()
+
+    first = asyncio.run(run_tool(tool, {"value": "a"}, cache=cache))
+    second = asyncio.run(run_tool(tool, {"value": "a"}, cache=cache))
+    other = asyncio.run(run_tool(tool, {"value": "b"}, cache=cache))
+
+    assert first.output == second.output == "a:1"
+    assert other.output == "b:2"
+    assert tool.calls == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_tool_cache_invalidated_by_side_effects():
+    """Test that a non-read-only call clears memoized results."""
+    cache = ToolCache()
+    tool = CountingTool()
+    asyncio.run(run_tool(tool, {"value": "a"}, cache=cache))
+    asyncio.run(run_tool(MockTool(), {"param1": "x"}, cache=cache))
+    result = asyncio.run(run_tool(tool, {"value": "a"}, cache=cache))
+
+    assert result.output == "a:2"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_tool_cache_revalidates_file_stats(tmp_path):
+    """Test that read_file results are refreshed when the file changes."""
+    from bitteragent.native_tools.file_ops import ReadFileTool
+
+    path = tmp_path / "data.txt"
+    path.write_text("one\n")
+    cache = ToolCache()
+    tool = ReadFileTool()
+
+    assert asyncio.run(run_tool(tool, {"file_path": str(path)}, cache=cache)).output == "one\n"
+    assert asyncio.run(run_tool(tool, {"file_path": str(path)}, cache=cache)).output == "one\n"
+    # Changed outside any tool call: the size differs, so the entry is stale
+    path.write_text("two lines\n")
+    assert asyncio.run(run_tool(tool, {"file_path": str(path)}, cache=cache)).output == "two lines\n"
+    assert cache.hits == 1
+
+
+class RepeatingProvider(Provider):
+    """Calls the counting tool once per message, then answers with its output."""
+
+    async def complete(self, messages, tools=None, system=None):
+        if messages[-1]["role"] == "user" and isinstance(messages[-1]["content"], str):
+            call = {"type": "tool_use", "id": str(len(messages)), "name": "counting", "input": {"value": "a"}}
+            return {"content": [call]}
+        return {"content": [{"type": "text", "text": messages[-1]["content"][0]["content"]}]}
+
+
+def test_tool_cache_cleared_for_each_message():
+    """Test that results memoized for one message are not served for the next."""
+    tool = CountingTool()
+    registry = ToolRegistry()
+    registry.register(tool)
+    agent = Agent(provider=RepeatingProvider(), registry=registry, tool_cache=ToolCache())
+    assert asyncio.run(agent.run("check")) == "a:1"
+    assert asyncio.run(agent.run("check again")) == "a:2"
+    assert agent.tool_cache.hits == 0
+
+
+def test_shell_read_only_classification():
+    """Test which shell commands are treated as side-effect free."""
+    from bitteragent.native_tools.shell import is_read_only_command
+
+    assert is_read_only_command("ls -la")
+    assert is_read_only_command("git status")
+    assert is_read_only_command("grep -rn foo src | head -20")
+    assert not is_read_only_command("ls > listing.txt")
+    assert not is_read_only_command("ls; rm -rf build")
+    assert not is_read_only_command("echo $(touch x)")
+    assert not is_read_only_command("find . -name '*.pyc' -delete")
+    assert not is_read_only_command("git commit -m msg")
+    assert not is_read_only_command("sort -o out.txt in.txt")
@@ -0,0 +1,95 @@
+"""Tests for compiled tool parameter validation."""
+import asyncio
+
+import pytest
+
+from bitteragent.native_tools.file_ops import ReadFileTool
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.tools import run_tool
+from bitteragent.validation import ValidationError, compile_schema
+
+
+def test_fills_defaults():
+    """Test that missing optional parameters get their schema defaults."""
+    validate = compile_schema(ReadFileTool.parameters)
+    assert validate({"file_path": "/a"}) == {"file_path": "/a", "limit": 1000, "offset": 0}
+
+
+def test_coerces_numeric_strings():
+    """Test that numbers sent as strings are coerced."""
+    validate = compile_schema(ReadFileTool.parameters)
+    params = validate({"file_path": "/a", "limit": "20", "offset": 5.0})
+    assert params["limit"] == 20
+    assert params["offset"] == 5
+
+
+def test_coerces_booleans():
+    """Test that boolean strings are coerced."""
+    validate = compile_schema({"type": "object", "properties": {"flag": {"type": "boolean"}}})
+    assert validate({"flag": "true"}) == {"flag": True}
+    assert validate({"flag": "False"}) == {"flag": False}
+
+
+def test_rejects_wrong_type_with_precise_error():
+    """Test that invalid values produce a message naming the parameter."""
+    validate = compile_schema(ReadFileTool.parameters)
+    with pytest.raises(ValidationError) as exc_info:
+        validate({"file_path": "/a", "limit": "all"})
+    message = str(exc_info.value)
+    assert "'limit'" in message
+    assert "expected integer" in message
+    assert "'all'" in message
+
+
+def test_reports_all_missing_required():
+    """Test that every missing required parameter is listed."""
+    validate = compile_schema({
+        "type": "object",
+        "properties": {"a": {"type": "string"}, "b": {"type": "string"}},
+        "required": ["a", "b"],
+    })
+    with pytest.raises(ValidationError, match="Missing required parameter\\(s\\): a, b"):
+        validate({})
+
+
+def test_null_optional_is_omitted():
+    """Test that null for an optional parameter falls back to its default."""
+    validate = compile_schema(ShellTool.parameters)
+    assert validate({"command": "ls", "timeout": None}) == {"command": "ls", "timeout": 300, "background": False}
+
+
+def test_enum_and_nested_arrays():
+    """Test enum membership and validation of array items."""
+    validate = compile_schema({
+        "type": "object",
+        "properties": {
+            "mode": {"type": "string", "enum": ["a", "b"]},
+            "ranges": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"path": {"type": "string"}, "limit": {"type": "integer", "default": 10}},
+                    "required": ["path"],
+                },
+            },
+        },
+    })
+    assert validate({"ranges": '[{"path": "/a"}]'}) == {"ranges": [{"path": "/a", "limit": 10}]}
+    with pytest.raises(ValidationError, match="'mode': expected one of"):
+        validate({"mode": "c"})
+    with pytest.raises(ValidationError, match=r"'ranges': \[1\]: Invalid parameter\(s\): 'limit'"):
+        validate({"ranges": [{"path": "/a"}, {"path": "/b", "limit": "x"}]})
+
+
+def test_unknown_parameters_pass_through():
+    """Test that parameters not in the schema are left untouched."""
+    validate = compile_schema(ShellTool.parameters)
+    assert validate({"command": "ls", "extra": 1})["extra"] == 1
+
+
+def test_run_tool_rejects_before_execution():
+    """Test that run_tool returns validation errors without executing the tool."""
+    result = asyncio.run(run_tool(ReadFileTool(), {"file_path": "/nonexistent", "limit": "lots"}))
+    assert not result.success
+    assert "Invalid parameter(s)" in result.error
+    assert "File not found" not in result.error
@@ -0,0 +1,99 @@
+"""Tests for the workspace index and overview tool."""
+import asyncio
+import os
+
+import pytest
+
+from bitteragent.native_tools.file_ops import WriteFileTool
+from bitteragent.native_tools.shell import ShellTool
+from bitteragent.native_tools.workspace import WorkspaceTool
+from bitteragent.tools import ToolRegistry, run_tool
+from bitteragent.workspace import WorkspaceIndex, detect_language, extract_symbols
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "core.py").write_text(
+        "class Engine:\n    def start(self):\n        pass\n\n\ndef helper():\n    return 1\n"
+    )
+    (root / "web").mkdir()
+    (root / "web" / "app.ts").write_text("export function render() {}\nexport interface Props {}\n")
+    (root / "README.md").write_text("# Demo\n")
+    return root, str(tmp_path / "cache" / "index.json")
+
+
+def test_extract_symbols():
+    """Test Python and regex-based symbol extraction."""
+    symbols = extract_symbols("class A:\n    def b(self): pass\ndef c(): pass\n", "Python")
+    assert symbols == [("class", "A", 1), ("method", "A.b", 2), ("def", "c", 3)]
+    assert extract_symbols("func Serve() {}\ntype Server struct {}\n", "Go") == [
+        ("func", "Serve", 1), ("type", "Server", 2),
+    ]
+    assert extract_symbols("def broken(:\n", "Python") == []
+    assert detect_language("src/main.rs") == "Rust"
+    assert detect_language("Makefile") == "Makefile"
+
+
+def test_overview_and_symbol_lookup(workspace):
+    """Test the tree overview and symbol search."""
+    root, cache_path = workspace
+    index = WorkspaceIndex(str(root), cache_path=cache_path)
+    overview = index.overview()
+    assert "3 files" in overview.splitlines()[0]
+    assert "Python 1 files" in overview
+    assert "pkg/ (1 files" in overview
+    assert "core.py" in overview and "Engine, helper" in overview
+
+    assert index.find_symbol("start") == [("pkg/core.py", "method", "Engine.start", 2)]
+    assert index.find_symbol("rend") == [("web/app.ts", "function", "render", 1)]
+    assert "No indexed files" in index.overview("missing")
+
+
+def test_index_is_cached_and_refreshed_incrementally(workspace):
+    """Test that a fresh index reuses the cache and only re-parses changed files."""
+    root, cache_path = workspace
+    WorkspaceIndex(str(root), cache_path=cache_path).ensure_current()
+    assert os.path.exists(cache_path)
+
+    (root / "pkg" / "extra.py").write_text("def added():\n    pass\n")
+    index = WorkspaceIndex(str(root), cache_path=cache_path)
+    index._load()
+    assert "pkg/core.py" in index.files
+    assert index.refresh() == 1
+    assert index.find_symbol("added")[0][0] == "pkg/extra.py"
+
+
+def test_observer_tracks_tool_writes(workspace, monkeypatch):
+    """Test that writes through tools update the index without a full rescan."""
+    root, cache_path = workspace
+    monkeypatch.chdir(root)
+    index = WorkspaceIndex(str(root), cache_path=cache_path)
+    index.ensure_current()
+
+    registry = ToolRegistry()
+    registry.add_observer(index)
+    params = {"file_path": "pkg/new.py", "content": "def fresh():\n    pass\n"}
+    asyncio.run(run_tool(WriteFileTool(), params, observers=registry.observers))
+    assert index._pending == {"pkg/new.py"}
+    assert index.find_symbol("fresh")[0][0] == "pkg/new.py"
+
+    asyncio.run(run_tool(ShellTool(), {"command": "rm pkg/new.py"}, observers=registry.observers))
+    assert index._dirty
+    assert index.find_symbol("fresh") == []
+
+
+def test_workspace_tool(workspace):
+    """Test the overview tool output."""
+    root, cache_path = workspace
+    tool = WorkspaceTool(WorkspaceIndex(str(root), cache_path=cache_path))
+    result = asyncio.run(tool.execute(path="pkg"))
+    assert result.success
+    assert "core.py" in result.output and "web" not in result.output
+
+    result = asyncio.run(tool.execute(symbol="Engine"))
+    assert result.output == "pkg/core.py:1: class Engine"
+
+    result = asyncio.run(tool.execute(symbol="nothing_here"))
+    assert result.output == "No symbols matching 'nothing_here'"